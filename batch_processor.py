@@ -0,0 +1,356 @@
+# batch_processor.py
+import os
+import glob
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+# Pipeline owned by the current worker process (set by _init_worker)
+_worker_pipeline = None
+
+
+def _init_worker(pipeline, cv_threads=None):
+    """
+    Give each worker process one long-lived pipeline. In-process runs pass
+    cv_threads=None so the caller's OpenCV thread setting is left alone.
+    """
+    global _worker_pipeline
+    if cv_threads is not None:
+        import cv2
+        # Keep OpenCV from spawning its own thread pool in every worker
+        cv2.setNumThreads(cv_threads)
+    _worker_pipeline = pipeline
+
+
+def _warm_worker():
+    """
+    Submitted once per worker before real jobs, so the pool is spawned, the
+    pipeline unpickled and the heavy imports loaded before the first request
+    """
+    import trimesh  # noqa: F401
+    import shapely  # noqa: F401
+    return _worker_pipeline is not None
+
+
+def _run_job(job):
+    """Process one file and return its manifest entry (never raises)"""
+    entry = {
+        "index": job["index"],
+        "input": job["image_path"],
+        "output": job["output_path"],
+        "thickness": job["thickness"],
+        "status": "ok",
+        "is_valid": False,
+        "issues": [],
+        "error": None,
+        "timings": {},
+    }
+    start = time.perf_counter()
+    try:
+        result = _worker_pipeline.process_image(
+            job["image_path"], job["output_path"], thickness=job["thickness"], name=job.get("name")
+        )
+        entry["is_valid"] = result["validation"]["is_valid"]
+        entry["issues"] = list(result["validation"]["issues"])
+        entry["timings"].update(
+            {record["stage"]: record["wall_time"] for record in result["trace"]["stages"]}
+        )
+        entry["counts"] = result["trace"]["counts"]
+        if "lods" in result:
+            entry["lods"] = [
+                {"path": lod["path"], "face_count": lod["face_count"], "is_valid": lod["is_valid"]}
+                for lod in result["lods"]
+            ]
+        if "diagnostics" in result:
+            entry["diagnostics"] = result["diagnostics"]
+        walls = result["validation"].get("wall_thickness")
+        if walls is not None:
+            entry["min_wall_mm"] = walls["min_wall_found_mm"]
+            entry["thin_regions"] = walls["thin_regions"]
+            entry["walls_calibrated"] = walls["calibrated"]
+        if result.get("binarization"):
+            entry["binarization"] = result["binarization"]["strategy"]
+    except Exception as e:
+        entry["status"] = "error"
+        entry["error"] = f"{type(e).__name__}: {e}"
+    entry["timings"]["total"] = time.perf_counter() - start
+    return entry
+
+
+def input_root(inputs):
+    """The deepest folder holding every input (folders count as themselves)"""
+    folders = [os.path.abspath(p) if os.path.isdir(p) else os.path.dirname(os.path.abspath(p))
+               for p in inputs]
+    return os.path.commonpath(folders) if folders else os.getcwd()
+
+
+def output_names_for(image_paths, root=None):
+    """
+    Name of every input's outputs: its path below root (by default the
+    folder holding all of them) without extension, e.g. "a/ring". Inputs
+    from different folders keep their subfolders, so a/ring.png and
+    b/ring.png don't overwrite each other's files.
+    """
+    image_paths = [os.path.abspath(p) for p in image_paths]
+    root = root or input_root(image_paths)
+    return [os.path.relpath(os.path.splitext(p)[0], root) for p in image_paths]
+
+
+def output_paths_for(image_paths, output_dir, output_format=".stl", root=None):
+    """
+    Output path for every input: its output name (see output_names_for)
+    under output_dir, with output_format as extension.
+    """
+    return [os.path.join(output_dir, name + output_format)
+            for name in output_names_for(image_paths, root)]
+
+
+def check_unique_outputs(image_paths, output_paths):
+    """Raise ValueError when two inputs would write the same file (ring.png, ring.jpg)"""
+    owners = {}
+    for image_path, output_path in zip(image_paths, output_paths):
+        owner = owners.setdefault(os.path.normcase(os.path.abspath(output_path)), image_path)
+        if owner != image_path:
+            raise ValueError(f"{owner} and {image_path} would both be written to {output_path}")
+
+
+class BatchProcessor:
+    def __init__(self, pipeline, workers=None, cv_threads=1):
+        self.pipeline = pipeline
+        self.workers = workers or os.cpu_count() or 1
+        self.cv_threads = cv_threads
+
+    def build_jobs(self, image_paths, output_dir="test_results", output_paths=None, thickness=2.0,
+                   output_format=".stl"):
+        """
+        Pair every input with an output path and a thickness. Generated
+        output paths keep the inputs' folders below their common folder;
+        inputs that would still write the same file are rejected.
+        """
+        image_paths = list(image_paths)
+        if output_paths is None:
+            output_paths = output_paths_for(image_paths, output_dir, output_format)
+        if len(output_paths) != len(image_paths):
+            raise ValueError("output_paths must have one entry per input image")
+        check_unique_outputs(image_paths, output_paths)
+
+        if isinstance(thickness, (int, float)):
+            thicknesses = [float(thickness)] * len(image_paths)
+        else:
+            thicknesses = [float(t) for t in thickness]
+            if len(thicknesses) != len(image_paths):
+                raise ValueError("thickness must be a number or have one entry per input image")
+
+        # Diagnostics and traces are named like generated outputs
+        names = output_names_for(image_paths)
+        return [
+            {"index": i, "image_path": p, "output_path": o, "thickness": t, "name": n}
+            for i, (p, o, t, n) in enumerate(zip(image_paths, output_paths, thicknesses, names))
+        ]
+
+    def run(self, image_paths, output_dir="test_results", output_paths=None,
+            thickness=2.0, manifest_path=None, output_format=".stl"):
+        """
+        Process every image and return manifest entries in input order.
+        output_format picks the file type for generated output paths
+        (.stl, .stl.gz or .3mf).
+        """
+        jobs = self.build_jobs(image_paths, output_dir, output_paths, thickness, output_format)
+        for job in jobs:
+            out_dir = os.path.dirname(job["output_path"])
+            if out_dir:
+                os.makedirs(out_dir, exist_ok=True)
+
+        workers = min(self.workers, len(jobs)) if jobs else 1
+        start = time.perf_counter()
+
+        if workers <= 1:
+            # Small batches are cheaper without a process pool
+            _init_worker(self.pipeline)
+            entries = [_run_job(job) for job in jobs]
+            self.pipeline.wait_diagnostics()
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(self.pipeline, self.cv_threads),
+            ) as executor:
+                # map() yields in submission order, so results match the inputs
+                entries = list(executor.map(_run_job, jobs, chunksize=1))
+
+        elapsed = time.perf_counter() - start
+        if manifest_path:
+            self.write_manifest(manifest_path, entries, workers, elapsed)
+        return entries
+
+    def write_manifest(self, manifest_path, entries, workers, elapsed):
+        manifest = {
+            "workers": workers,
+            "elapsed": elapsed,
+            "processed": len(entries),
+            "failed": sum(1 for e in entries if e["status"] != "ok"),
+            "files": entries,
+        }
+        manifest_dir = os.path.dirname(manifest_path)
+        if manifest_dir:
+            os.makedirs(manifest_dir, exist_ok=True)
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+
+
+def collect_images(inputs, extensions=(".png", ".jpg", ".jpeg", ".bmp", ".svg")):
+    """Expand files and directories into a sorted list of image paths"""
+    image_files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for ext in extensions:
+                image_files.extend(glob.glob(os.path.join(item, "*" + ext)))
+        else:
+            image_files.append(item)
+    return sorted(set(image_files))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a batch of jewelry drawings to STL")
+    parser.add_argument("inputs", nargs="+",
+                        help="Image files or folders of images ('-' reads paths from stdin with --stream)")
+    parser.add_argument("-o", "--output-dir", default="test_results")
+    parser.add_argument("-t", "--thickness", type=float, default=2.0)
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="Worker processes (default: all cores)")
+    parser.add_argument("--cv-threads", type=int, default=1,
+                        help="OpenCV threads per worker")
+    parser.add_argument("--cv-workers", type=int, default=None,
+                        help="Preprocessing and contour threads in --stream mode (default: all cores)")
+    parser.add_argument("--all-components", action="store_true",
+                        help="Extrude every part of a multi-part design, not just the largest")
+    parser.add_argument("--cache-dir", default=None,
+                        help="Reuse stage outputs cached in this folder")
+    parser.add_argument("--trace-dir", default=None,
+                        help="Write a JSON timing trace per image to this folder")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="Suppress per-stage progress output")
+    parser.add_argument("--binarization", default="fixed",
+                        choices=["fixed", "otsu", "adaptive", "clahe_otsu", "auto"],
+                        help="Thresholding strategy; auto picks the best one per drawing")
+    parser.add_argument("--min-wall", type=float, default=None, metavar="MM",
+                        help="Flag walls thinner than this (2D analysis of the outline)")
+    parser.add_argument("--pixel-size", type=float, default=None, metavar="MM",
+                        help="Millimetres per scan pixel for --min-wall (without it, "
+                             "widths are in pixels and marked uncalibrated)")
+    parser.add_argument("--lod", type=int, nargs="+", default=None, metavar="FACES",
+                        help="Also write decimated copies with at most these face counts")
+    parser.add_argument("--diagnostics-dir", default=None,
+                        help="Render a processing-steps PNG per image into this folder")
+    parser.add_argument("--format", default="stl", choices=["stl", "stl.gz", "3mf"],
+                        help="Output format; stl.gz and 3mf are compressed for archival")
+    parser.add_argument("--manifest", default=None,
+                        help="Manifest path (default: <output-dir>/manifest.json)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only convert new or changed files (tracked in <output-dir>/incremental.json)")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep polling the inputs and convert files as they appear or change")
+    parser.add_argument("--interval", type=float, default=2.0,
+                        help="Seconds between polls in --watch mode")
+    parser.add_argument("--debounce", type=float, default=1.0,
+                        help="Seconds a file must be unmodified before --watch picks it up")
+    parser.add_argument("--stream", action="store_true",
+                        help="Run the stages concurrently on bounded queues and print per-stage utilization")
+    parser.add_argument("--queue-size", type=int, default=4,
+                        help="Jobs held between stages in --stream mode")
+    args = parser.parse_args(argv)
+
+    from main import JewelryCADPipeline
+
+    pipeline = JewelryCADPipeline(
+        cache_dir=args.cache_dir, trace_dir=args.trace_dir, verbose=not args.quiet,
+        multi_component=args.all_components, diagnostics_dir=args.diagnostics_dir,
+        lod_face_budgets=args.lod, binarization=args.binarization,
+        min_wall_mm=args.min_wall, pixel_size_mm=args.pixel_size,
+    )
+
+    if args.incremental or args.watch:
+        from watch_folder import IncrementalProcessor
+        with IncrementalProcessor(
+            pipeline, output_dir=args.output_dir, manifest_path=args.manifest,
+            workers=args.workers, cv_threads=args.cv_threads, thickness=args.thickness,
+            output_format="." + args.format,
+        ) as processor:
+            if args.watch:
+                print(f"Watching {', '.join(args.inputs)} (Ctrl+C to stop)")
+                processor.watch(args.inputs, interval=args.interval, debounce=args.debounce)
+                return 0
+            entries, skipped = processor.run_once(args.inputs)
+        print(f"Converted {len(entries)} file(s), {skipped} already up to date")
+        return 0 if all(e["status"] == "ok" for e in entries) else 2
+
+    if args.stream:
+        return stream_main(pipeline, args)
+
+    image_files = collect_images(args.inputs)
+    if not image_files:
+        print("No image files found")
+        return 1
+
+    manifest_path = args.manifest or os.path.join(args.output_dir, "manifest.json")
+    try:
+        entries = pipeline.process_batch(
+            image_files,
+            output_dir=args.output_dir,
+            thickness=args.thickness,
+            workers=args.workers,
+            manifest_path=manifest_path,
+            cv_threads=args.cv_threads,
+            output_format="." + args.format,
+        )
+    except ValueError as e:
+        # Inputs that would overwrite each other's output
+        print(e)
+        return 1
+
+    for entry in entries:
+        if entry["status"] == "ok":
+            print(f"✓ {entry['input']} -> {entry['output']} ({entry['timings']['total']:.2f}s)")
+        else:
+            print(f"✗ {entry['input']}: {entry['error']}")
+    print(f"Manifest written to {manifest_path}")
+    return 0 if all(e["status"] == "ok" for e in entries) else 2
+
+
+def stream_main(pipeline, args):
+    """--stream: convert files as paths arrive, then report stage utilization"""
+    import sys
+    from streaming import StreamingExecutor, pipeline_stages
+
+    if args.inputs == ["-"]:
+        # Paths are read lazily, so an open-ended producer can feed the batch
+        image_files = (line.strip() for line in sys.stdin if line.strip())
+    else:
+        image_files = collect_images(args.inputs)
+    executor = StreamingExecutor(
+        pipeline_stages(pipeline, cv_workers=args.cv_workers, geometry_workers=args.workers,
+                        cv_threads=args.cv_threads),
+        queue_size=args.queue_size)
+
+    entries = []
+    for entry in pipeline.process_stream(image_files, output_dir=args.output_dir,
+                                         thickness=args.thickness,
+                                         output_format="." + args.format, executor=executor):
+        entries.append(entry)
+        if entry["status"] == "ok":
+            print(f"✓ {entry['input']} -> {entry['output']} ({entry['timings']['total']:.2f}s)")
+        else:
+            print(f"✗ {entry['input']}: {entry['error']}")
+    print(executor.format_report())
+
+    manifest_path = args.manifest or os.path.join(args.output_dir, "manifest.json")
+    entries.sort(key=lambda e: e["index"])
+    BatchProcessor(pipeline, args.workers).write_manifest(
+        manifest_path, entries, args.workers, executor.elapsed)
+    print(f"Manifest written to {manifest_path}")
+    return 0 if all(e["status"] == "ok" for e in entries) else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,182 @@
+# benchmarks/run_benchmarks.py
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import JewelryCADPipeline
+from benchmarks.synthetic_drawings import generate
+from mesh_export import export_mesh
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# (case name, generator, resolution in px, generator parameters)
+QUICK_CASES = [
+    ("ring_500", "ring", 500, {}),
+    ("ring_2000", "ring", 2000, {}),
+    ("pendant_1000_c12", "pendant", 1000, {"cutouts": 12}),
+    ("pendant_2000_c60_noisy", "pendant", 2000, {"cutouts": 60, "noise": True}),
+    ("filigree_2000_v20k", "filigree", 2000, {"vertices": 20000}),
+]
+
+FULL_CASES = QUICK_CASES + [
+    ("pendant_5000_c200", "pendant", 5000, {"cutouts": 200}),
+    ("filigree_5000_v50k", "filigree", 5000, {"vertices": 50000, "noise": True}),
+    ("ring_10000", "ring", 10000, {}),
+    ("filigree_10000_v100k", "filigree", 10000, {"vertices": 100000}),
+]
+
+
+def _time(fn, repeat):
+    """Run fn repeat times, return (median seconds, last result)"""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), result
+
+
+def bench_case(pipeline, image_path, output_path, repeat=3, thickness=2.0):
+    """Time every pipeline stage on its own, then the end-to-end path"""
+    cp = pipeline.contour_processor
+    cad = pipeline.cad_generator
+    timings = {}
+
+    timings["load"], image = _time(lambda: cv2.imread(image_path), repeat)
+    timings["preprocess_image"], processed = _time(lambda: pipeline.preprocess_image(image), repeat)
+    timings["detect_contours"], (contours, parents) = _time(
+        lambda: cp.detect_contour_tree(processed), repeat)
+    timings["refine_contours"], (refined, refined_parents) = _time(
+        lambda: cp.refine_contour_tree(contours, parents), repeat)
+    timings["vectorize_contours"], curves = _time(
+        lambda: cp.vectorize_contours(refined, refined_parents), repeat)
+    timings["create_cad_geometry"], polygons = _time(
+        lambda: cad.create_cad_geometry(curves), repeat)
+    timings["extrude_to_3d"], mesh = _time(
+        lambda: cad.extrude_to_3d(polygons, thickness=thickness), repeat)
+
+    validator = pipeline.mesh_validator
+
+    def validate_cold():
+        # Validation results are memoized; time the uncached check
+        validator.clear_memo()
+        return validator.validate_mesh(mesh)
+
+    def end_to_end():
+        validator.clear_memo()
+        return pipeline.process_image(image_path, output_path, thickness=thickness)
+
+    timings["validate_mesh"], _ = _time(validate_cold, repeat)
+    timings["export"], _ = _time(lambda: export_mesh(mesh, output_path), repeat)
+    timings["end_to_end"], _ = _time(end_to_end, repeat)
+
+    counts = {
+        "contours": len(contours),
+        "contour_points": int(sum(len(c) for c in contours)),
+        "curves": len(curves),
+        "polygons": len(polygons),
+        "faces": 0 if mesh is None else len(mesh.faces),
+    }
+    return {"timings": timings, "counts": counts}
+
+
+def warm_up(pipeline, workdir):
+    """
+    Untimed end-to-end run on a small drawing, so the lazy imports (trimesh,
+    shapely, scipy) and other first-call costs don't land in the first
+    timed case, which is all there is with --repeat 1
+    """
+    image_path = os.path.join(workdir, "warm_up.png")
+    cv2.imwrite(image_path, generate("ring", 300))
+    pipeline.process_image(image_path, os.path.join(workdir, "warm_up.stl"))
+
+
+def run_suite(cases, repeat=3):
+    pipeline = JewelryCADPipeline(verbose=False)
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        warm_up(pipeline, workdir)
+        for name, kind, size, params in cases:
+            image_path = os.path.join(workdir, f"{name}.png")
+            cv2.imwrite(image_path, generate(kind, size, **params))
+            output_path = os.path.join(workdir, f"{name}.stl")
+            results[name] = bench_case(pipeline, image_path, output_path, repeat=repeat)
+            total = results[name]["timings"]["end_to_end"]
+            print(f"{name:28s} end-to-end {total * 1000:9.1f} ms")
+    return results
+
+
+def compare(results, baseline, tolerance=0.5, min_delta=0.005):
+    """
+    Return a list of regressions: stages that got slower than the baseline
+    by more than `tolerance` (relative) and `min_delta` seconds (absolute).
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for stage, seconds in result["timings"].items():
+            reference = baseline[name]["timings"].get(stage)
+            if reference is None:
+                continue
+            if seconds > reference * (1 + tolerance) and seconds - reference > min_delta:
+                regressions.append((name, stage, reference, seconds))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on synthetic drawings")
+    parser.add_argument("--full", action="store_true",
+                        help="Include 5k and 10k px drawings")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Allowed relative slowdown before a stage counts as a regression")
+    parser.add_argument("--output", default=None, help="Also write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = run_suite(FULL_CASES if args.full else QUICK_CASES, repeat=args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline found; run with --update-baseline first")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, tolerance=args.tolerance)
+    for name, stage, reference, seconds in regressions:
+        print(f"REGRESSION {name}/{stage}: {reference * 1000:.1f} ms -> {seconds * 1000:.1f} ms")
+    if regressions:
+        return 1
+    print("No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,80 @@
+# benchmarks/startup_benchmark.py
+import os
+import sys
+import argparse
+import subprocess
+import statistics
+import tempfile
+import time
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_drawings import generate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = os.path.join(ROOT, "cli.py")
+
+# Modules that a one-shot conversion must not import
+HEAVY_MODULES = ["matplotlib", "open3d", "torch", "torchvision"]
+
+
+def _run(command, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def loaded_heavy_modules(image_path, output_path):
+    """Heavy modules still imported by a one-shot CLI conversion"""
+    code = (
+        "import sys, cli; cli.main([%r, %r, '--quiet']); "
+        "print('HEAVY:' + ','.join(m for m in %r if m in sys.modules))"
+    ) % (image_path, output_path, HEAVY_MODULES)
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True,
+                         capture_output=True, text=True).stdout
+    marker = [line for line in out.splitlines() if line.startswith("HEAVY:")]
+    return [m for m in marker[-1][len("HEAVY:"):].split(",") if m] if marker else []
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure CLI startup and one-shot conversion time")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-startup", type=float, default=1.0,
+                        help="Fail if importing the pipeline takes longer (seconds)")
+    args = parser.parse_args(argv)
+
+    python = sys.executable
+    # Startup is judged on importing the pipeline; the one-shot conversion
+    # also pays for loading trimesh once the mesh is built
+    timings = {
+        "interpreter": _run([python, "-c", "pass"], args.repeat),
+        "cli_help": _run([python, CLI, "--help"], args.repeat),
+        "import_pipeline": _run([python, "-c", "import main"], args.repeat),
+    }
+
+    with tempfile.TemporaryDirectory() as workdir:
+        image_path = os.path.join(workdir, "ring.png")
+        output_path = os.path.join(workdir, "ring.stl")
+        cv2.imwrite(image_path, generate("ring", 500))
+        timings["one_shot_convert"] = _run(
+            [python, CLI, image_path, output_path, "--quiet"], args.repeat)
+        heavy = loaded_heavy_modules(image_path, output_path)
+
+    for name, seconds in timings.items():
+        print(f"{name:20s} {seconds * 1000:8.1f} ms")
+    if heavy:
+        print(f"Heavy modules imported during conversion: {', '.join(heavy)}")
+
+    failed = timings["import_pipeline"] > args.max_startup or bool(heavy)
+    print("FAIL" if failed else "OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,86 @@
+# benchmarks/synthetic_drawings.py
+import cv2
+import numpy as np
+
+PAPER = (235, 235, 235)
+INK = (40, 40, 40)
+
+
+def _blank(size):
+    return np.full((size, size, 3), PAPER, dtype=np.uint8)
+
+
+def _stroke(size):
+    # Line weight scales with resolution and stays wider than the 5x5
+    # morphology kernel, so every size traces the same way
+    return max(6, size // 120)
+
+
+def _add_paper_noise(image, seed):
+    rng = np.random.default_rng(seed)
+    noise = rng.integers(-12, 12, size=image.shape[:2], dtype=np.int16)
+    noisy = image.astype(np.int16) + noise[:, :, None]
+    return np.clip(noisy, 0, 255).astype(np.uint8)
+
+
+def draw_ring(size=1000, band=0.12, noise=False, seed=0):
+    """Top view of a plain band: two concentric outlines"""
+    image = _blank(size)
+    center = (size // 2, size // 2)
+    outer = int(size * 0.4)
+    inner = int(outer * (1 - band * 2))
+    cv2.circle(image, center, outer, INK, _stroke(size), cv2.LINE_AA)
+    cv2.circle(image, center, inner, INK, _stroke(size), cv2.LINE_AA)
+    return _add_paper_noise(image, seed) if noise else image
+
+
+def draw_pendant(size=1000, cutouts=12, noise=False, seed=0):
+    """Teardrop outline pierced with a grid of round cut-outs"""
+    image = _blank(size)
+    t = np.linspace(0, 2 * np.pi, 720, endpoint=False)
+    # Teardrop: x = sin(t) * sin(t/2)^m, y = cos(t)
+    x = np.sin(t) * np.sin(t / 2) ** 1.5
+    y = -np.cos(t)
+    outline = np.column_stack((0.5 + 0.38 * x, 0.5 + 0.42 * y)) * size
+    cv2.polylines(image, [outline.astype(np.int32)], True, INK, _stroke(size), cv2.LINE_AA)
+
+    # Place cut-outs on a grid inside the lower body of the drop
+    body = outline.astype(np.int32).reshape(-1, 1, 2)
+    cols = max(1, int(np.ceil(np.sqrt(cutouts))))
+    radius = max(3, int(size * 0.2 / (cols + 1)))
+    placed = 0
+    for row in range(cols * 2):
+        for col in range(cols):
+            if placed >= cutouts:
+                break
+            cx = int(size * (0.5 + (col - (cols - 1) / 2) * 0.5 / (cols + 1)))
+            cy = int(size * (0.45 + row * 0.45 / (cols * 2 + 1)))
+            if cv2.pointPolygonTest(body, (cx, cy), True) > radius * 1.5:
+                cv2.circle(image, (cx, cy), radius, INK, _stroke(size), cv2.LINE_AA)
+                placed += 1
+    return _add_paper_noise(image, seed) if noise else image
+
+
+def draw_filigree(size=1000, vertices=5000, lobes=48, noise=False, seed=0):
+    """Scalloped outline with fine ripples, giving thousands of contour vertices"""
+    image = _blank(size)
+    t = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    r = 0.36 + 0.04 * np.sin(lobes * t) + 0.008 * np.sin(lobes * 7 * t)
+    outline = np.column_stack((0.5 + r * np.cos(t), 0.5 + r * np.sin(t))) * size
+    cv2.polylines(image, [outline.astype(np.int32)], True, INK, _stroke(size), cv2.LINE_AA)
+
+    inner = np.column_stack((0.5 + r * 0.55 * np.cos(-t), 0.5 + r * 0.55 * np.sin(-t))) * size
+    cv2.polylines(image, [inner.astype(np.int32)], True, INK, _stroke(size), cv2.LINE_AA)
+    return _add_paper_noise(image, seed) if noise else image
+
+
+GENERATORS = {
+    "ring": draw_ring,
+    "pendant": draw_pendant,
+    "filigree": draw_filigree,
+}
+
+
+def generate(kind, size, **params):
+    """Render one synthetic drawing by generator name"""
+    return GENERATORS[kind](size=size, **params)
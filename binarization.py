@@ -0,0 +1,158 @@
+# binarization.py
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from contour_processor import contour_metrics
+
+STRATEGIES = ("fixed", "otsu", "adaptive", "clahe_otsu")
+
+# A contour at least this compact (4*pi*area / perimeter^2) encloses a region
+# rather than tracing an open stroke
+MIN_COMPACTNESS = 0.05
+
+
+def binarize(blurred, strategy, threshold=127, block_size=31, offset=10):
+    """
+    Threshold a blurred grayscale drawing (paper white, ink black). For the
+    Otsu strategies threshold=None computes the threshold and a number
+    reuses one picked earlier. Returns the mask and the threshold used
+    (None for adaptive).
+    """
+    if strategy == "adaptive":
+        binary = cv2.adaptiveThreshold(blurred, 255, cv2.ADAPTIVE_THRESH_MEAN_C,
+                                       cv2.THRESH_BINARY, block_size, offset)
+        return binary, None
+    if strategy == "clahe_otsu":
+        blurred = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(blurred)
+    elif strategy not in ("fixed", "otsu"):
+        raise ValueError(f"Unknown binarization strategy: {strategy}")
+    if strategy != "fixed" and threshold is None:
+        threshold, binary = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    else:
+        threshold, binary = cv2.threshold(blurred, threshold, 255, cv2.THRESH_BINARY)
+    return binary, float(threshold)
+
+
+def otsu_threshold(hist):
+    """Otsu's threshold of a 256-bin histogram, the level cv2.THRESH_OTSU picks"""
+    hist = np.asarray(hist, dtype=np.float64).ravel()
+    count = np.cumsum(hist)
+    moment = np.cumsum(hist * np.arange(len(hist)))
+    total, mean = count[-1], moment[-1]
+    # Between-class variance up to a constant factor
+    spread = count * (total - count)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = np.where(spread > 0, (moment * total - mean * count) ** 2 / spread, 0.0)
+    return float(np.argmax(between))
+
+
+def sampled_otsu_threshold(image, blur_kernel, rows=16, every=8):
+    """
+    Otsu threshold of a BGR image after the full-resolution gray conversion
+    and blur, from a histogram of `rows`-row strips, one in every `every`.
+    Each strip is blurred with enough rows around it that its values are
+    those of the full-frame blur, so unlike a downsampled copy the paper
+    noise keeps its full-resolution spread.
+    """
+    height = image.shape[0]
+    reach = blur_kernel // 2
+    hist = np.zeros(256, dtype=np.int64)
+    for y0 in range(0, height, rows * every):
+        y1 = min(y0 + rows, height)
+        py0, py1 = max(y0 - reach, 0), min(y1 + reach, height)
+        gray = cv2.cvtColor(image[py0:py1], cv2.COLOR_BGR2GRAY)
+        blurred = cv2.GaussianBlur(gray, (blur_kernel, blur_kernel), 0)
+        hist += np.bincount(blurred[y0 - py0:y1 - py0].ravel(), minlength=256)
+    return otsu_threshold(hist)
+
+
+def clean_mask(binary, morph_kernel):
+    """Close then open with a square kernel to drop specks and pinholes"""
+    kernel = np.ones((morph_kernel, morph_kernel), np.uint8)
+    cleaned = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
+    return cv2.morphologyEx(cleaned, cv2.MORPH_OPEN, kernel)
+
+
+def score_mask(mask, min_contour_length=50):
+    """
+    Cheap quality score of a mask (higher is better), from one contour pass:
+    the share of significant contours that enclose a region, the share of
+    contours rejected as noise and their area, and the number of
+    significant contours (extra contours for the same drawing are usually
+    artefacts). Ink on the page border, where shadows and scanner edges
+    end up, is penalised too. A mask with no ink, or almost only ink,
+    scores -inf.
+    """
+    ink = 1.0 - cv2.countNonZero(mask) / mask.size
+    border = np.concatenate([mask[0], mask[-1], mask[1:-1, 0], mask[1:-1, -1]])
+    border_ink = float(np.mean(border == 0))
+    contours, _ = cv2.findContours(mask, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    metrics = contour_metrics(contours)
+    lengths, areas = metrics["lengths"], metrics["areas"]
+    kept = lengths > min_contour_length
+    count = int(kept.sum())
+    stats = {
+        "ink_fraction": ink,
+        "border_ink": border_ink,
+        "contours": len(contours),
+        "significant_contours": count,
+        "closed_ratio": 0.0,
+        "noise_ratio": float((~kept).sum() / len(contours)) if len(contours) else 0.0,
+        "noise_area": float(areas[~kept].sum() / mask.size) if len(contours) else 0.0,
+    }
+    if count == 0 or ink <= 0.0 or ink >= 0.9:
+        stats["score"] = float("-inf")
+        return stats
+    compactness = 4 * np.pi * areas[kept] / np.maximum(lengths[kept], 1e-12) ** 2
+    stats["closed_ratio"] = float(np.mean(compactness >= MIN_COMPACTNESS))
+    stats["score"] = float(stats["closed_ratio"] - stats["noise_ratio"] - 10 * stats["noise_area"]
+                           - border_ink - 0.1 * np.log10(1 + count))
+    return stats
+
+
+class AutoBinarizer:
+    """
+    Evaluate several binarization strategies on one shared blurred image, on
+    a thread pool (the OpenCV calls release the GIL), and keep the mask with
+    the best score_mask. Ties go to the earlier strategy, so a drawing that
+    every strategy handles keeps the fixed threshold.
+    """
+
+    def __init__(self, strategies=STRATEGIES, threshold=127, block_size=31, offset=10,
+                 workers=None):
+        self.strategies = tuple(strategies)
+        self.threshold = threshold
+        self.block_size = block_size
+        self.offset = offset
+        self.workers = workers
+
+    def evaluate(self, blurred, morph_kernel, min_contour_length=50, scale=1):
+        """Return one candidate per strategy: its mask, threshold and score stats"""
+        block_size = max(3, self.block_size // scale) | 1
+
+        def candidate(strategy):
+            threshold = self.threshold if strategy == "fixed" else None
+            binary, threshold = binarize(blurred, strategy, threshold, block_size, self.offset)
+            mask = clean_mask(binary, morph_kernel)
+            stats = score_mask(mask, min_contour_length)
+            return dict(stats, strategy=strategy, threshold=threshold, mask=mask)
+
+        workers = min(len(self.strategies), self.workers or os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(candidate, self.strategies))
+
+    def select(self, blurred, morph_kernel, min_contour_length=50, scale=1):
+        """
+        Return the winning mask and a record of the choice: the strategy,
+        its threshold and the score stats of every candidate.
+        """
+        candidates = self.evaluate(blurred, morph_kernel, min_contour_length, scale)
+        best = max(candidates, key=lambda c: c["score"])
+        choice = {
+            "strategy": best["strategy"],
+            "threshold": best["threshold"],
+            "candidates": [{k: v for k, v in c.items() if k != "mask"} for c in candidates],
+        }
+        return best["mask"], choice
@@ -1,103 +1,173 @@
 # cad_generator.py
 import numpy as np
-import trimesh
-from shapely.geometry import Polygon, LinearRing
+import shapely
+from curve_set import CurveSet
+from extrusion import extrude_polygon, extrude_polygons
 
 class CADGenerator:
-    def __init__(self):
-        pass
+    def __init__(self, verbose=True, multi_component=False, triangulation_workers=None):
+        self.verbose = verbose
+        # Extrude every polygon instead of only the largest one
+        self.multi_component = multi_component
+        self.triangulation_workers = triangulation_workers
+    
+    def log(self, message):
+        if self.verbose:
+            print(message)
     
     def create_cad_geometry(self, vector_curves):
-        # Convert vector curves to polygons
-        polygons = []
+        """
+        Turn curves (a CurveSet or a list of curve dicts) into polygons.
+        Rings and polygons are built and checked in bulk with shapely's
+        vectorized constructors instead of one Polygon per curve.
+        """
+        curves = CurveSet.from_curves(vector_curves)
+        if len(curves) == 0:
+            return []
+        
+        # Curves that carry contour nesting are turned into polygons with holes
+        if curves.has_parents:
+            return self.build_polygons_from_tree(curves)
+        
+        ok = ring_mask(curves)
+        polygons = shapely.polygons(curve_rings(curves.subset(ok)))
+        keep = shapely.is_valid(polygons) & ~shapely.is_empty(polygons)
+        return list(polygons[keep])
+    
+    def build_polygons_from_tree(self, vector_curves):
+        """
+        Build polygons with interiors from the contour hierarchy.
+        
+        Curves at even depth in the tree are outer boundaries and curves at
+        odd depth are holes of their parent, so the tree pairs every cut-out
+        with its shell without containment tests. The contour filters keep
+        this parity equal to the depth in the unfiltered trace (keep_parity).
+        """
+        curves = CurveSet.from_curves(vector_curves)
+        n = len(curves)
+        if n == 0:
+            return []
+        
+        # Parent position in this set, found by contour_index (-1 for none)
+        order = np.argsort(curves.contour_index, kind="stable")
+        sorted_index = curves.contour_index[order]
+        pos = np.clip(np.searchsorted(sorted_index, curves.parent_index), 0, n - 1)
+        parent = np.where(sorted_index[pos] == curves.parent_index, order[pos], -1)
+        
+        # Depth of every curve: one array step per tree level
+        depth = np.zeros(n, dtype=np.int64)
+        ancestor = parent.copy()
+        while True:
+            active = ancestor != -1
+            if not active.any():
+                break
+            depth += active
+            ancestor = np.where(active, parent[ancestor], -1)
+        
+        ok = ring_mask(curves)
+        shells = np.flatnonzero((depth % 2 == 0) & ok)
+        slot = np.full(n, -1, dtype=np.int64)
+        slot[shells] = np.arange(len(shells))
+        is_hole = (depth % 2 == 1) & ok
+        is_hole[is_hole] = slot[parent[is_hole]] >= 0
+        holes = np.flatnonzero(is_hole)
+        if len(shells) == 0:
+            return []
         
-        for curve in vector_curves:
-            if curve["type"] == "polyline" and len(curve["points"]) > 2:
-                try:
-                    points = np.array(curve["points"])
-                    polygon = Polygon(points)
-                    if polygon.is_valid and not polygon.is_empty:
-                        polygons.append(polygon)
-                except Exception as e:
-                    print(f"Warning: Could not create polygon from curve: {e}")
-                    continue
+        # Each polygon's shell ring followed by its holes, in curve order
+        ring_curve = np.concatenate((shells, holes))
+        ring_slot = np.concatenate((slot[shells], slot[parent[holes]]))
+        ring_is_hole = np.concatenate((np.zeros(len(shells), bool), np.ones(len(holes), bool)))
+        ring_order = np.lexsort((ring_curve, ring_is_hole, ring_slot))
         
-        return polygons
+        rings = curve_rings(curves.subset(ok))
+        rank = np.cumsum(ok) - 1
+        polygons = shapely.polygons(
+            rings[rank[ring_curve[ring_order]]], indices=ring_slot[ring_order])
+        
+        # Simplification can make a hole graze its shell
+        invalid = ~shapely.is_valid(polygons)
+        if invalid.any():
+            polygons[invalid] = shapely.buffer(polygons[invalid], 0)
+        
+        parts = shapely.get_parts(polygons)
+        keep = shapely.is_valid(parts) & ~shapely.is_empty(parts)
+        return list(parts[keep])
     
     def extrude_to_3d(self, polygons, thickness=2.0):
         if not polygons:
-            print("No valid polygons to extrude")
+            self.log("No valid polygons to extrude")
             return None
             
         try:
             # Find the largest valid polygon (main shape)
-            valid_polygons = [p for p in polygons if p.is_valid and not p.is_empty]
+            valid_polygons = self.extruded_polygons(polygons)
             if not valid_polygons:
-                print("No valid polygons found")
+                self.log("No valid polygons found")
                 return None
                 
-            main_poly = max(valid_polygons, key=lambda p: p.area)
-            
-            print(f"Extruding polygon with area: {main_poly.area:.2f}")
-            
-            # Try to extrude with different engines
-            try:
-                # First try with default engine
-                mesh = trimesh.creation.extrude_polygon(main_poly, height=thickness)
-            except:
-                # Fallback: try with explicit engine
-                try:
-                    mesh = trimesh.creation.extrude_polygon(main_poly, height=thickness, engine='triangle')
-                except:
-                    # Final fallback: create simple geometry manually
-                    mesh = self.create_simple_extrusion(main_poly, thickness)
+            if self.multi_component:
+                self.log(f"Extruding {len(valid_polygons)} components")
+                mesh = self.create_multi_extrusion(valid_polygons, thickness)
+            else:
+                main_poly = valid_polygons[0]
+                
+                self.log(f"Extruding polygon with area: {main_poly.area:.2f}")
+                
+                mesh = self.create_simple_extrusion(main_poly, thickness)
             
             if mesh is None:
-                print("Extrusion failed, creating fallback mesh")
-                mesh = self.create_simple_extrusion(main_poly, thickness)
+                self.log("Extrusion failed, creating fallback mesh")
+                mesh = self.create_simple_fallback(thickness)
             
             return mesh
             
         except Exception as e:
-            print(f"Extrusion error: {e}")
+            self.log(f"Extrusion error: {e}")
             # Create a simple fallback mesh
             return self.create_simple_fallback(thickness)
     
+    def extruded_polygons(self, polygons):
+        """The polygons extrude_to_3d uses: every valid one, or just the largest"""
+        valid_polygons = [p for p in polygons if p.is_valid and not p.is_empty]
+        if self.multi_component or not valid_polygons:
+            return valid_polygons
+        return [max(valid_polygons, key=lambda p: p.area)]
+    
     def create_simple_extrusion(self, polygon, thickness):
-        """Create extrusion without relying on triangulation engines"""
+        """Create a watertight prism (holes included) with the native extrusion engine"""
         try:
-            # Get the exterior coordinates
-            exterior = np.array(polygon.exterior.coords)
-            
-            # Create a simple prism manually
-            vertices = []
-            faces = []
-            
-            # Create bottom vertices
-            for point in exterior:
-                vertices.append([point[0], point[1], 0])
+            # trimesh is slow to import, so only load it once a mesh is built
+            import trimesh
+            vertices, faces = extrude_polygon(polygon, thickness)
+            if len(faces) == 0:
+                return None
             
-            # Create top vertices
-            for point in exterior:
-                vertices.append([point[0], point[1], thickness])
+            # Arrays are already clean, so skip trimesh's merge/cleanup pass
+            return trimesh.Trimesh(vertices=vertices, faces=faces, process=False)
             
-            # Create side faces
-            n = len(exterior)
-            for i in range(n):
-                j = (i + 1) % n
-                faces.append([i, j, j + n])
-                faces.append([j + n, i + n, i])
+        except Exception as e:
+            self.log(f"Native extrusion failed: {e}")
+            return self.create_simple_fallback(thickness)
+    
+    def create_multi_extrusion(self, polygons, thickness):
+        """Extrude all polygons into one mesh built in preallocated buffers"""
+        try:
+            import trimesh
+            vertices, faces = extrude_polygons(
+                polygons, thickness, workers=self.triangulation_workers)
+            if len(faces) == 0:
+                return None
             
-            # Create bottom and top faces using ear clipping
-            # For simplicity, just create a basic mesh
-            mesh = trimesh.Trimesh(vertices=vertices, faces=faces)
-            return mesh
+            return trimesh.Trimesh(vertices=vertices, faces=faces, process=False)
             
-        except:
+        except Exception as e:
+            self.log(f"Native extrusion failed: {e}")
             return self.create_simple_fallback(thickness)
     
     def create_simple_fallback(self, thickness):
         """Create a simple fallback mesh"""
+        import trimesh
         try:
             return trimesh.creation.box([30, 30, thickness])
         except:
@@ -115,3 +185,20 @@ class CADGenerator:
                 [3, 0, 4], [4, 7, 3]   # left
             ])
             return trimesh.Trimesh(vertices=vertices, faces=faces)
+
+
+def ring_mask(curves):
+    """Curves with enough distinct points to form a ring once closed"""
+    if len(curves) == 0:
+        return np.zeros(0, dtype=bool)
+    first = curves.coords[curves.offsets[:-1]]
+    last = curves.coords[curves.offsets[1:] - 1]
+    already_closed = np.all(first == last, axis=1)
+    return curves.lengths - already_closed >= 3
+
+
+def curve_rings(curves):
+    """One LinearRing per curve, built in a single vectorized call"""
+    if len(curves) == 0:
+        return np.empty(0, dtype=object)
+    return shapely.linearrings(curves.coords, indices=curves.curve_ids())
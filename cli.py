@@ -0,0 +1,121 @@
+# cli.py
+"""
+Command-line entry point: python cli.py drawing.png model.stl --thickness 1.5
+
+Only argparse is imported at module level. The pipeline (OpenCV, NumPy,
+shapely) is loaded once the arguments are valid, trimesh once a mesh is
+built, and Open3D only when --view is requested.
+"""
+import argparse
+import os
+import sys
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="cli.py",
+        description="Convert a jewelry drawing into a 3D-printable STL",
+    )
+    parser.add_argument("input", help="Drawing to convert (PNG, JPG, BMP, or SVG paths)")
+    parser.add_argument("output", nargs="?", default=None,
+                        help="Output STL path (default: input name with .stl)")
+    parser.add_argument("-t", "--thickness", type=float, default=2.0,
+                        help="Extrusion thickness (default: 2.0)")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="Suppress progress output")
+    parser.add_argument("--validation", choices=["fast", "full"], default="full",
+                        help="Validation profile (default: full)")
+    parser.add_argument("--all-components", action="store_true",
+                        help="Extrude every part of a multi-part design, not just the largest")
+    parser.add_argument("--spline-tolerance", type=float, default=None, metavar="PX",
+                        help="Fit smooth curves to this chordal tolerance instead of polygons")
+    parser.add_argument("--svg-tolerance", type=float, default=0.1, metavar="UNITS",
+                        help="Flattening tolerance for SVG curves and arcs (default: 0.1)")
+    parser.add_argument("--binarization", default="fixed",
+                        choices=["fixed", "otsu", "adaptive", "clahe_otsu", "auto"],
+                        help="Thresholding strategy; auto scores all of them and keeps the best")
+    parser.add_argument("--min-wall", type=float, default=None, metavar="MM",
+                        help="Flag walls thinner than this, from the 2D outline")
+    parser.add_argument("--pixel-size", type=float, default=None, metavar="MM",
+                        help="Millimetres per drawing pixel for --min-wall (without it, "
+                             "widths are reported in pixels)")
+    parser.add_argument("--wall-heatmap", default=None, metavar="PNG",
+                        help="Write the wall-thickness heatmap (needs --min-wall)")
+    parser.add_argument("--pyramid", type=int, default=None, metavar="FACTOR",
+                        help="Binarize at 1/FACTOR and refine only near edges (large scans)")
+    parser.add_argument("--lod", type=int, nargs="+", default=None, metavar="FACES",
+                        help="Also write decimated copies with at most these face counts")
+    parser.add_argument("--lod-tolerance", type=float, nargs="+", default=None, metavar="ERROR",
+                        help="Also write decimated copies within these geometric errors")
+    parser.add_argument("--cache-dir", default=None,
+                        help="Reuse stage outputs cached in this folder")
+    parser.add_argument("--trace-dir", default=None,
+                        help="Write a JSON timing trace to this folder")
+    parser.add_argument("--diagnostics", default=None, metavar="PNG",
+                        help="Also render the processing steps to this image")
+    parser.add_argument("--view", action="store_true",
+                        help="Open the mesh in the Open3D viewer")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    output = args.output or os.path.splitext(args.input)[0] + ".stl"
+
+    from main import JewelryCADPipeline
+
+    pipeline = JewelryCADPipeline(
+        cache_dir=args.cache_dir,
+        trace_dir=args.trace_dir,
+        verbose=not args.quiet,
+        validation_profile=args.validation,
+        multi_component=args.all_components,
+        spline_tolerance=args.spline_tolerance,
+        pyramid_factor=args.pyramid,
+        binarization=args.binarization,
+        min_wall_mm=args.min_wall,
+        pixel_size_mm=args.pixel_size,
+        svg_tolerance=args.svg_tolerance,
+        lod_face_budgets=args.lod,
+        lod_tolerances=args.lod_tolerance,
+    )
+    try:
+        result = pipeline.process_image(args.input, output, thickness=args.thickness)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    validation = result["validation"]
+    print(f"{output}: {'PASS' if validation['is_valid'] else 'FAIL'}")
+    if args.binarization == "auto" and result.get("binarization"):
+        print(f"  binarization: {result['binarization']['strategy']}")
+    for issue in validation["issues"]:
+        print(f"  - {issue}")
+    walls = validation.get("wall_thickness")
+    if walls is not None and walls["min_wall_found_mm"] is not None:
+        unit = "mm" if walls["calibrated"] else "px (uncalibrated: set --pixel-size for mm)"
+        print(f"  narrowest wall: {walls['min_wall_found_mm']:.3f} {unit} "
+              f"({len(walls['thin_regions'])} thin region(s), {walls['time'] * 1000:.0f} ms)")
+        if args.wall_heatmap and walls.get("heatmap") is not None:
+            import cv2
+            cv2.imwrite(args.wall_heatmap, walls["heatmap"])
+    for lod in result.get("lods", []):
+        print(f"{lod['path']}: {lod['face_count']} faces, "
+              f"{'PASS' if lod['is_valid'] else 'FAIL'}")
+
+    if args.diagnostics or args.view:
+        from utils.visualization import Visualization
+        visualization = Visualization()
+        if args.diagnostics:
+            visualization.draw_processing_steps(result, args.diagnostics)
+        if args.view:
+            # The lightest level of detail, when there is one, keeps the viewer responsive
+            lods = result.get("lods")
+            visualization.visualize_3d_mesh(lods[-1]["mesh"] if lods else result["mesh"])
+
+    return 0 if validation["is_valid"] else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,63 +1,313 @@
 # contour_processor.py
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import cv2
 import numpy as np
-from scipy import interpolate
+from curve_set import CurveSet
+
+# Below this many contours simplification runs inline, not on the pool
+PARALLEL_MIN_CONTOURS = 512
 
 class ContourProcessor:
-    def __init__(self, min_contour_length=50, epsilon_factor=0.01):
+    def __init__(self, min_contour_length=50, epsilon_factor=0.01, verbose=True,
+                 min_contour_area=0, despeckle_area=0, workers=None,
+                 spline_tolerance=None, spline_max_vertices=None):
         self.min_contour_length = min_contour_length
         self.epsilon_factor = epsilon_factor
+        self.verbose = verbose
+        # Contours enclosing less area than this are treated as paper noise
+        self.min_contour_area = min_contour_area
+        # Specks up to this many pixels are erased from the mask before tracing
+        self.despeckle_area = despeckle_area
+        # Threads for Douglas-Peucker simplification (None = all cores)
+        self.workers = workers
+        # Spline fitting replaces Douglas-Peucker output when either is set:
+        # chordal tolerance in pixels (against a spline kept within a pixel of
+        # the contour) and an optional vertex budget per curve
+        self.spline_tolerance = spline_tolerance
+        self.spline_max_vertices = spline_max_vertices
+        # Counts from the most recent calls, read by the pipeline trace
+        self.stats = {}
+    
+    def log(self, message):
+        if self.verbose:
+            print(message)
+    
+    def detection_params(self):
+        """Parameters that change the output of detect_contour_tree"""
+        params = {"min_contour_length": self.min_contour_length}
+        if self.min_contour_area > 0:
+            params["min_contour_area"] = self.min_contour_area
+        if self.despeckle_area > 0:
+            params["despeckle_area"] = self.despeckle_area
+        return params
     
     def detect_contours(self, binary_image):
+        contours, _ = self.detect_contour_tree(binary_image)
+        return contours
+    
+    def detect_contour_tree(self, binary_image):
+        """
+        Detect contours and keep the nesting from RETR_TREE.
+        Returns the filtered contours and, for each one, the index of its
+        nearest surviving ancestor in the filtered list (-1 for top level).
+        """
+        if self.despeckle_area > 0:
+            binary_image = despeckle(binary_image, self.despeckle_area)
+        
         contours, hierarchy = cv2.findContours(
             binary_image, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE
         )
         
-        print(f"Found {len(contours)} contours initially")
+        self.stats["contours_found"] = len(contours)
+        self.log(f"Found {len(contours)} contours initially")
         
-        # Filter small contours
-        filtered_contours = [
-            cnt for cnt in contours 
-            if cv2.arcLength(cnt, True) > self.min_contour_length
-        ]
+        # Reject noise on lengths and areas computed for all contours at once
+        metrics = contour_metrics(contours)
+        keep = metrics["lengths"] > self.min_contour_length
+        if self.min_contour_area > 0:
+            keep &= metrics["areas"] >= self.min_contour_area
         
-        print(f"After filtering: {len(filtered_contours)} contours")
-        return filtered_contours
+        # Drop survivors the filtering would flip between solid and hole
+        parents = hierarchy[0][:, 3] if hierarchy is not None else []
+        keep = keep_parity(parents, keep)
+        filtered_contours = [contours[i] for i in np.flatnonzero(keep)]
+        filtered_parents = remap_parents(parents, keep)
+        
+        self.log(f"After filtering: {len(filtered_contours)} contours")
+        return filtered_contours, filtered_parents
     
     def refine_contours(self, contours):
-        refined_contours = []
-        for i, contour in enumerate(contours):
-            # Approximate contour with fewer points
-            epsilon = self.epsilon_factor * cv2.arcLength(contour, True)
-            approx = cv2.approxPolyDP(contour, epsilon, True)
-            
-            # Only keep contours with enough points
-            if len(approx) >= 3:
-                refined_contours.append(approx)
-        
-        print(f"After refinement: {len(refined_contours)} contours")
+        refined_contours, _ = self.refine_contour_tree(contours)
         return refined_contours
     
-    def vectorize_contours(self, contours):
-        vector_curves = []
-        
-        for i, contour in enumerate(contours):
-            points = contour.reshape(-1, 2)
-            if len(points) >= 3:  # Ensure we have at least 3 points
-                # Check if contour is closed (first and last points are close)
-                if np.linalg.norm(points[0] - points[-1]) < 10:
-                    is_closed = True
-                else:
-                    is_closed = False
-                
-                curve = {
-                    "type": "polyline",
-                    "points": points.tolist(),
-                    "is_closed": is_closed,
-                    "contour_index": i
-                }
-                vector_curves.append(curve)
-                print(f"Contour {i}: {len(points)} points, closed: {is_closed}")
-        
-        print(f"Vectorized {len(vector_curves)} curves")
+    def refine_contour_tree(self, contours, parents=None):
+        if parents is None:
+            parents = [-1] * len(contours)
+        
+        # Approximate contours with fewer points; perimeters come from one batched pass
+        epsilons = self.epsilon_factor * contour_metrics(contours)["lengths"]
+        approximations = self.simplify(contours, epsilons)
+        
+        # Only keep contours with enough points, without flipping solid and hole
+        keep = keep_parity(parents, [len(approx) >= 3 for approx in approximations])
+        refined_contours = [approx for approx, k in zip(approximations, keep) if k]
+        
+        self.log(f"After refinement: {len(refined_contours)} contours")
+        return refined_contours, remap_parents(parents, keep)
+    
+    def simplify(self, contours, epsilons):
+        """Douglas-Peucker on every contour, split across a thread pool for large inputs"""
+        def run(start, stop):
+            return [cv2.approxPolyDP(contours[i], float(epsilons[i]), True) for i in range(start, stop)]
+        
+        n = len(contours)
+        workers = self.workers or os.cpu_count() or 1
+        if n < PARALLEL_MIN_CONTOURS or workers <= 1:
+            return run(0, n)
+        
+        # OpenCV releases the GIL, so chunks of contours simplify in parallel
+        bounds = np.linspace(0, n, workers * 4 + 1).astype(int)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            chunks = executor.map(run, bounds[:-1], bounds[1:])
+            return [approx for chunk in chunks for approx in chunk]
+    
+    def vectorize_contours(self, contours, parents=None):
+        """
+        Pack contours with at least 3 points into one CurveSet. A curve is
+        closed when its first and last points are close; parents (if given)
+        become parent_index, referring to the parent's contour_index.
+        """
+        vector_curves = CurveSet.from_contours(contours, parents)
+        
+        if self.verbose:
+            for i, length, is_closed in zip(vector_curves.contour_index, vector_curves.lengths,
+                                            vector_curves.is_closed):
+                print(f"Contour {i}: {length} points, closed: {is_closed}")
+        
+        self.log(f"Vectorized {len(vector_curves)} curves")
         return vector_curves
+    
+    @property
+    def fits_splines(self):
+        return self.spline_tolerance is not None or self.spline_max_vertices is not None
+    
+    def fit_params(self):
+        return {
+            "spline_tolerance": self.spline_tolerance or 0.25,
+            "spline_max_vertices": self.spline_max_vertices,
+        }
+    
+    def fit_curves(self, contours, parents=None):
+        """
+        Fit smoothing splines to the (unsimplified) contours and resample
+        them by curvature to the chordal tolerance or vertex budget.
+        Returns a CurveSet of closed curves with the contour tree kept.
+        """
+        from curve_fitting import fit_contour
+        
+        if parents is None:
+            parents = [-1] * len(contours)
+        params = self.fit_params()
+        
+        fitted = []
+        keep = []
+        for contour in contours:
+            points = fit_contour(contour, tolerance=params["spline_tolerance"],
+                                 max_vertices=params["spline_max_vertices"])
+            keep.append(len(points) >= 3)
+            fitted.append(points)
+        
+        keep = keep_parity(parents, keep)
+        fitted = [points for points, k in zip(fitted, keep) if k]
+        curves = CurveSet.from_contours(fitted, remap_parents(parents, keep), close_tolerance=np.inf)
+        self.log(f"Fitted {len(curves)} spline curves "
+                 f"({len(curves.coords)} vertices from {sum(len(c) for c in contours)} contour points)")
+        return curves
+
+
+def despeckle(mask, max_area):
+    """
+    Erase white specks and fill black pinholes of at most max_area pixels
+    with one connected-components pass per polarity, so paper texture never
+    reaches contour tracing (whose hierarchy step slows down sharply with
+    tens of thousands of holes). A contour cannot be longer than about
+    6 * area, so max_area <= min_contour_length / 6 leaves the result unchanged.
+    """
+    cleaned = np.array(mask, dtype=np.uint8, copy=True)
+    
+    # Foreground is traced 8-connected and holes 4-connected, as in findContours
+    for value, connectivity in ((255, 8), (0, 4)):
+        region = (cleaned == value) if value == 0 else (cleaned > 0)
+        _, labels, stats, _ = cv2.connectedComponentsWithStats(
+            region.astype(np.uint8), connectivity=connectivity)
+        small = stats[:, cv2.CC_STAT_AREA] <= max_area
+        small[0] = False  # label 0 is the other polarity
+        if value == 0:
+            # Pinholes open to the image border are part of the outline, not noise
+            x, y, w, h = (stats[:, i] for i in range(4))
+            height, width = cleaned.shape
+            small &= (x > 0) & (y > 0) & (x + w < width) & (y + h < height)
+        cleaned[small[labels]] = 255 - value
+    return cleaned
+
+
+def contour_metrics(contours):
+    """
+    Closed perimeter, enclosed area and bounding box (x, y, w, h) of every
+    contour, computed over one flat point buffer with reduceat instead of
+    one OpenCV call per contour. Perimeters follow cv2.arcLength: float32
+    segment lengths summed from the closing segment onwards.
+    """
+    n = len(contours)
+    if n == 0:
+        return {
+            "lengths": np.zeros(0),
+            "areas": np.zeros(0),
+            "bboxes": np.zeros((0, 4), dtype=np.int64),
+        }
+    
+    counts = np.fromiter((len(c) for c in contours), dtype=np.int64, count=n)
+    starts = np.zeros(n, dtype=np.int64)
+    np.cumsum(counts[:-1], out=starts[1:])
+    ends = starts + counts - 1
+    points = np.concatenate(contours).reshape(-1, 2)
+    
+    # Step from every point's predecessor on its closed contour; the first
+    # point of each contour steps from that contour's last point
+    p = points.astype(np.float32)
+    d = np.empty_like(p)
+    d[1:] = p[1:] - p[:-1]
+    d[starts] = p[starts] - p[ends]
+    segments = np.sqrt(d[:, 0] * d[:, 0] + d[:, 1] * d[:, 1]).astype(np.float64)
+    lengths = np.add.reduceat(segments, starts)
+    
+    # Shoelace formula; integer coordinates keep the sums exact
+    x = points[:, 0].astype(np.float64)
+    y = points[:, 1].astype(np.float64)
+    cross = np.empty_like(x)
+    cross[1:] = x[:-1] * y[1:] - x[1:] * y[:-1]
+    cross[starts] = x[ends] * y[starts] - x[starts] * y[ends]
+    areas = np.abs(np.add.reduceat(cross, starts)) / 2
+    
+    mins = np.minimum.reduceat(points, starts)
+    maxs = np.maximum.reduceat(points, starts)
+    bboxes = np.column_stack((mins, maxs - mins + 1)).astype(np.int64)
+    
+    return {"lengths": lengths, "areas": areas, "bboxes": bboxes}
+
+
+def tree_depths(parents):
+    """Nesting depth of every contour in a parent-index tree (0 for top level)"""
+    parents = np.asarray(parents, dtype=np.int64)
+    depth = np.zeros(len(parents), dtype=np.int64)
+    ancestor = parents.copy()
+    while True:
+        active = ancestor != -1
+        if not active.any():
+            return depth
+        depth += active
+        ancestor = np.where(active, parents[ancestor], -1)
+
+
+def keep_parity(parents, keep):
+    """
+    Clear keep for contours that filtering would flip between solid and hole.
+
+    Extrusion reads shells and holes back from depth parity in the filtered
+    tree, so the depth is taken from the unfiltered parents here. A kept
+    contour whose nearest kept ancestor has the same parity sits in a region
+    that filtering turned into its own kind (an island in a dropped hole, a
+    hole in a dropped island) and would otherwise be cut out or filled
+    inverted; it is dropped and its descendants resolve past it with the
+    right parity. Returns the new keep mask.
+    """
+    parents = np.asarray(parents, dtype=np.int64)
+    keep = np.array(keep, dtype=bool)
+    depth = tree_depths(parents)
+    # nearest[i]: nearest kept ancestor-or-self of i; parents come first by depth
+    nearest = np.full(len(parents), -1, dtype=np.int64)
+    for i in np.argsort(depth, kind="stable"):
+        parent = parents[i]
+        ancestor = nearest[parent] if parent != -1 else -1
+        if keep[i] and ancestor != -1 and (depth[i] - depth[ancestor]) % 2 == 0:
+            keep[i] = False
+        nearest[i] = i if keep[i] else ancestor
+    return keep
+
+
+def remap_parents(parents, keep):
+    """
+    Re-point every kept contour at its nearest kept ancestor after filtering.
+
+    parents[i] is the index of contour i's parent (-1 for none) and keep[i]
+    says whether contour i survives. Returns parent indices into the list of
+    kept contours. Runs in linear time: each ancestor chain is resolved once
+    and memoized.
+    """
+    n = len(parents)
+    new_index = np.cumsum(keep) - 1 if n else []
+    # resolved[i]: nearest kept ancestor-or-self of i (-1 for none), -2 unknown
+    resolved = [-2] * n
+    
+    def resolve(i):
+        path = []
+        while i != -1 and resolved[i] == -2:
+            if keep[i]:
+                resolved[i] = i
+                break
+            path.append(i)
+            i = int(parents[i])
+        result = -1 if i == -1 else resolved[i]
+        for j in path:
+            resolved[j] = result
+        return result
+    
+    new_parents = []
+    for i in range(n):
+        if keep[i]:
+            parent = int(parents[i])
+            ancestor = resolve(parent) if parent != -1 else -1
+            new_parents.append(int(new_index[ancestor]) if ancestor != -1 else -1)
+    return new_parents
@@ -0,0 +1,313 @@
+# conversion_service.py
+import os
+import json
+import time
+import queue
+import argparse
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import batch_processor
+
+# Input types the pipeline reads, accepted by ?format=
+SUPPORTED_FORMATS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".svg")
+
+
+def _convert_bytes(data, suffix, thickness):
+    """Run in a warm worker: convert image bytes and return the STL bytes"""
+    with tempfile.TemporaryDirectory() as workdir:
+        image_path = os.path.join(workdir, "drawing" + suffix)
+        output_path = os.path.join(workdir, "drawing.stl")
+        with open(image_path, "wb") as f:
+            f.write(data)
+        start = time.perf_counter()
+        result = batch_processor._worker_pipeline.process_image(
+            image_path, output_path, thickness=thickness)
+        elapsed = time.perf_counter() - start
+        with open(output_path, "rb") as f:
+            stl = f.read()
+    report = {
+        "is_valid": result["validation"]["is_valid"],
+        "issues": list(result["validation"]["issues"]),
+        "processing_time": elapsed,
+    }
+    return stl, report
+
+
+class ConversionService:
+    """
+    Long-running local conversion service around JewelryCADPipeline.
+
+    Requests are queued in a bounded queue and dispatched to a pool of warm
+    worker processes, each holding one pipeline. When the queue is full new
+    requests are rejected with 503 instead of piling up, and bodies over
+    max_body_bytes with 413.
+
+    POST /convert?thickness=2.0&format=png
+                                  body: image bytes -> STL bytes
+                                  (validation report in X-Validation-Report)
+    GET  /status                  queue depth, in-flight jobs and latencies
+    """
+
+    def __init__(self, pipeline=None, host="127.0.0.1", port=8765, workers=None,
+                 queue_size=16, cv_threads=1, use_processes=True, max_body_bytes=64 * 1024 ** 2):
+        if pipeline is None:
+            from main import JewelryCADPipeline
+            pipeline = JewelryCADPipeline(verbose=False)
+        self.pipeline = pipeline
+        self.workers = workers or os.cpu_count() or 1
+        self.cv_threads = cv_threads
+        self.use_processes = use_processes
+        self.max_body_bytes = max_body_bytes
+
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._latencies = deque(maxlen=1000)
+
+        self._executor = None
+        self._dispatchers = []
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._server_thread = None
+
+    @property
+    def address(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """
+        Start workers, dispatchers and the HTTP server in the background.
+        Returns once every worker is warm, so the first request doesn't pay
+        for process startup and imports.
+        """
+        if self.use_processes:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=batch_processor._init_worker,
+                initargs=(self.pipeline, self.cv_threads),
+            )
+            wait([self._executor.submit(batch_processor._warm_worker) for _ in range(self.workers)])
+        else:
+            batch_processor._init_worker(self.pipeline)
+            batch_processor._warm_worker()
+
+        # One dispatcher per worker keeps at most `workers` jobs in flight
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._dispatch, daemon=True)
+            thread.start()
+            self._dispatchers.append(thread)
+
+        self._server_thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._server_thread.start()
+        return self
+
+    def serve_forever(self):
+        self.start()
+        try:
+            self._server_thread.join()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        self._server.shutdown()
+        self._server.server_close()
+        for _ in self._dispatchers:
+            self.jobs.put(None)
+        for thread in self._dispatchers:
+            thread.join()
+        self._dispatchers = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def submit(self, data, suffix=".png", thickness=2.0):
+        """Queue a conversion; returns a Future, or None if the queue is full"""
+        job = {
+            "data": data,
+            "suffix": suffix,
+            "thickness": thickness,
+            "future": Future(),
+            "queued_at": time.perf_counter(),
+        }
+        try:
+            self.jobs.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self._rejected += 1
+            return None
+        return job["future"]
+
+    def _dispatch(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            with self._lock:
+                self._in_flight += 1
+            started = time.perf_counter()
+            try:
+                if self._executor is not None:
+                    stl, report = self._executor.submit(
+                        _convert_bytes, job["data"], job["suffix"], job["thickness"]).result()
+                else:
+                    stl, report = _convert_bytes(job["data"], job["suffix"], job["thickness"])
+                finished = time.perf_counter()
+                report["queue_time"] = started - job["queued_at"]
+                report["latency"] = finished - job["queued_at"]
+                with self._lock:
+                    self._completed += 1
+                    self._latencies.append(report["latency"])
+                job["future"].set_result((stl, report))
+            except Exception as e:
+                with self._lock:
+                    self._failed += 1
+                job["future"].set_exception(e)
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+
+    def status(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                "queue_depth": self.jobs.qsize(),
+                "queue_size": self.jobs.maxsize,
+                "in_flight": self._in_flight,
+                "workers": self.workers,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+            }
+        if latencies:
+            stats["latency"] = {
+                "mean": sum(latencies) / len(latencies),
+                "p50": latencies[len(latencies) // 2],
+                "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+                "max": latencies[-1],
+            }
+        return stats
+
+    def _make_handler(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, code, payload, headers=None):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if urlparse(self.path).path == "/status":
+                    self._send_json(200, service.status())
+                else:
+                    self._send_json(404, {"error": "not found"})
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                if url.path != "/convert":
+                    self._send_json(404, {"error": "not found"})
+                    return
+
+                params = parse_qs(url.query)
+                try:
+                    thickness = float(params.get("thickness", ["2.0"])[0])
+                except ValueError:
+                    self._send_json(400, {"error": "thickness must be a number"})
+                    return
+                suffix = "." + params.get("format", ["png"])[0].lstrip(".").lower()
+                if suffix not in SUPPORTED_FORMATS:
+                    self._send_json(400, {"error": f"unsupported format, use one of "
+                                                   f"{', '.join(s[1:] for s in SUPPORTED_FORMATS)}"})
+                    return
+
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                except ValueError:
+                    length = -1
+                if not 0 <= length <= service.max_body_bytes:
+                    # The body is left unread, so the connection can't be reused
+                    self.close_connection = True
+                    code = 400 if length < 0 else 413
+                    self._send_json(code, {"error": "invalid Content-Length" if length < 0 else
+                                           f"request body over {service.max_body_bytes} bytes"})
+                    return
+                data = self.rfile.read(length)
+                if not data:
+                    self._send_json(400, {"error": "empty request body"})
+                    return
+
+                future = service.submit(data, suffix=suffix, thickness=thickness)
+                if future is None:
+                    self._send_json(503, {"error": "server busy", **service.status()},
+                                    headers={"Retry-After": "1"})
+                    return
+
+                try:
+                    stl, report = future.result()
+                except Exception as e:
+                    self._send_json(422, {"error": f"{type(e).__name__}: {e}"})
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "model/stl")
+                self.send_header("Content-Length", str(len(stl)))
+                self.send_header("X-Validation-Report", json.dumps(report))
+                self.end_headers()
+                # Stream the STL in chunks rather than one large write
+                view = memoryview(stl)
+                for offset in range(0, len(view), 1 << 16):
+                    self.wfile.write(view[offset:offset + (1 << 16)])
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the local drawing-to-STL conversion service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="Worker processes (default: all cores)")
+    parser.add_argument("--queue-size", type=int, default=16,
+                        help="Jobs that may wait before requests are rejected")
+    parser.add_argument("--max-body-mb", type=float, default=64,
+                        help="Largest accepted upload in MB")
+    parser.add_argument("--cache-dir", default=None,
+                        help="Reuse stage outputs cached in this folder")
+    parser.add_argument("--validation", choices=["fast", "full"], default="full")
+    args = parser.parse_args(argv)
+
+    from main import JewelryCADPipeline
+    pipeline = JewelryCADPipeline(
+        cache_dir=args.cache_dir, verbose=False, validation_profile=args.validation)
+    service = ConversionService(
+        pipeline, host=args.host, port=args.port,
+        workers=args.workers, queue_size=args.queue_size,
+        max_body_bytes=int(args.max_body_mb * 1024 ** 2))
+    print(f"Serving on {service.address} with {service.workers} workers")
+    service.serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
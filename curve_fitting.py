@@ -0,0 +1,190 @@
+# curve_fitting.py
+import numpy as np
+
+
+def resample_polyline(points, spacing=1.0):
+    """Resample a closed polyline at (about) uniform arc-length spacing"""
+    closed = np.vstack((points, points[:1]))
+    steps = np.hypot(*np.diff(closed, axis=0).T)
+    arc = np.concatenate(([0.0], np.cumsum(steps)))
+    count = max(int(np.ceil(arc[-1] / spacing)), 3)
+    targets = np.linspace(0.0, arc[-1], count, endpoint=False)
+    return np.column_stack((np.interp(targets, arc, closed[:, 0]),
+                            np.interp(targets, arc, closed[:, 1])))
+
+
+def find_corners(dense, corner_angle=50.0, window=3):
+    """
+    Indices of sharp corners on a uniformly sampled closed curve: points
+    where the direction turns by more than corner_angle degrees over
+    `window` samples on either side, thinned to local maxima.
+    """
+    n = len(dense)
+    if n < 2 * window + 3:
+        return np.zeros(0, dtype=np.int64)
+    back = dense - np.roll(dense, window, axis=0)
+    ahead = np.roll(dense, -window, axis=0) - dense
+    cos = np.sum(back * ahead, axis=1) / (
+        np.linalg.norm(back, axis=1) * np.linalg.norm(ahead, axis=1) + 1e-12)
+    turn = np.degrees(np.arccos(np.clip(cos, -1.0, 1.0)))
+    peak = turn >= np.maximum(np.roll(turn, 1), np.roll(turn, -1))
+    candidates = np.flatnonzero((turn > corner_angle) & peak)
+
+    # Keep one corner per cluster: the sharpest within `window` samples
+    corners = []
+    for i in candidates[np.argsort(-turn[candidates])]:
+        if all(min(abs(i - j), n - abs(i - j)) > window for j in corners):
+            corners.append(i)
+    return np.sort(np.array(corners, dtype=np.int64))
+
+
+def _fit(points, closed, smoothing, max_deviation=None):
+    """
+    Smoothing spline through points; None when there are too few. With
+    max_deviation, the smoothing is reduced until no point is farther than
+    that from its place on the spline.
+    """
+    from scipy.interpolate import splev, splprep
+
+    if closed:
+        points = np.vstack((points, points[:1]))
+    if len(points) < 5:
+        return None
+    s = len(points) * smoothing ** 2
+    # Open segments end on corners, which the spline must pass through
+    weights = np.ones(len(points))
+    if not closed:
+        weights[[0, -1]] = 100.0
+    for attempt in range(4):
+        try:
+            tck, u = splprep(points.T, w=weights, s=s, k=3, per=1 if closed else 0, quiet=2)
+        except (ValueError, TypeError):
+            return None
+        if max_deviation is None:
+            break
+        deviation = np.max(np.hypot(*(np.column_stack(splev(u, tck)) - points).T))
+        if deviation <= max_deviation:
+            break
+        # Halve the smoothing (the allowed RMS deviation) and refit; the
+        # last attempt interpolates the points
+        s = s / 4 if attempt < 2 else 0.0
+    return tck
+
+
+def _sample(tck, count, closed):
+    """Parameters, points, first and second derivatives at count samples"""
+    from scipy.interpolate import splev
+
+    u = np.linspace(0.0, 1.0, count, endpoint=not closed)
+    return (u, np.column_stack(splev(u, tck)), np.column_stack(splev(u, tck, der=1)),
+            np.column_stack(splev(u, tck, der=2)))
+
+
+def _chord_error(dense, dense_u, vertex_u, vertices, closed):
+    """Largest distance from the dense spline samples to the polygon chords"""
+    if closed:
+        vertex_u = np.append(vertex_u, 1.0)
+        vertices = np.vstack((vertices, vertices[:1]))
+    segment = np.clip(np.searchsorted(vertex_u, dense_u, side="right") - 1, 0, len(vertices) - 2)
+    a, b = vertices[segment], vertices[segment + 1]
+    ab = b - a
+    t = np.clip(np.sum((dense - a) * ab, axis=1) / (np.sum(ab * ab, axis=1) + 1e-12), 0.0, 1.0)
+    return float(np.max(np.hypot(*(dense - a - t[:, None] * ab).T))) if len(dense) else 0.0
+
+
+def adaptive_vertices(tck, tolerance, closed, length, max_vertices=None):
+    """
+    Place vertices along a spline with spacing sqrt(8 * tolerance / curvature),
+    which keeps every chord within `tolerance` of the curve. Straight runs
+    get almost no vertices and tight bends get many. The count is raised
+    until the measured chordal error meets the tolerance, or capped at
+    max_vertices.
+    """
+    dense_count = max(int(length * 2), 64)
+    u, points, d1, d2 = _sample(tck, dense_count, closed)
+    speed = np.hypot(d1[:, 0], d1[:, 1])
+    curvature = np.abs(d1[:, 0] * d2[:, 1] - d1[:, 1] * d2[:, 0]) / (speed ** 3 + 1e-12)
+
+    # Vertices needed per unit of u, integrated along the curve
+    density = np.sqrt(curvature / (8.0 * tolerance)) * speed
+    needed = np.concatenate(([0.0], np.cumsum((density[1:] + density[:-1]) / 2 * np.diff(u))))
+    if closed:
+        needed = np.append(needed, needed[-1] + density[-1] * (1.0 - u[-1]))
+        u_ext = np.append(u, 1.0)
+    else:
+        u_ext = u
+
+    from scipy.interpolate import splev
+
+    minimum = 8 if closed else 1
+    count = max(int(np.ceil(needed[-1])), minimum)
+    for _ in range(5):
+        if max_vertices:
+            count = min(count, max(max_vertices, minimum))
+        targets = np.linspace(0.0, needed[-1], count + (0 if closed else 1), endpoint=not closed)
+        if needed[-1] > 0:
+            vertex_u = np.interp(targets, needed, u_ext)
+        else:
+            vertex_u = np.linspace(0.0, 1.0, len(targets), endpoint=not closed)
+        vertices = np.column_stack(splev(vertex_u, tck))
+        error = _chord_error(points, u, vertex_u, vertices, closed)
+        if error <= tolerance or (max_vertices and count >= max_vertices):
+            break
+        count = int(np.ceil(count * min(np.sqrt(error / tolerance) * 1.1, 4.0)))
+    return vertices
+
+
+def fit_contour(points, tolerance=0.25, max_vertices=None, smoothing=0.5, corner_angle=50.0,
+                max_deviation=1.0):
+    """
+    Fit smoothing splines to a closed pixel contour and resample it by
+    curvature. Sharp corners split the contour into open spline segments
+    so they stay sharp; a contour without corners gets one periodic spline.
+    Returns an (m, 2) float array of vertices (not repeating the first).
+
+    tolerance bounds the chords against the spline; the spline itself stays
+    within max_deviation of the traced points (smoothing is reduced where
+    it would cut across a notch), so the polygon stays within
+    tolerance + max_deviation pixels of the contour unless a vertex budget
+    cuts it short. The budget is kept as long as it allows one vertex per
+    corner.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(points) < 3:
+        return points
+    dense = resample_polyline(points)
+    corners = find_corners(dense, corner_angle)
+
+    if len(corners) == 0:
+        tck = _fit(dense, True, smoothing, max_deviation)
+        if tck is None:
+            return points
+        length = len(dense)
+        return adaptive_vertices(tck, tolerance, True, length, max_vertices)
+
+    # Open segments from corner to corner, wrapping around the contour
+    segments = []
+    for start, stop in zip(corners, np.roll(corners, -1)):
+        if stop <= start:
+            stop += len(dense)
+        index = np.arange(start, stop + 1) % len(dense)
+        segments.append(dense[index])
+
+    lengths = np.array([len(s) for s in segments], dtype=np.float64)
+    pieces = []
+    for segment, length in zip(segments, lengths):
+        budget = None
+        if max_vertices:
+            # One vertex for the corner, the rest of the budget shared by length
+            spare = max(max_vertices - len(segments), 0)
+            budget = 1 + int(spare * length / lengths.sum())
+        tck = _fit(segment, False, smoothing, max_deviation)
+        if tck is None:
+            # Too short for a cubic: keep the corner-to-corner chord
+            pieces.append(segment[:1])
+            continue
+        vertices = adaptive_vertices(tck, tolerance, False, length, budget)
+        # Pin the segment to its corner; its end point is the next segment's corner
+        vertices[0] = segment[0]
+        pieces.append(vertices[:-1])
+    return np.concatenate(pieces)
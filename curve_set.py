@@ -0,0 +1,127 @@
+# curve_set.py
+import numpy as np
+
+
+class CurveSet:
+    """
+    Array-backed collection of polyline curves.
+
+    All points live in one (N, 2) float64 buffer; curve i spans
+    coords[offsets[i]:offsets[i + 1]]. Per-curve attributes are parallel
+    arrays: is_closed, contour_index and (when the contour tree is known)
+    parent_index, which refers to another curve's contour_index (-1 for
+    none).
+
+    Indexing or iterating yields the same dicts the pipeline used before
+    ({"type", "points", "is_closed", "contour_index"[, "parent_index"]}),
+    with "points" as a view into the shared buffer rather than a list.
+    """
+
+    def __init__(self, coords, offsets, is_closed, contour_index, parent_index=None):
+        self.coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.is_closed = np.asarray(is_closed, dtype=bool)
+        self.contour_index = np.asarray(contour_index, dtype=np.int64)
+        self.parent_index = None if parent_index is None else np.asarray(parent_index, dtype=np.int64)
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros((0, 2)), np.zeros(1, dtype=np.int64), [], [])
+
+    @classmethod
+    def from_contours(cls, contours, parents=None, close_tolerance=10):
+        """
+        Pack OpenCV contours with at least 3 points. A curve is closed when
+        its end points are within close_tolerance of each other.
+        """
+        index = np.array([i for i, c in enumerate(contours) if len(c) >= 3], dtype=np.int64)
+        if len(index) == 0:
+            return cls.empty()
+        arrays = [contours[i].reshape(-1, 2) for i in index]
+        lengths = np.array([len(a) for a in arrays], dtype=np.int64)
+        offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        coords = np.concatenate(arrays).astype(np.float64)
+
+        gap = coords[offsets[:-1]] - coords[offsets[1:] - 1]
+        is_closed = np.hypot(gap[:, 0], gap[:, 1]) < close_tolerance
+
+        parent_index = None
+        if parents is not None:
+            parent_index = np.asarray(parents, dtype=np.int64).reshape(-1)[index]
+        return cls(coords, offsets, is_closed, index, parent_index)
+
+    @classmethod
+    def from_curves(cls, curves):
+        """Build a CurveSet from a list of curve dicts"""
+        if isinstance(curves, CurveSet):
+            return curves
+        curves = [c for c in curves if c.get("type", "polyline") == "polyline" and len(c["points"]) > 2]
+        if not curves:
+            return cls.empty()
+        arrays = [np.asarray(c["points"], dtype=np.float64).reshape(-1, 2) for c in curves]
+        offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+        np.cumsum([len(a) for a in arrays], out=offsets[1:])
+        parent_index = None
+        if all("parent_index" in c for c in curves):
+            parent_index = [c["parent_index"] for c in curves]
+        return cls(
+            np.concatenate(arrays),
+            offsets,
+            [c.get("is_closed", True) for c in curves],
+            [c.get("contour_index", i) for i, c in enumerate(curves)],
+            parent_index,
+        )
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def lengths(self):
+        """Number of points in every curve"""
+        return np.diff(self.offsets)
+
+    @property
+    def has_parents(self):
+        return self.parent_index is not None
+
+    def points(self, i):
+        return self.coords[self.offsets[i]:self.offsets[i + 1]]
+
+    def split(self, dtype=None):
+        """Per-curve point arrays (views unless a dtype conversion is asked for)"""
+        coords = self.coords if dtype is None else self.coords.astype(dtype)
+        return np.split(coords, self.offsets[1:-1]) if len(self) else []
+
+    def curve_ids(self):
+        """Curve number of every point in coords"""
+        return np.repeat(np.arange(len(self)), self.lengths)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        curve = {
+            "type": "polyline",
+            "points": self.points(i),
+            "is_closed": bool(self.is_closed[i]),
+            "contour_index": int(self.contour_index[i]),
+        }
+        if self.parent_index is not None:
+            curve["parent_index"] = int(self.parent_index[i])
+        return curve
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def subset(self, mask):
+        """CurveSet of the curves selected by a boolean mask"""
+        mask = np.asarray(mask, dtype=bool)
+        lengths = self.lengths[mask]
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        coords = self.coords[np.repeat(mask, self.lengths)]
+        parent_index = None if self.parent_index is None else self.parent_index[mask]
+        return CurveSet(coords, offsets, self.is_closed[mask], self.contour_index[mask], parent_index)
@@ -0,0 +1,246 @@
+# extrusion.py
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from shapely.geometry.polygon import orient
+
+try:
+    import mapbox_earcut
+except ImportError:  # Optional: falls back to shapely's triangulation
+    mapbox_earcut = None
+
+# Twice the area below which a cap triangle counts as degenerate (as in MeshValidator)
+DEGENERATE_AREA = 1e-12
+
+
+def polygon_rings(polygon):
+    """
+    Return the polygon's rings as one (n, 2) vertex array plus ring offsets.
+    The exterior is counter-clockwise and holes are clockwise; closing
+    duplicates and repeated consecutive points are dropped.
+    """
+    polygon = orient(polygon, sign=1.0)
+    rings = []
+    for ring in [polygon.exterior] + list(polygon.interiors):
+        coords = np.asarray(ring.coords, dtype=np.float64)[:-1, :2]
+        if len(coords) > 1:
+            repeated = np.all(coords == np.roll(coords, 1, axis=0), axis=1)
+            coords = coords[~repeated]
+        if len(coords) >= 3:
+            rings.append(coords)
+
+    if not rings:
+        return np.zeros((0, 2)), np.zeros(1, dtype=np.int64)
+
+    offsets = np.zeros(len(rings) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(r) for r in rings])
+    return np.concatenate(rings), offsets
+
+
+def triangulate_rings(vertices, offsets, polygon=None):
+    """
+    Triangulate a polygon with holes given as flat ring vertices.
+    Returns (m, 3) indices into vertices, all counter-clockwise.
+    """
+    if len(vertices) < 3:
+        return np.zeros((0, 3), dtype=np.int64)
+
+    if mapbox_earcut is not None:
+        # Earcut takes the end index of every ring
+        ring_ends = offsets[1:].astype(np.uint32)
+        triangles = np.asarray(
+            mapbox_earcut.triangulate_float64(vertices, ring_ends), dtype=np.int64
+        ).reshape(-1, 3)
+    else:
+        triangles = _triangulate_shapely(vertices, polygon)
+
+    # Make every triangle counter-clockwise so the caps face the right way
+    a, b, c = vertices[triangles[:, 0]], vertices[triangles[:, 1]], vertices[triangles[:, 2]]
+    cross = (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0])
+    flip = cross < 0
+    triangles[flip] = triangles[flip][:, ::-1]
+    # Degenerate (zero-area) triangles cannot be dropped without opening the
+    # cap, so they are flipped away against their neighbours instead
+    degenerate = np.flatnonzero(np.abs(cross) < DEGENERATE_AREA)
+    if len(degenerate):
+        triangles = _flip_degenerate(vertices, triangles, degenerate)
+    return triangles
+
+
+def _flip_degenerate(vertices, triangles, degenerate):
+    """
+    Remove zero-area triangles (a, b, c) whose middle vertex b lies on the
+    edge a-c: the neighbour (a, c, d) across that edge is split at b into
+    (a, b, d) and (b, c, d), covering the same area without the sliver.
+    Degenerate triangles without such a neighbour are kept.
+    """
+    tris = [tuple(t) for t in triangles.tolist()]
+    alive = [True] * len(tris)
+    edges = {}
+    
+    def link(t):
+        a, b, c = tris[t]
+        for u, v in ((a, b), (b, c), (c, a)):
+            edges.setdefault((min(u, v), max(u, v)), set()).add(t)
+    
+    def unlink(t):
+        a, b, c = tris[t]
+        for u, v in ((a, b), (b, c), (c, a)):
+            edges[(min(u, v), max(u, v))].discard(t)
+    
+    def is_degenerate(t):
+        p = vertices[list(tris[t])]
+        cross = (p[1, 0] - p[0, 0]) * (p[2, 1] - p[0, 1]) - (p[1, 1] - p[0, 1]) * (p[2, 0] - p[0, 0])
+        return abs(cross) < DEGENERATE_AREA
+    
+    for t in range(len(tris)):
+        link(t)
+    
+    pending = [int(t) for t in degenerate]
+    budget = 8 * len(pending) + 8
+    while pending and budget:
+        budget -= 1
+        t = pending.pop()
+        if not alive[t]:
+            continue
+        points = vertices[list(tris[t])]
+        # The middle vertex is opposite the longest edge
+        i = int(np.argmax([np.sum((points[(k + 2) % 3] - points[(k + 1) % 3]) ** 2) for k in range(3)]))
+        b, a, c = tris[t][i], tris[t][(i + 1) % 3], tris[t][(i + 2) % 3]
+        neighbours = edges.get((min(a, c), max(a, c)), set()) - {t}
+        if not neighbours:
+            continue
+        n = neighbours.pop()
+        k = next(k for k in range(3) if {tris[n][k], tris[n][(k + 1) % 3]} == {a, c})
+        x, y, d = tris[n][k], tris[n][(k + 1) % 3], tris[n][(k + 2) % 3]
+        
+        for old in (t, n):
+            unlink(old)
+            alive[old] = False
+        for new in ((x, b, d), (b, y, d)):
+            tris.append(new)
+            alive.append(True)
+            link(len(tris) - 1)
+            if is_degenerate(len(tris) - 1):
+                pending.append(len(tris) - 1)
+    
+    return np.array([t for t, keep in zip(tris, alive) if keep], dtype=triangles.dtype).reshape(-1, 3)
+
+
+def _triangulate_shapely(vertices, polygon):
+    """Constrained Delaunay triangulation from shapely>=2.1 (GEOS)"""
+    import shapely
+
+    if polygon is None:
+        raise ValueError("polygon is required when mapbox_earcut is not installed")
+    if not hasattr(shapely, "constrained_delaunay_triangles"):
+        raise ImportError("Cap triangulation needs mapbox_earcut or shapely>=2.1")
+
+    collection = shapely.constrained_delaunay_triangles(polygon)
+    triangles = shapely.get_parts(collection)
+    if len(triangles) == 0:
+        return np.zeros((0, 3), dtype=np.int64)
+
+    # Each triangle is a closed ring of 4 points; keep the first 3
+    coords = shapely.get_coordinates(shapely.get_exterior_ring(triangles))
+    coords = coords.reshape(len(triangles), 4, 2)[:, :3].reshape(-1, 2)
+
+    # Map triangle corners back to ring vertex indices with one sorted lookup
+    order = np.lexsort((vertices[:, 1], vertices[:, 0]))
+    sorted_vertices = vertices[order]
+    keys = sorted_vertices[:, 0] + 1j * sorted_vertices[:, 1]
+    queries = coords[:, 0] + 1j * coords[:, 1]
+    position = np.searchsorted(keys, queries)
+    position = np.clip(position, 0, len(keys) - 1)
+    if not np.all(keys[position] == queries):
+        raise ValueError("Triangulation introduced vertices not on the polygon rings")
+    return order[position].reshape(-1, 3)
+
+
+def _prism_sizes(ring_vertices, triangles):
+    """Vertex and face counts of the prism over one triangulated polygon"""
+    n = len(ring_vertices)
+    return 2 * n, 2 * len(triangles) + 2 * n
+
+
+def _write_prism(vertices, faces, ring_vertices, offsets, triangles, height, base):
+    """
+    Fill preallocated vertex and face slices with one closed prism.
+    base is the index of the prism's first vertex in the shared buffer.
+    """
+    n = len(ring_vertices)
+    vertices[:n, :2] = ring_vertices
+    vertices[:n, 2] = 0.0
+    vertices[n:, :2] = ring_vertices
+    vertices[n:, 2] = height
+
+    # Caps: top keeps the counter-clockwise triangles, bottom is flipped
+    t = len(triangles)
+    faces[:t] = triangles[:, ::-1] + base
+    faces[t:2 * t] = triangles + (n + base)
+
+    # Side walls: each ring edge (a, b) becomes two triangles
+    index = np.arange(n)
+    ring_id = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    start, end = offsets[ring_id], offsets[ring_id + 1]
+    a = index + base
+    b = np.where(index + 1 == end, start, index + 1) + base
+    walls = faces[2 * t:]
+    walls[0::2, 0] = a
+    walls[0::2, 1] = b
+    walls[0::2, 2] = b + n
+    walls[1::2, 0] = a
+    walls[1::2, 1] = b + n
+    walls[1::2, 2] = a + n
+
+    if height < 0:
+        faces[:] = faces[:, ::-1]
+
+
+def _triangulated(polygon):
+    ring_vertices, offsets = polygon_rings(polygon)
+    if len(ring_vertices) < 3:
+        return None
+    return ring_vertices, offsets, triangulate_rings(ring_vertices, offsets, polygon)
+
+
+def extrude_polygon(polygon, height):
+    """
+    Extrude a shapely polygon (holes included) into a closed prism.
+
+    Side walls are built with array operations and both caps come from one
+    triangulation, so the result is watertight with outward-facing normals.
+    Returns (vertices, faces) arrays ready for trimesh or an STL writer.
+    """
+    return extrude_polygons([polygon], height)
+
+
+def extrude_polygons(polygons, height, workers=None):
+    """
+    Extrude many polygons into one mesh of disjoint prisms.
+
+    Polygons are triangulated first (on a thread pool when workers > 1),
+    then every prism is written into one preallocated vertex buffer and
+    one face buffer with its indices offset, so a sheet of hundreds of
+    parts costs a single allocation instead of many small meshes.
+    """
+    polygons = list(polygons)
+    if workers and workers > 1 and len(polygons) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            parts = list(executor.map(_triangulated, polygons))
+    else:
+        parts = [_triangulated(p) for p in polygons]
+    parts = [p for p in parts if p is not None]
+
+    sizes = np.array([_prism_sizes(p[0], p[2]) for p in parts], dtype=np.int64).reshape(-1, 2)
+    vertex_start = np.concatenate(([0], np.cumsum(sizes[:, 0])))
+    face_start = np.concatenate(([0], np.cumsum(sizes[:, 1])))
+
+    vertices = np.empty((vertex_start[-1], 3), dtype=np.float64)
+    faces = np.empty((face_start[-1], 3), dtype=np.int64)
+    for i, (ring_vertices, offsets, triangles) in enumerate(parts):
+        v0, v1 = vertex_start[i], vertex_start[i + 1]
+        f0, f1 = face_start[i], face_start[i + 1]
+        _write_prism(vertices[v0:v1], faces[f0:f1], ring_vertices, offsets,
+                     triangles, height, v0)
+    return vertices, faces
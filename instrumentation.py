@@ -0,0 +1,179 @@
+# instrumentation.py
+import os
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def _peak_rss_mb():
+    """High-water mark of the whole process's resident memory so far"""
+    if resource is None:
+        return None
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+class PipelineHook:
+    """
+    Base class for instrumentation hooks. Subclass it and override the
+    callbacks you need, then register it with JewelryCADPipeline.add_hook.
+    Hooks are copied into batch workers, so they must be picklable.
+    """
+
+    def on_stage_start(self, trace, stage):
+        pass
+
+    def on_stage_end(self, trace, record):
+        pass
+
+    def on_trace_complete(self, trace):
+        pass
+
+
+class JsonTraceWriter(PipelineHook):
+    """
+    Write one <trace name>.trace.json file per processed image; batch
+    traces keep the inputs' subfolders, like the meshes
+    """
+
+    def __init__(self, trace_dir):
+        self.trace_dir = trace_dir
+
+    def on_trace_complete(self, trace):
+        path = os.path.join(self.trace_dir, f"{trace.name}.trace.json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        trace.write_json(path)
+
+
+class PipelineTrace:
+    """
+    Per-image record of stage wall time, CPU time, memory and counts.
+
+    With track_memory=True each stage also reports its peak traced
+    allocation (NumPy and Python objects) via tracemalloc; otherwise only
+    the process's peak RSS is recorded, which costs nothing. That peak
+    covers the whole process, so per stage it is reported as it stands
+    after the stage (process_peak_rss_mb) and as how far the stage raised
+    it (peak_rss_growth_mb).
+
+    Used as a context manager, the trace is finished even when a stage
+    raises, so hooks still receive (and write) the partial trace.
+    """
+
+    def __init__(self, source, hooks=(), track_memory=False, name=None):
+        self.source = source
+        # Names the trace's files: the input's base name unless given
+        self.name = name or os.path.splitext(os.path.basename(source))[0] or "image"
+        self.hooks = list(hooks)
+        self.track_memory = track_memory
+        self.stages = []
+        self.counts = {}
+        self._start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        self.total = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.total is None:
+            self.finish(error=exc)
+        return False
+
+    @contextmanager
+    def stage(self, name, **info):
+        for hook in self.hooks:
+            hook.on_stage_start(self, name)
+
+        started_tracing = False
+        if self.track_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+
+        rss = _peak_rss_mb()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        record = {"stage": name}
+        record.update(info)
+        try:
+            yield record
+        except BaseException as error:
+            record["error"] = _describe(error)
+            raise
+        finally:
+            record["wall_time"] = time.perf_counter() - wall
+            record["cpu_time"] = time.process_time() - cpu
+            if self.track_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                record["peak_traced_mb"] = max(peak - base, 0) / 1024 ** 2
+                if started_tracing:
+                    tracemalloc.stop()
+            record["process_peak_rss_mb"] = _peak_rss_mb()
+            if rss is not None:
+                record["peak_rss_growth_mb"] = record["process_peak_rss_mb"] - rss
+            self.stages.append(record)
+            for hook in self.hooks:
+                hook.on_stage_end(self, record)
+
+    def count(self, name, value):
+        self.counts[name] = value
+
+    def finish(self, error=None):
+        self.total = {
+            "wall_time": time.perf_counter() - self._start,
+            "cpu_time": time.process_time() - self._cpu_start,
+            "process_peak_rss_mb": _peak_rss_mb(),
+        }
+        if error is not None:
+            self.total["error"] = _describe(error)
+        for hook in self.hooks:
+            hook.on_trace_complete(self)
+
+    def timings(self):
+        """Stage name -> wall time, plus the end-to-end total"""
+        timings = {record["stage"]: record["wall_time"] for record in self.stages}
+        if self.total is not None:
+            timings["total"] = self.total["wall_time"]
+        return timings
+
+    def to_dict(self):
+        return {
+            "source": self.source,
+            "stages": self.stages,
+            "counts": self.counts,
+            "total": self.total,
+        }
+
+    def write_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+def _describe(error):
+    return f"{type(error).__name__}: {error}"
+
+
+def point_stats(curves):
+    """Summary of points per curve for the trace"""
+    if hasattr(curves, "lengths"):
+        sizes = curves.lengths.tolist()
+    else:
+        sizes = [len(c["points"]) for c in curves]
+    if not sizes:
+        return {"curves": 0, "total": 0, "min": 0, "max": 0, "mean": 0.0}
+    return {
+        "curves": len(sizes),
+        "total": sum(sizes),
+        "min": min(sizes),
+        "max": max(sizes),
+        "mean": sum(sizes) / len(sizes),
+    }
@@ -1,66 +1,188 @@
 # main.py
 import cv2
 import numpy as np
-import matplotlib.pyplot as plt
-import trimesh
 from contour_processor import ContourProcessor
 from cad_generator import CADGenerator
 from mesh_validator import MeshValidator
+from stage_cache import StageCache
+from tiled_preprocessing import TiledPreprocessor, PyramidPreprocessor
+from stage_graph import StageGraph
+from instrumentation import PipelineTrace, JsonTraceWriter, point_stats
+from mesh_export import export_mesh, MeshWriter
+from mesh_lod import LODGenerator, lod_path
+from svg_import import load_svg_curves
+from result_store import ResultStore
+from binarization import AutoBinarizer, binarize, clean_mask, sampled_otsu_threshold
+from wall_thickness import WallThicknessAnalyzer
 import os
 
 class JewelryCADPipeline:
-    def __init__(self):
-        self.contour_processor = ContourProcessor()
-        self.cad_generator = CADGenerator()
-        self.mesh_validator = MeshValidator()
+    def __init__(self, cache_dir=None, cache_max_bytes=2 * 1024 ** 3,
+                 blur_kernel=7, threshold=127, morph_kernel=5,
+                 tile_size=None, tile_workers=None,
+                 verbose=True, hooks=None, trace_dir=None, track_memory=False,
+                 validation_profile="full", multi_component=False,
+                 spline_tolerance=None, spline_max_vertices=None,
+                 pyramid_factor=None, diagnostics_dir=None,
+                 lod_face_budgets=None, lod_tolerances=None,
+                 svg_tolerance=0.1, svg_scale=1.0,
+                 retention="full", spill_dir=None, binarization="fixed",
+                 min_wall_mm=None, pixel_size_mm=None):
+        self.verbose = verbose
+        self.contour_processor = ContourProcessor(
+            verbose=verbose, spline_tolerance=spline_tolerance,
+            spline_max_vertices=spline_max_vertices)
+        self.cad_generator = CADGenerator(verbose=verbose, multi_component=multi_component)
+        self.mesh_validator = MeshValidator(profile=validation_profile)
+        self.lod_generator = LODGenerator(lod_face_budgets, lod_tolerances, verbose=verbose)
         
-    def process_image(self, image_path, output_stl_path, thickness=2.0):
+        # Preprocessing parameters
+        self.blur_kernel = blur_kernel
+        self.threshold = threshold
+        self.morph_kernel = morph_kernel
+        
+        # "fixed" thresholds at `threshold`; "otsu", "adaptive" and "clahe_otsu"
+        # pick another strategy, and "auto" scores all of them per drawing
+        self.binarization = binarization
+        self.binarizer = AutoBinarizer(threshold=threshold)
+        
+        # Large scans are preprocessed in tiles of this size (None = full frame)
+        self.tile_size = tile_size
+        self.tile_workers = tile_workers
+        
+        # SVG input is flattened to this tolerance (output units) and scaled
+        self.svg_tolerance = svg_tolerance
+        self.svg_scale = svg_scale
+        
+        # Coarse-to-fine mode: binarize at 1/pyramid_factor and refine near edges
+        self.pyramid_factor = pyramid_factor
+        self.pyramid_stats = {}
+        
+        # Diagnostic images are rendered on a background thread when requested
+        self.diagnostics_dir = diagnostics_dir
+        self.diagnostics = None
+        
+        # Results keep "full", "geometry" or "summary" fields in memory;
+        # the rest are spilled to .npy files and memory-mapped on access
+        self.result_store = ResultStore(retention, spill_dir)
+        
+        # 2D wall-thickness check of the extruded outline (off unless min_wall_mm
+        # is set); pixel_size_mm converts scan pixels to mm for it
+        self.wall_analyzer = WallThicknessAnalyzer(min_wall_mm) if min_wall_mm else None
+        self.pixel_size_mm = pixel_size_mm
+        
+        # Optional on-disk cache of stage outputs
+        self.cache = StageCache(cache_dir, cache_max_bytes) if cache_dir else None
+        
+        # Instrumentation hooks; trace_dir writes a JSON trace per image
+        self.hooks = list(hooks or [])
+        if trace_dir:
+            self.hooks.append(JsonTraceWriter(trace_dir))
+        self.track_memory = track_memory
+        
+    def add_hook(self, hook):
+        """Register a PipelineHook that receives stage and trace events"""
+        self.hooks.append(hook)
+    
+    def log(self, message):
+        if self.verbose:
+            print(message)
+    
+    def process_image(self, image_path, output_stl_path, thickness=2.0, name=None):
+        """
+        Convert one drawing to a mesh at output_stl_path. name (by default
+        the input's base name) names its diagnostics and trace files; batch
+        jobs pass the input's path below the batch folder, e.g. "a/ring".
+        """
+        name = name or os.path.splitext(os.path.basename(image_path))[0]
+        # The trace is finished (and handed to the hooks) even if a stage raises
+        with PipelineTrace(image_path, self.hooks, self.track_memory, name) as trace:
+            return self._process_image(trace, image_path, output_stl_path, thickness, name)
+    
+    def _process_image(self, trace, image_path, output_stl_path, thickness, name):
         # Load and preprocess image
-        print("Loading and preprocessing image...")
+        self.log("Loading and preprocessing image...")
         
         # Fix file path for Windows
         image_path = os.path.normpath(image_path)
-        if not os.path.exists(image_path):
-            raise ValueError(f"File not found: {image_path}")
-            
-        image = cv2.imread(image_path)
-        if image is None:
-            raise ValueError(f"Could not load image from {image_path}")
-            
-        processed = self.preprocess_image(image)
+        with trace.stage("load"):
+            data, image, is_vector = self.load_input(image_path)
         
-        # Extract and process contours
-        print("Extracting contours...")
-        contours = self.contour_processor.detect_contours(processed)
-        refined_contours = self.contour_processor.refine_contours(contours)
-        vector_curves = self.contour_processor.vectorize_contours(refined_contours)
+        # Every stage key chains off the hash of the input bytes
+        key = StageCache.hash_bytes(data) if self.cache else None
+        
+        if is_vector:
+            # Vector drawings go straight to curves: no raster, no tracing
+            self.log("Parsing vector paths...")
+            processed, contours, refined_contours, binarization = None, [], [], None
+            key, vector_curves = self._run_stage(
+                trace, key, "svg", "curves",
+                {"tolerance": self.svg_tolerance, "scale": self.svg_scale},
+                lambda: load_svg_curves(data, self.svg_tolerance, self.svg_scale))
+            trace.count("curves", len(vector_curves))
+        else:
+            trace.count("image_shape", list(image.shape))
+            key, processed, contours, refined_contours, vector_curves, binarization = (
+                self.trace_image(trace, key, image))
+        trace.count("points_per_curve", point_stats(vector_curves))
         
         # Generate CAD geometry
-        print("Generating CAD geometry...")
-        cad_geometry = self.cad_generator.create_cad_geometry(vector_curves)
+        self.log("Generating CAD geometry...")
+        key, cad_geometry = self._run_stage(
+            trace, key, "geometry", "polygons", None,
+            lambda: self.cad_generator.create_cad_geometry(vector_curves))
+        trace.count("polygons", len(cad_geometry))
+        trace.count("holes", sum(len(p.interiors) for p in cad_geometry))
         
         # Extrude to 3D
-        print("Extruding to 3D...")
-        mesh = self.cad_generator.extrude_to_3d(cad_geometry, thickness=thickness)
+        self.log("Extruding to 3D...")
+        key, mesh = self._run_stage(
+            trace, key, "extrude", "mesh",
+            {"thickness": thickness, "multi_component": self.cad_generator.multi_component},
+            lambda: self.cad_generator.extrude_to_3d(cad_geometry, thickness=thickness))
         
         # Validate mesh
-        print("Validating mesh...")
-        is_valid, issues = self.mesh_validator.validate_mesh(mesh)
+        self.log("Validating mesh...")
+        key, (mesh, is_valid, issues) = self._run_stage(
+            trace, key, "validate", "validation", {"profile": self.mesh_validator.profile},
+            lambda: self.validate_and_fix(mesh))
+        if mesh is not None:
+            trace.count("vertices", len(mesh.vertices))
+            trace.count("faces", len(mesh.faces))
         
-        if not is_valid:
-            print(f"Mesh validation issues: {issues}")
-            # Apply fixes if possible
-            mesh = self.mesh_validator.fix_mesh(mesh)
-            is_valid, issues = self.mesh_validator.validate_mesh(mesh)
-            if not is_valid:
-                print("Warning: Mesh still has issues after fixing attempts")
+        walls = None
+        if self.wall_analyzer is not None:
+            self.log("Checking wall thickness...")
+            with trace.stage("wall_thickness"):
+                walls = self.analyze_walls(cad_geometry, thickness, is_vector)
+            trace.count("min_wall_mm", walls["min_wall_found_mm"])
+            trace.count("thin_regions", len(walls["thin_regions"]))
+            if walls["issues"]:
+                is_valid, issues = False, list(issues) + walls["issues"]
         
         # Export STL
-        print(f"Exporting STL to {output_stl_path}...")
+        self.log(f"Exporting STL to {output_stl_path}...")
         output_stl_path = os.path.normpath(output_stl_path)
-        mesh.export(output_stl_path)
+        with trace.stage("export"):
+            export_mesh(mesh, output_stl_path)
+        
+        # Lighter levels of detail for previews, written next to the STL
+        lods = []
+        if self.lod_generator.enabled and mesh is not None:
+            self.log("Building levels of detail...")
+            key, levels = self._run_stage(
+                trace, key, "lod", "lods", self.lod_generator.params(),
+                lambda: self.lod_generator.generate(mesh))
+            with trace.stage("export_lod"), MeshWriter() as writer:
+                for index, (lod, info) in enumerate(levels, start=1):
+                    lod_valid, lod_issues = self.mesh_validator.validate_mesh(lod)
+                    path = lod_path(output_stl_path, index)
+                    writer.submit(lod, path)
+                    lods.append(dict(info, mesh=lod, path=path, is_valid=lod_valid, issues=lod_issues))
+            trace.count("lod_faces", [lod["face_count"] for lod in lods])
+        trace.finish()
         
-        return {
+        result = {
             "image": image,
             "processed": processed,
             "contours": contours,
@@ -70,29 +192,418 @@ class JewelryCADPipeline:
             "validation": {
                 "is_valid": is_valid,
                 "issues": issues
-            }
+            },
+            "binarization": binarization,
+            "trace": trace.to_dict()
+        }
+        if walls is not None:
+            result["validation"]["wall_thickness"] = walls
+        if lods:
+            result["lods"] = lods
+        if self.diagnostics_dir:
+            result["diagnostics"] = self.render_diagnostics(result, name)
+        return self.result_store.retain(result, os.path.basename(name))
+    
+    def load_input(self, image_path):
+        """
+        Read a drawing from disk. Returns its bytes, the decoded image (None
+        for SVG drawings) and whether it is a vector drawing.
+        """
+        if not os.path.exists(image_path):
+            raise ValueError(f"File not found: {image_path}")
+        
+        is_vector = image_path.lower().endswith(".svg")
+        with open(image_path, "rb") as f:
+            data = f.read()
+        image = None if is_vector else cv2.imdecode(
+            np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None and not is_vector:
+            raise ValueError(f"Could not load image from {image_path}")
+        return data, image, is_vector
+    
+    def trace_image(self, trace, key, image):
+        """Raster stages: preprocess, trace contours and vectorize them"""
+        self.pyramid_stats = {}
+        key, (processed, binarization) = self._run_stage(
+            trace, key, "preprocess", "binarized", self.preprocess_params(),
+            lambda: self.preprocess(image))
+        if self.pyramid_stats:
+            trace.count("pyramid", self.pyramid_stats)
+        if binarization:
+            trace.count("binarization", binarization["strategy"])
+        
+        # Extract and process contours
+        self.log("Extracting contours...")
+        cp = self.contour_processor
+        cp.stats = {}
+        key, (contours, parents) = self._run_stage(
+            trace, key, "contours", "contours", cp.detection_params(),
+            lambda: cp.detect_contour_tree(processed))
+        key, (refined_contours, refined_parents) = self._run_stage(
+            trace, key, "refine", "contours", {"epsilon_factor": cp.epsilon_factor},
+            lambda: cp.refine_contour_tree(contours, parents))
+        if cp.fits_splines:
+            # Splines are fitted to the full contours, not the simplified ones
+            key, vector_curves = self._run_stage(
+                trace, key, "fit", "curves", cp.fit_params(),
+                lambda: cp.fit_curves(contours, parents))
+        else:
+            key, vector_curves = self._run_stage(
+                trace, key, "vectorize", "curves", None,
+                lambda: cp.vectorize_contours(refined_contours, refined_parents))
+        if "contours_found" in cp.stats:
+            trace.count("contours_found", cp.stats["contours_found"])
+        trace.count("contours_after_filtering", len(contours))
+        trace.count("contours_after_refinement", len(refined_contours))
+        return key, processed, contours, refined_contours, vector_curves, binarization
+    
+    def analyze_walls(self, polygons, thickness, is_vector=False):
+        """
+        Wall-thickness report for the polygons that get extruded. Traced
+        drawings are in pixels (pixel_size_mm each); SVG coordinates are
+        taken as mm after svg_scale. thickness is in mm. Without
+        pixel_size_mm a traced drawing is measured in pixels, and the report
+        says so with calibrated=False.
+        """
+        calibrated = is_vector or self.pixel_size_mm is not None
+        if not calibrated:
+            self.log("No pixel_size_mm: wall widths are in drawing pixels, not mm")
+        unit_scale = 1.0 if is_vector else (self.pixel_size_mm or 1.0)
+        walls = self.wall_analyzer.analyze(
+            self.cad_generator.extruded_polygons(polygons), unit_scale, thickness)
+        walls["calibrated"] = calibrated
+        return walls
+    
+    def render_diagnostics(self, result, name):
+        """
+        Queue the processing-steps image for a result, written as
+        {name}_steps.png under diagnostics_dir; returns its path
+        """
+        if self.diagnostics is None:
+            from utils.visualization import DiagnosticsRenderer
+            self.diagnostics = DiagnosticsRenderer()
+        path = os.path.join(self.diagnostics_dir, f"{name}_steps.png")
+        self.diagnostics.submit(result, path)
+        walls = result["validation"].get("wall_thickness")
+        if walls is not None and walls["heatmap"] is not None:
+            walls["heatmap_path"] = os.path.join(self.diagnostics_dir, f"{name}_walls.png")
+            # The renderer holds the image until it is written; the result keeps the path
+            self.diagnostics.submit_image(walls.pop("heatmap"), walls["heatmap_path"])
+        return path
+    
+    def wait_diagnostics(self):
+        """Wait for queued diagnostic images and return their paths"""
+        return self.diagnostics.wait() if self.diagnostics is not None else []
+    
+    def build_stage_graph(self, image, svg_data=None):
+        """
+        Stage graph for one loaded image, or for the bytes of an SVG drawing
+        (whose curves are parsed directly, with no raster stages). Each stage
+        only depends on the parameters it actually reads, so changing the
+        thickness re-runs extrusion and validation while the traced 2D
+        geometry is reused.
+        """
+        cp = self.contour_processor
+        
+        def contour_processor(min_contour_length=cp.min_contour_length,
+                              epsilon_factor=cp.epsilon_factor):
+            return ContourProcessor(min_contour_length, epsilon_factor, verbose=self.verbose,
+                                    min_contour_area=cp.min_contour_area,
+                                    despeckle_area=cp.despeckle_area, workers=cp.workers)
+        
+        graph = StageGraph()
+        if svg_data is not None:
+            graph.add_stage(
+                "svg", lambda: load_svg_curves(svg_data, self.svg_tolerance, self.svg_scale))
+            curves = "svg"
+        else:
+            graph.add_stage("preprocess", lambda: self.preprocess(image)[0])
+            graph.add_stage(
+                "contours",
+                lambda processed, min_contour_length: contour_processor(
+                    min_contour_length=min_contour_length).detect_contour_tree(processed),
+                inputs=["preprocess"], params=["min_contour_length"])
+            graph.add_stage(
+                "refine",
+                lambda tree, epsilon_factor: contour_processor(
+                    epsilon_factor=epsilon_factor).refine_contour_tree(*tree),
+                inputs=["contours"], params=["epsilon_factor"])
+            graph.add_stage(
+                "vectorize",
+                lambda tree: cp.vectorize_contours(*tree),
+                inputs=["refine"])
+            graph.add_stage(
+                "fit",
+                lambda tree: cp.fit_curves(*tree),
+                inputs=["contours"])
+            curves = "fit" if cp.fits_splines else "vectorize"
+        graph.add_stage(
+            "geometry",
+            lambda curves: self.cad_generator.create_cad_geometry(curves),
+            inputs=[curves])
+        graph.add_stage(
+            "extrude",
+            lambda polygons, thickness: self.cad_generator.extrude_to_3d(polygons, thickness=thickness),
+            inputs=["geometry"], params=["thickness"])
+        # fix_mesh works in place, so validate a copy to keep the extrusion reusable
+        graph.add_stage(
+            "validate",
+            lambda mesh: self.validate_and_fix(mesh.copy() if mesh is not None else None),
+            inputs=["extrude"])
+        
+        graph.set_params(
+            min_contour_length=cp.min_contour_length,
+            epsilon_factor=cp.epsilon_factor,
+            thickness=2.0)
+        return graph
+    
+    def process_sweep(self, image_path, output_dir, thicknesses=(1.0, 1.5, 2.0, 3.0),
+                      epsilon_factors=None):
+        """
+        Trace a drawing once and write an STL for every combination of
+        thickness and epsilon_factor. Only stages that depend on a changed
+        parameter are recomputed between variants. epsilon_factor only
+        shapes Douglas-Peucker polygons, so with spline fitting or an SVG
+        input the sweep covers thickness alone.
+        """
+        image_path = os.path.normpath(image_path)
+        data, image, is_vector = self.load_input(image_path)
+        
+        if epsilon_factors is None:
+            epsilon_factors = [self.contour_processor.epsilon_factor]
+        if is_vector or self.contour_processor.fits_splines:
+            # Every epsilon_factor would give the same mesh
+            epsilon_factors = [None]
+        epsilon_factors = list(dict.fromkeys(epsilon_factors))
+        thicknesses = list(dict.fromkeys(thicknesses))
+        
+        os.makedirs(output_dir, exist_ok=True)
+        base_name = os.path.splitext(os.path.basename(image_path))[0]
+        graph = self.build_stage_graph(image, data if is_vector else None)
+        
+        variants = []
+        # Variants are written in the background while the next one is built
+        with MeshWriter() as writer:
+            # Thickness varies fastest: it only dirties extrusion and validation
+            for epsilon_factor in epsilon_factors:
+                for thickness in thicknesses:
+                    graph.set_params(thickness=thickness)
+                    name = f"{base_name}_t{thickness:g}.stl"
+                    if epsilon_factor is not None:
+                        graph.set_params(epsilon_factor=epsilon_factor)
+                        name = f"{base_name}_eps{epsilon_factor:g}_t{thickness:g}.stl"
+                    mesh, is_valid, issues = graph.get("validate")
+                    
+                    output_path = os.path.join(output_dir, name)
+                    self.log(f"Exporting STL to {output_path}...")
+                    writer.submit(mesh, output_path)
+                    variants.append({
+                        "thickness": thickness,
+                        "epsilon_factor": epsilon_factor,
+                        "output": output_path,
+                        "is_valid": is_valid,
+                        "issues": issues,
+                    })
+        
+        return {"variants": variants, "stage_runs": dict(graph.run_counts)}
+    
+    def validate_and_fix(self, mesh):
+        is_valid, issues = self.mesh_validator.validate_mesh(mesh)
+        
+        if not is_valid:
+            self.log(f"Mesh validation issues: {issues}")
+            # Apply fixes if possible
+            mesh = self.mesh_validator.fix_mesh(mesh)
+            is_valid, issues = self.mesh_validator.validate_mesh(mesh)
+            if not is_valid:
+                self.log("Warning: Mesh still has issues after fixing attempts")
+        
+        return mesh, is_valid, issues
+    
+    def preprocess_params(self):
+        params = {
+            "blur_kernel": self.blur_kernel,
+            "threshold": self.threshold,
+            "morph_kernel": self.morph_kernel,
         }
+        if self.pyramid_factor:
+            params["pyramid_factor"] = self.pyramid_factor
+        if self.binarization != "fixed":
+            params["binarization"] = self.binarization
+        return params
+    
+    def output_params(self):
+        """Every setting, besides thickness, that changes what process_image writes"""
+        cp = self.contour_processor
+        params = {
+            "preprocess": self.preprocess_params(),
+            "contours": cp.detection_params(),
+            "epsilon_factor": cp.epsilon_factor,
+            "multi_component": self.cad_generator.multi_component,
+            "validation_profile": self.mesh_validator.profile,
+            "svg": {"tolerance": self.svg_tolerance, "scale": self.svg_scale},
+        }
+        if cp.fits_splines:
+            params["fit"] = cp.fit_params()
+        if self.lod_generator.enabled:
+            params["lod"] = self.lod_generator.params()
+        if self.wall_analyzer is not None:
+            params["walls"] = {"min_wall_mm": self.wall_analyzer.min_wall_mm,
+                               "pixel_size_mm": self.pixel_size_mm}
+        return params
+    
+    def _run_stage(self, trace, parent_key, stage, kind, params, compute):
+        """
+        Run one pipeline stage through the cache (if enabled) and record it
+        in the trace. Returns the stage key for the next stage and the output.
+        """
+        with trace.stage(stage) as record:
+            if self.cache is None:
+                return None, compute()
+            
+            key = StageCache.make_key(parent_key, stage, params)
+            value = self.cache.get(key, kind)
+            record["cached"] = value is not None
+            if value is None:
+                value = compute()
+                self.cache.put(key, kind, value)
+            return key, value
+
+    def process_batch(self, image_paths, output_dir="test_results", output_paths=None,
+                      thickness=2.0, workers=None, manifest_path=None, cv_threads=1,
+                      output_format=".stl"):
+        """
+        Process many images on a process pool with one pipeline per worker.
+        Returns one manifest entry per input, in input order; failures are
+        recorded in the entry instead of stopping the batch. Outputs keep the
+        inputs' folders below their common folder, and inputs that would
+        still write the same file raise ValueError up front.
+        """
+        from batch_processor import BatchProcessor
+        processor = BatchProcessor(self, workers=workers, cv_threads=cv_threads)
+        return processor.run(
+            image_paths,
+            output_dir=output_dir,
+            output_paths=output_paths,
+            thickness=thickness,
+            manifest_path=manifest_path,
+            output_format=output_format,
+        )
+
+    def process_stream(self, image_paths, output_dir="test_results", thickness=2.0,
+                       output_format=".stl", queue_size=4, executor=None, **stage_workers):
+        """
+        Convert a (possibly unbounded) iterable of image paths with the stages
+        running concurrently on bounded queues. Yields one manifest entry per
+        file as it finishes; see streaming.py for the stages and their workers.
+        """
+        from streaming import stream_entries
+        return stream_entries(self, image_paths, output_dir=output_dir, thickness=thickness,
+                              output_format=output_format, queue_size=queue_size,
+                              executor=executor, **stage_workers)
+    
+    def preprocess(self, image):
+        """
+        Preprocess full-frame, or in tiles when the image exceeds tile_size.
+        Returns the mask and the binarization choice (None in fixed mode).
+        """
+        pyramid = self.pyramid_factor and self.pyramid_factor > 1
+        tiled = self.tile_size and max(image.shape[:2]) > self.tile_size
+        choice = None
+        if self.binarization != "fixed" and (pyramid or tiled):
+            # Every tile has to use the same strategy and threshold
+            choice = self.choose_binarization(image)
+        if pyramid:
+            return self.preprocess_image_pyramid(image, choice=choice), choice
+        if tiled:
+            return self.preprocess_image_tiled(image, choice=choice), choice
+        return self.binarize_image(image)
+    
+    def choose_binarization(self, image, max_size=1024):
+        """
+        Pick the strategy (auto mode) on a reduced copy. Averaging pixels
+        narrows the paper noise and moves Otsu's threshold, so for Otsu it is
+        taken from full-resolution rows instead.
+        """
+        factor = max(1, int(np.ceil(max(image.shape[:2]) / max_size)))
+        small = cv2.resize(image, (max(1, image.shape[1] // factor), max(1, image.shape[0] // factor)),
+                           interpolation=cv2.INTER_AREA)
+        _, choice = self.binarize_image(small, scale=factor)
+        if factor > 1 and choice["strategy"] == "otsu":
+            choice["threshold"] = sampled_otsu_threshold(image, self.blur_kernel | 1)
+        self.log(f"Binarization: {choice['strategy']}")
+        return choice
+    
+    def _halo(self, choice):
+        halo = TiledPreprocessor.halo_for(self.blur_kernel, self.morph_kernel)
+        if (choice["strategy"] if choice else self.binarization) == "adaptive":
+            halo += self.binarizer.block_size // 2
+        return halo
     
-    def preprocess_image(self, image):
+    def preprocess_image_tiled(self, image, out_path=None, choice=None):
+        """
+        Tiled preprocessing into a memory-mapped mask. Produces exactly the
+        same mask as preprocess_image with memory bounded by the tile size
+        (for the local clahe_otsu strategy, CLAHE sees one tile at a time).
+        """
+        tiler = TiledPreprocessor(
+            lambda tile: self.preprocess_image(tile, choice=choice), self._halo(choice),
+            tile_size=self.tile_size or 1024, workers=self.tile_workers)
+        return tiler.process(image, out_path=out_path)
+    
+    def preprocess_image_pyramid(self, image, out_path=None, choice=None):
+        """
+        Coarse-to-fine preprocessing: binarize a downsampled copy, then redo
+        only a narrow band around its boundaries at full resolution.
+        """
+        factor = self.pyramid_factor
+        pyramid = PyramidPreprocessor(
+            lambda tile: self.preprocess_image(tile, choice=choice),
+            lambda small: self.preprocess_image(small, scale=factor, choice=choice),
+            self._halo(choice), factor=factor, workers=self.tile_workers)
+        mask = pyramid.process(image, out_path=out_path)
+        self.pyramid_stats = pyramid.stats
+        self.log(f"Pyramid: refined {pyramid.stats['refined_fraction']:.0%} of the scan "
+                 f"in {pyramid.stats['windows']} windows at full resolution")
+        return mask
+    
+    def preprocess_image(self, image, scale=1, choice=None):
+        """
+        Binarize a drawing; scale > 1 shrinks the kernels for a downsampled
+        copy. choice fixes the strategy and threshold picked in auto mode.
+        """
+        return self.binarize_image(image, scale, choice)[0]
+    
+    def binarize_image(self, image, scale=1, choice=None):
+        """
+        preprocess_image, also returning the strategy and threshold used
+        (None for the fixed threshold). Nothing is kept on the pipeline, so
+        concurrent calls (streaming, tiles) can't see each other's choice.
+        """
+        blur_kernel = max(1, self.blur_kernel // scale) | 1
+        morph_kernel = max(1, self.morph_kernel // scale)
         gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         
-        # Try different blur settings
-        blurred = cv2.GaussianBlur(gray, (7, 7), 0)  # Increased from (5,5)
+        # One blur shared by every binarization strategy
+        blurred = cv2.GaussianBlur(gray, (blur_kernel, blur_kernel), 0)  # Increased from (5,5)
         
-        # Try without CLAHE (sometimes it causes issues)
-        # clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-        # enhanced = clahe.apply(blurred)
-        enhanced = blurred  # Skip CLAHE
+        if choice is None and self.binarization == "auto":
+            # Score every strategy and keep the best mask (CLAHE is one of them)
+            cp = self.contour_processor
+            return self.binarizer.select(
+                blurred, morph_kernel, cp.min_contour_length / scale, scale)
         
-        # Try different thresholding
-        _, binary = cv2.threshold(enhanced, 127, 255, cv2.THRESH_BINARY)  # Simple threshold
+        if choice is not None:
+            strategy, threshold = choice["strategy"], choice["threshold"]
+        else:
+            strategy, threshold = self.binarization, self.threshold if self.binarization == "fixed" else None
+        block_size = max(3, self.binarizer.block_size // scale) | 1
+        binary, threshold = binarize(blurred, strategy, threshold, block_size, self.binarizer.offset)
+        if choice is None and strategy != "fixed":
+            choice = {"strategy": strategy, "threshold": threshold}
         
         # Morphological operations
-        kernel = np.ones((5, 5), np.uint8)  # Larger kernel
-        cleaned = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
-        cleaned = cv2.morphologyEx(cleaned, cv2.MORPH_OPEN, kernel)
-        
-        return cleaned
+        return clean_mask(binary, morph_kernel), choice
 
 if __name__ == "__main__":
     pipeline = JewelryCADPipeline()
@@ -0,0 +1,173 @@
+# mesh_export.py
+import io
+import os
+import gzip
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# One binary STL record: normal, three vertices, attribute byte count (50 bytes)
+STL_DTYPE = np.dtype([
+    ("normal", "<f4", (3,)),
+    ("vertices", "<f4", (3, 3)),
+    ("attributes", "<u2"),
+])
+
+STL_HEADER = b"Binary STL written by jewelry CAD pipeline"
+
+FORMATS = (".stl", ".stl.gz", ".3mf")
+
+
+def mesh_arrays(mesh):
+    """Accept a trimesh-like object or a (vertices, faces) pair"""
+    if isinstance(mesh, tuple):
+        vertices, faces = mesh
+    else:
+        vertices, faces = mesh.vertices, mesh.faces
+    return (np.asarray(vertices, dtype=np.float64).reshape(-1, 3),
+            np.asarray(faces, dtype=np.int64).reshape(-1, 3))
+
+
+def face_normals(triangles):
+    """Unit normals of an (n, 3, 3) triangle array; zero for degenerate faces"""
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    lengths = np.linalg.norm(normals, axis=1)
+    nonzero = lengths > 0
+    normals[nonzero] /= lengths[nonzero, None]
+    normals[~nonzero] = 0.0
+    return normals
+
+
+def stl_records(vertices, faces):
+    """Build all binary STL records in one vectorized pass"""
+    triangles = vertices[faces]
+    records = np.zeros(len(faces), dtype=STL_DTYPE)
+    records["normal"] = face_normals(triangles)
+    records["vertices"] = triangles
+    return records
+
+
+def write_stl(f, vertices, faces):
+    """Write binary STL to an open binary file object"""
+    records = stl_records(vertices, faces)
+    f.write(STL_HEADER.ljust(80, b"\0")[:80])
+    f.write(np.uint32(len(records)).astype("<u4").tobytes())
+    f.write(memoryview(records).cast("B"))
+
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml"/>'
+    '</Types>'
+)
+
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Target="/3D/3dmodel.model" Id="rel0" '
+    'Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"/>'
+    '</Relationships>'
+)
+
+
+def _rows(array, fmt):
+    """Format every row of a 2D array into one string without a Python loop per row"""
+    buffer = io.StringIO()
+    np.savetxt(buffer, array, fmt=fmt, delimiter="", newline="")
+    return buffer.getvalue()
+
+
+def write_3mf(path, vertices, faces, unit="millimeter"):
+    """
+    Write a single-object 3MF package (zip with an XML model). Vertices are
+    stored at STL's float32 precision; nine significant digits read back to
+    exactly the same float32 values.
+    """
+    vertices = np.asarray(vertices, dtype=np.float32).astype(np.float64)
+    vertex_xml = _rows(vertices, '<vertex x="%.9g" y="%.9g" z="%.9g"/>')
+    triangle_xml = _rows(faces, '<triangle v1="%d" v2="%d" v3="%d"/>')
+    model = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<model unit="{unit}" xml:lang="en-US" '
+        'xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">'
+        '<resources><object id="1" type="model"><mesh>'
+        f'<vertices>{vertex_xml}</vertices>'
+        f'<triangles>{triangle_xml}</triangles>'
+        '</mesh></object></resources>'
+        '<build><item objectid="1"/></build>'
+        '</model>'
+    )
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        archive.writestr("_rels/.rels", _RELS)
+        archive.writestr("3D/3dmodel.model", model)
+
+
+def export_mesh(mesh, path):
+    """
+    Write a mesh to path, choosing the format from the extension:
+    .stl (binary), .stl.gz (gzip-compressed binary STL) or .3mf.
+    The file is written to a temporary name and renamed into place.
+    """
+    vertices, faces = mesh_arrays(mesh)
+    lower = path.lower()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        if lower.endswith(".3mf"):
+            write_3mf(tmp_path, vertices, faces)
+        elif lower.endswith(".gz"):
+            with gzip.open(tmp_path, "wb", compresslevel=6) as f:
+                write_stl(f, vertices, faces)
+        else:
+            with open(tmp_path, "wb") as f:
+                write_stl(f, vertices, faces)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+
+class MeshWriter:
+    """
+    Write meshes on a small thread pool so encoding and disk I/O overlap
+    with the next mesh being built. Use as a context manager; leaving the
+    block waits for every pending write and re-raises the first error.
+    """
+
+    def __init__(self, workers=4):
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.pending = []
+
+    def submit(self, mesh, path):
+        future = self.executor.submit(export_mesh, mesh, path)
+        self.pending.append(future)
+        return future
+
+    def wait(self):
+        pending, self.pending = self.pending, []
+        return [future.result() for future in pending]
+
+    def close(self):
+        try:
+            self.wait()
+        finally:
+            self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def write_meshes(items, workers=4):
+    """Write (mesh, path) pairs concurrently and return the paths in order"""
+    with MeshWriter(workers) as writer:
+        for mesh, path in items:
+            writer.submit(mesh, path)
+        return writer.wait()
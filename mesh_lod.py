@@ -0,0 +1,345 @@
+# mesh_lod.py
+import os
+import heapq
+import numpy as np
+
+# Placement candidates whose quadric system is this close to singular fall
+# back to the edge end points and midpoint
+SINGULAR_DET = 1e-10
+
+
+def plane_quadrics(vertices, faces, area_weighted=False):
+    """
+    Per-vertex error quadrics: the sum of K = p p^T over the planes
+    p = (a, b, c, d) of the faces around every vertex (Garland-Heckbert).
+    v^T Q v is then the sum of squared distances from v to those planes,
+    optionally weighted by face area.
+    """
+    tri = vertices[faces]
+    normals = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+    lengths = np.linalg.norm(normals, axis=1)
+    nonzero = lengths > 0
+    normals[nonzero] /= lengths[nonzero, None]
+    normals[~nonzero] = 0.0
+    planes = np.column_stack((normals, -np.einsum("ij,ij->i", normals, tri[:, 0])))
+    K = planes[:, :, None] * planes[:, None, :]
+    if area_weighted:
+        K *= (lengths / 2.0)[:, None, None]
+    quadrics = np.zeros((len(vertices), 4, 4))
+    for corner in range(3):
+        np.add.at(quadrics, faces[:, corner], K)
+    return quadrics
+
+
+def collapse_targets(quadrics, positions, edges, error_quadrics):
+    """
+    Cost, target position and distance error of collapsing every edge
+    (vectorized). The target minimises the combined quadric when its 3x3
+    system is well conditioned; otherwise the best of the two end points
+    and the midpoint is used, which keeps flat and straight regions from
+    drifting. The error is sqrt(v^T Q v) under the unweighted quadrics, an
+    upper bound on the distance from the target to the original planes.
+    """
+    Q = quadrics[edges[:, 0]] + quadrics[edges[:, 1]]
+    A, b, c = Q[:, :3, :3], Q[:, :3, 3], Q[:, 3, 3]
+    a_end, b_end = positions[edges[:, 0]], positions[edges[:, 1]]
+
+    # Symmetric 3x3 solve by cofactors: A^-1 = [r1 x r2, r2 x r0, r0 x r1] / det
+    cofactors = np.cross(A[:, [1, 2, 0]], A[:, [2, 0, 1]])
+    det = np.einsum("ij,ij->i", A[:, 0], cofactors[:, 0])
+    trace = A[:, 0, 0] + A[:, 1, 1] + A[:, 2, 2]
+    solvable = np.abs(det) > SINGULAR_DET * trace ** 3
+    optimal = -np.einsum("eij,ei->ej", cofactors, b) / np.where(solvable, det, 1.0)[:, None]
+
+    points = np.stack((a_end, b_end, (a_end + b_end) / 2.0, optimal), axis=1)
+    errors = (np.einsum("eki,eij,ekj->ek", points, A, points)
+              + 2.0 * np.einsum("eki,ei->ek", points, b) + c[:, None])
+    # The optimum only counts where it exists
+    errors[~solvable, 3] = np.inf
+    best = np.argmin(errors, axis=1)
+    rows = np.arange(len(edges))
+    target = points[rows, best]
+
+    E = error_quadrics[edges[:, 0]] + error_quadrics[edges[:, 1]]
+    distance = (np.einsum("ei,eij,ej->e", target, E[:, :3, :3], target)
+                + 2.0 * np.einsum("ei,ei->e", target, E[:, :3, 3]) + E[:, 3, 3])
+    return np.maximum(errors[rows, best], 0.0), target, np.sqrt(np.maximum(distance, 0.0))
+
+
+# Upper triangle of a symmetric 4x4 quadric, the packed form used per collapse
+PACKED = ([0, 0, 0, 0, 1, 1, 1, 2, 2, 3], [0, 1, 2, 3, 1, 2, 3, 2, 3, 3])
+
+
+def _quadric_form(q, x, y, z):
+    a00, a01, a02, a03, a11, a12, a13, a22, a23, a33 = q
+    return (a00 * x * x + a11 * y * y + a22 * z * z + a33
+            + 2.0 * (a01 * x * y + a02 * x * z + a12 * y * z + a03 * x + a13 * y + a23 * z))
+
+
+def collapse_target(q, e, pa, pb):
+    """
+    collapse_targets for a single edge on packed quadrics. Collapses only
+    re-cost a few edges at a time, where plain Python beats NumPy's
+    per-call overhead.
+    """
+    a00, a01, a02, a03, a11, a12, a13, a22, a23, a33 = q
+    c0 = a11 * a22 - a12 * a12
+    c1 = a12 * a02 - a01 * a22
+    c2 = a01 * a12 - a11 * a02
+    det = a00 * c0 + a01 * c1 + a02 * c2
+    candidates = [pa, pb, ((pa[0] + pb[0]) / 2.0, (pa[1] + pb[1]) / 2.0, (pa[2] + pb[2]) / 2.0)]
+    if abs(det) > SINGULAR_DET * (a00 + a11 + a22) ** 3:
+        c4 = a00 * a22 - a02 * a02
+        c5 = a01 * a02 - a00 * a12
+        c8 = a00 * a11 - a01 * a01
+        candidates.append((-(c0 * a03 + c1 * a13 + c2 * a23) / det,
+                           -(c1 * a03 + c4 * a13 + c5 * a23) / det,
+                           -(c2 * a03 + c5 * a13 + c8 * a23) / det))
+    cost, target = min(((_quadric_form(q, *p), p) for p in candidates), key=lambda item: item[0])
+    return max(cost, 0.0), list(target), max(_quadric_form(e, *target), 0.0) ** 0.5
+
+
+def unique_edges(faces):
+    edges = np.sort(faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+    return np.unique(edges, axis=0)
+
+
+def _normal(a, b, c):
+    ux, uy, uz = b[0] - a[0], b[1] - a[1], b[2] - a[2]
+    vx, vy, vz = c[0] - a[0], c[1] - a[1], c[2] - a[2]
+    return (uy * vz - uz * vy, uz * vx - ux * vz, ux * vy - uy * vx)
+
+
+class QuadricDecimator:
+    """
+    Edge-collapse decimation of a closed manifold triangle mesh.
+
+    The vertex quadrics, face adjacency and the priority queue of edge
+    collapses are built once; decimate() then collapses the cheapest edge
+    repeatedly and snapshots the mesh every time it reaches one of the
+    requested levels, so all levels come out of a single pass.
+
+    Collapses are ordered by area-weighted quadrics, so crossing the
+    thickness of a thin extrusion is never cheap; the reported error uses
+    unweighted quadrics and is a distance in model units. A collapse is
+    skipped when it would change the topology (link condition, duplicate
+    faces) or flip or degenerate a face, so every level stays watertight
+    if the input is.
+    """
+
+    def __init__(self, vertices, faces, min_normal_dot=0.0):
+        positions = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+        faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+        self.min_normal_dot = min_normal_dot
+        quadrics = plane_quadrics(positions, faces, area_weighted=True)
+        error_quadrics = plane_quadrics(positions, faces)
+        self.positions = positions.copy()
+
+        # Per-collapse bookkeeping touches a handful of faces at a time,
+        # which is much cheaper on Python lists than on NumPy rows
+        self.points = positions.tolist()
+        self.faces = faces.tolist()
+        self.face_alive = [True] * len(self.faces)
+        self.face_count = len(self.faces)
+        self.stamps = [0] * len(self.points)
+        self.vertex_faces = [set() for _ in self.points]
+        for f, face in enumerate(self.faces):
+            for w in face:
+                self.vertex_faces[w].add(f)
+        self.vertex_alive = [bool(fs) for fs in self.vertex_faces]
+
+        # Initial costs for every edge in one vectorized pass
+        edges = unique_edges(faces)
+        costs, targets, distances = collapse_targets(quadrics, positions, edges, error_quadrics)
+        self.heap = [(cost, u, v, 0, 0, distance, target)
+                     for (u, v), cost, target, distance in zip(
+                         edges.tolist(), costs.tolist(), targets.tolist(), distances.tolist())]
+        heapq.heapify(self.heap)
+        self.quadrics = quadrics[:, PACKED[0], PACKED[1]].tolist()
+        self.error_quadrics = error_quadrics[:, PACKED[0], PACKED[1]].tolist()
+        self.max_error = 0.0
+
+    def _neighbours(self, vertex):
+        faces = self.faces
+        ring = set()
+        for f in self.vertex_faces[vertex]:
+            ring.update(faces[f])
+        ring.discard(vertex)
+        return ring
+
+    def _can_collapse(self, u, v, target):
+        faces, points = self.faces, self.points
+        faces_u, faces_v = self.vertex_faces[u], self.vertex_faces[v]
+        shared = faces_u & faces_v
+        if len(shared) != 2:
+            return False
+
+        # Link condition: u and v may only share the two opposite vertices
+        opposite = set()
+        for f in shared:
+            opposite.update(faces[f])
+        opposite -= {u, v}
+        if self._neighbours(u) & self._neighbours(v) != opposite:
+            return False
+
+        keys = set()
+        for f in (faces_u | faces_v) - shared:
+            before = faces[f]
+            after = [u if w == v else w for w in before]
+            # Two faces over the same three vertices would fold the surface
+            key = tuple(sorted(after))
+            if key in keys:
+                return False
+            keys.add(key)
+
+            n_old = _normal(*(points[w] for w in before))
+            n_new = _normal(*(target if w == u else points[w] for w in after))
+            len_old = (n_old[0] ** 2 + n_old[1] ** 2 + n_old[2] ** 2) ** 0.5
+            len_new = (n_new[0] ** 2 + n_new[1] ** 2 + n_new[2] ** 2) ** 0.5
+            if len_new <= 1e-12 * max(len_old, 1e-300):
+                return False
+            dot = n_old[0] * n_new[0] + n_old[1] * n_new[1] + n_old[2] * n_new[2]
+            if dot <= self.min_normal_dot * len_old * len_new:
+                return False
+        return True
+
+    def _collapse(self, u, v, target):
+        faces = self.faces
+        shared = self.vertex_faces[u] & self.vertex_faces[v]
+        for f in shared:
+            self.face_alive[f] = False
+            for w in faces[f]:
+                self.vertex_faces[w].discard(f)
+        self.face_count -= len(shared)
+
+        for f in self.vertex_faces[v]:
+            faces[f] = [u if w == v else w for w in faces[f]]
+            self.vertex_faces[u].add(f)
+        self.vertex_faces[v] = set()
+        self.vertex_alive[v] = False
+
+        self.points[u] = target
+        self.positions[u] = target
+        quadrics, error_quadrics = self.quadrics, self.error_quadrics
+        quadrics[u] = [a + b for a, b in zip(quadrics[u], quadrics[v])]
+        error_quadrics[u] = [a + b for a, b in zip(error_quadrics[u], error_quadrics[v])]
+        self.stamps[u] += 1
+
+        # Every edge around u changed; older heap entries go stale via the stamp
+        points, stamps = self.points, self.stamps
+        for w in self._neighbours(u):
+            a, b = (u, w) if u < w else (w, u)
+            cost, t, distance = collapse_target(
+                [x + y for x, y in zip(quadrics[a], quadrics[b])],
+                [x + y for x, y in zip(error_quadrics[a], error_quadrics[b])],
+                points[a], points[b])
+            heapq.heappush(self.heap, (cost, a, b, stamps[a], stamps[b], distance, t))
+
+    def _next(self):
+        """Pop the cheapest valid collapse, or None when none is left"""
+        heap, alive, stamps = self.heap, self.vertex_alive, self.stamps
+        while heap:
+            entry = heapq.heappop(heap)
+            _, u, v, su, sv, _, target = entry
+            if not (alive[u] and alive[v]) or stamps[u] != su or stamps[v] != sv:
+                continue
+            if self._can_collapse(u, v, target):
+                return entry
+        return None
+
+    def snapshot(self):
+        """Current mesh as compact (vertices, faces) arrays"""
+        faces = np.array([face for face, alive in zip(self.faces, self.face_alive) if alive],
+                         dtype=np.int64).reshape(-1, 3)
+        used = np.unique(faces)
+        remap = np.full(len(self.points), -1, dtype=np.int64)
+        remap[used] = np.arange(len(used))
+        return self.positions[used].copy(), remap[faces]
+
+    def decimate(self, face_budgets=(), tolerances=()):
+        """
+        Emit one level per face budget (at most that many faces) and per
+        error tolerance (stop before a collapse whose error would exceed
+        it). Returns dicts with vertices, faces, the requested "target" and
+        the largest "error" accepted so far, ordered from most to least
+        detailed.
+        """
+        levels = [("faces", int(b)) for b in face_budgets] + [("error", float(t)) for t in tolerances]
+        results = []
+        pending = list(levels)
+        candidate = self._next()
+
+        while pending:
+            reached = [level for level in pending
+                       if candidate is None
+                       or (level[0] == "faces" and self.face_count <= level[1])
+                       or (level[0] == "error" and candidate[5] > level[1])]
+            if reached:
+                vertices, faces = self.snapshot()
+                for level in reached:
+                    pending.remove(level)
+                    results.append({
+                        "target": level,
+                        "vertices": vertices,
+                        "faces": faces,
+                        "error": self.max_error,
+                    })
+                continue
+
+            _, u, v, _, _, distance, target = candidate
+            self._collapse(u, v, target)
+            self.max_error = max(self.max_error, distance)
+            candidate = self._next()
+
+        return results
+
+
+class LODGenerator:
+    """
+    Build lighter copies of a finished mesh for previews and quoting.
+    face_budgets and tolerances (quadric error as a distance, in model
+    units) may be combined; each gives one level of detail.
+    """
+
+    def __init__(self, face_budgets=(), tolerances=(), verbose=True):
+        self.face_budgets = sorted((int(b) for b in face_budgets or ()), reverse=True)
+        self.tolerances = sorted(float(t) for t in tolerances or ())
+        self.verbose = verbose
+
+    @property
+    def enabled(self):
+        return bool(self.face_budgets or self.tolerances)
+
+    def params(self):
+        return {"face_budgets": self.face_budgets, "tolerances": self.tolerances}
+
+    def log(self, message):
+        if self.verbose:
+            print(message)
+
+    def generate(self, mesh):
+        """Return [(mesh, info)] with one trimesh per level, most detailed first"""
+        if mesh is None or not self.enabled:
+            return []
+        import trimesh
+
+        decimator = QuadricDecimator(mesh.vertices, mesh.faces)
+        levels = decimator.decimate(self.face_budgets, self.tolerances)
+        lods = []
+        for level in levels:
+            lod = trimesh.Trimesh(vertices=level["vertices"], faces=level["faces"], process=False)
+            kind, value = level["target"]
+            info = {kind: value, "face_count": len(level["faces"]), "error": level["error"]}
+            self.log(f"LOD {kind}={value}: {len(level['faces'])} faces, error {level['error']:.4f}")
+            lods.append((lod, info))
+        return lods
+
+
+def lod_path(path, index):
+    """ring.stl -> ring_lod1.stl (keeps double extensions such as .stl.gz)"""
+    lower = path.lower()
+    for ext in (".stl.gz", ".stl", ".3mf"):
+        if lower.endswith(ext):
+            return f"{path[:-len(ext)]}_lod{index}{path[-len(ext):]}"
+    root, ext = os.path.splitext(path)
+    return f"{root}_lod{index}{ext}"
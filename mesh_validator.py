@@ -1,43 +1,133 @@
 # mesh_validator.py
-import trimesh
+import time
+import hashlib
+from collections import OrderedDict
 import numpy as np
 
 class MeshValidator:
-    def __init__(self):
-        pass
+    """
+    Tiered mesh validation.
+
+    Tier 0 runs cheap O(n) array checks (face/edge counts, degenerate
+    faces, edge manifoldness, winding, area, bounds). Tier 1 runs the
+    grid-accelerated triangle-triangle self-intersection test. The "fast"
+    profile stops after tier 0; "full" runs every tier unless early_exit is
+    set and tier 0 already failed. Results are memoized on a hash of the
+    vertex and face arrays, so re-validating an unchanged mesh is free.
+    """
+    
+    PROFILES = {
+        "fast": {"self_intersections": False, "early_exit": True},
+        "full": {"self_intersections": True, "early_exit": False},
+    }
+    
+    def __init__(self, profile="full", min_dimension=0.1, memo_size=64):
+        if profile not in self.PROFILES:
+            raise ValueError(f"Unknown validation profile: {profile}")
+        self.profile = profile
+        self.min_dimension = min_dimension
+        self.memo_size = memo_size
+        self._memo = OrderedDict()
+        # Report of the most recent validation (tier timings and stats)
+        self.last_report = None
+    
+    def clear_memo(self):
+        self._memo.clear()
+        self.last_report = None
     
     def validate_mesh(self, mesh):
+        report = self.validate_report(mesh)
+        return report["is_valid"], list(report["issues"])
+    
+    def validate_report(self, mesh):
+        if mesh is None:
+            return {"is_valid": False, "issues": ["Mesh is None"], "stats": {}, "timings": {}}
+        
+        vertices = np.ascontiguousarray(mesh.vertices, dtype=np.float64)
+        faces = np.ascontiguousarray(mesh.faces, dtype=np.int64)
+        key = self._hash(vertices, faces)
+        if key in self._memo:
+            self._memo.move_to_end(key)
+            self.last_report = self._memo[key]
+            return self.last_report
+        
+        settings = self.PROFILES[self.profile]
         issues = []
+        stats = {}
+        timings = {}
         
-        if mesh is None:
-            return False, ["Mesh is None"]
+        start = time.perf_counter()
+        self._check_cheap(vertices, faces, issues, stats)
+        timings["tier0"] = time.perf_counter() - start
         
-        # Check if mesh is watertight
-        if hasattr(mesh, 'is_watertight') and not mesh.is_watertight:
-            issues.append("Mesh is not watertight")
+        if settings["self_intersections"] and len(faces) > 0:
+            if not (settings["early_exit"] and issues):
+                start = time.perf_counter()
+                pairs = find_self_intersections(vertices, faces)
+                timings["self_intersections"] = time.perf_counter() - start
+                stats["self_intersecting_pairs"] = len(pairs)
+                if len(pairs):
+                    issues.append("Mesh has self-intersections")
         
-        # Check for degenerate faces
-        if hasattr(mesh, 'faces') and mesh.faces.shape[0] > 0:
-            if hasattr(mesh, 'area') and mesh.area < 1e-6:
-                issues.append("Mesh area is too small")
+        report = {
+            "is_valid": len(issues) == 0,
+            "issues": issues,
+            "stats": stats,
+            "timings": timings,
+            "profile": self.profile,
+        }
+        self._memo[key] = report
+        if len(self._memo) > self.memo_size:
+            self._memo.popitem(last=False)
+        self.last_report = report
+        return report
+    
+    def _check_cheap(self, vertices, faces, issues, stats):
+        stats["vertices"] = len(vertices)
+        stats["faces"] = len(faces)
+        
+        if len(faces) > 0:
+            # Degenerate faces and total area from one cross product
+            tri = vertices[faces]
+            cross = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+            double_area = np.sqrt(np.einsum("ij,ij->i", cross, cross))
+            degenerate = int(np.count_nonzero(double_area < 1e-12))
+            stats["degenerate_faces"] = degenerate
+            if degenerate:
+                issues.append(f"Mesh has {degenerate} degenerate faces")
+            
+            # Edge use counts: every edge of a closed manifold is shared by two faces.
+            # Edges are packed into single int64 keys so np.unique stays 1-D.
+            directed = faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2)
+            n = max(len(vertices), 1)
+            undirected = np.sort(directed, axis=1)
+            _, counts = np.unique(undirected[:, 0] * n + undirected[:, 1], return_counts=True)
+            stats["boundary_edges"] = int(np.count_nonzero(counts == 1))
+            stats["non_manifold_edges"] = int(np.count_nonzero(counts > 2))
+            if stats["boundary_edges"] or stats["non_manifold_edges"]:
+                issues.append("Mesh is not watertight")
             
-            # Check for non-manifold edges
-            if hasattr(mesh, 'is_winding_consistent') and not mesh.is_winding_consistent:
+            # Consistent winding: neighbours traverse a shared edge in opposite directions
+            _, directed_counts = np.unique(directed[:, 0] * n + directed[:, 1], return_counts=True)
+            if np.any(directed_counts > 1):
                 issues.append("Mesh has inconsistent winding")
             
-            # Check for self-intersections (only if available)
-            if hasattr(mesh, 'self_intersecting') and mesh.self_intersecting:
-                issues.append("Mesh has self-intersections")
+            if double_area.sum() / 2.0 < 1e-6:
+                issues.append("Mesh area is too small")
         
         # Check thickness (minimum dimension)
-        if hasattr(mesh, 'bounds'):
-            bounds = mesh.bounds
-            size = bounds[1] - bounds[0]
-            if min(size) < 0.1:  # Minimum thickness check
+        if len(vertices) > 0:
+            size = vertices.max(axis=0) - vertices.min(axis=0)
+            if min(size) < self.min_dimension:  # Minimum thickness check
                 issues.append(f"Mesh is too thin in one dimension: {min(size):.3f}")
-        
-        is_valid = len(issues) == 0
-        return is_valid, issues
+    
+    @staticmethod
+    def _hash(vertices, faces):
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(np.asarray(vertices.shape).tobytes())
+        digest.update(vertices.tobytes())
+        digest.update(faces.tobytes())
+        return digest.hexdigest()
     
     def fix_mesh(self, mesh):
         if mesh is None:
@@ -66,3 +156,339 @@ class MeshValidator:
         except Exception as e:
             print(f"Mesh fixing failed: {e}")
             return mesh
+
+
+def find_self_intersections(vertices, faces, max_cells=None):
+    """
+    Return (k, 2) index pairs of faces that intersect or touch each other.
+    In a closed mesh only faces with a common vertex may touch, so every
+    pair reported is a defect.
+    
+    Broad phase: triangles whose bounding box is flat along an axis (such as
+    the caps of an extrusion) can only cross triangles that straddle that
+    plane, so they are dropped when nothing does. The rest are hashed into a
+    uniform grid sized to the typical triangle; candidate pairs share a cell,
+    overlap in their bounding boxes and share no vertex position. Narrow
+    phase: Moller's interval-overlap triangle-triangle test with contact on
+    an edge or vertex included, and a 2D overlap test for coplanar pairs,
+    vectorized over all candidates. Contacts inside an axis-aligned plane,
+    which the broad phase drops, are found by _planar_contacts.
+    """
+    faces = np.asarray(faces, dtype=np.int64)
+    if len(faces) < 2:
+        return np.zeros((0, 2), dtype=np.int64)
+    
+    vertices = np.asarray(vertices, dtype=np.float64)
+    tri = vertices[faces]
+    lo = tri.min(axis=1)
+    hi = tri.max(axis=1)
+    # Vertex positions rather than indices, so unmerged copies of a vertex
+    # count as shared too
+    corners = _position_ids(vertices)[faces]
+    flat = (hi - lo) <= 1e-12 * max(float(np.abs(hi).max()), 1.0)
+    
+    found = [_planar_contacts(tri, corners, flat, lo)]
+    active = np.flatnonzero(_may_cross(lo, hi, flat))
+    if len(active) >= 2:
+        pairs = active[_grid_candidate_pairs(lo[active], hi[active], max_cells or 8 * len(active))]
+        if len(pairs):
+            a, b = pairs[:, 0], pairs[:, 1]
+            # Neighbours sharing a vertex touch by construction
+            shared = (corners[a][:, :, None] == corners[b][:, None, :]).any(axis=(1, 2))
+            overlap = np.all((lo[a] <= hi[b]) & (lo[b] <= hi[a]), axis=1)
+            pairs = pairs[overlap & ~shared]
+            found.append(pairs[_triangles_touch(tri[pairs[:, 0]], tri[pairs[:, 1]])])
+    
+    pairs = np.sort(np.concatenate(found), axis=1)
+    return np.unique(pairs, axis=0) if len(pairs) else pairs
+
+
+def _position_ids(vertices):
+    """One id per distinct vertex position"""
+    order = np.lexsort(vertices.T[::-1])
+    ordered = vertices[order]
+    new = np.r_[True, np.any(ordered[1:] != ordered[:-1], axis=1)]
+    ids = np.empty(len(vertices), dtype=np.int64)
+    ids[order] = np.cumsum(new) - 1
+    return ids
+
+
+def _may_cross(lo, hi, flat):
+    """
+    Boolean mask of boxes that can strictly overlap some other box.
+    A box that is flat along an axis at c needs another box whose interval
+    on that axis strictly contains c; counting those is two binary searches.
+    """
+    keep = ~flat.any(axis=1)
+    for axis in range(3):
+        flat_boxes = np.flatnonzero(flat[:, axis])
+        if len(flat_boxes) == 0:
+            continue
+        solid = ~flat[:, axis]
+        starts = np.sort(lo[solid, axis])
+        ends = np.sort(hi[solid, axis])
+        c = lo[flat_boxes, axis]
+        straddling = np.searchsorted(starts, c, "left") - np.searchsorted(ends, c, "right")
+        keep[flat_boxes[straddling > 0]] = True
+    return keep
+
+
+def _planar_contacts(tri, corners, flat, lo):
+    """
+    Pairs of faces that meet inside an axis-aligned plane: overlapping caps,
+    or walls ending on another part's cap. Pairing the faces of a plane
+    directly is too slow (earcut caps are long slivers whose boxes all
+    overlap), but in a closed mesh two separate regions of a plane only
+    meet where their outlines (edges used by one face of the plane) touch,
+    or where one lies inside the other. So the outlines are paired on the
+    grid, and one vertex of each region is tested against the others'
+    outlines by winding number.
+    """
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+    
+    none = np.zeros((0, 2), dtype=np.int64)
+    face = np.flatnonzero(flat.sum(axis=1) == 1)
+    if len(face) < 2:
+        return none
+    # Planes: faces flat along the same axis at the same coordinate
+    axis = np.argmax(flat[face], axis=1)
+    group = np.empty(len(face), dtype=np.int64)
+    groups = 0
+    for k in range(3):
+        on_axis = axis == k
+        _, index = np.unique(lo[face[on_axis], k], return_inverse=True)
+        group[on_axis] = index.reshape(-1) + groups
+        groups += int(index.max()) + 1 if len(index) else 0
+    
+    # Regions: faces of one plane connected through shared vertex positions
+    edge_face = np.repeat(face, 3)
+    edge_group = np.repeat(group, 3)
+    start = corners[face].reshape(-1)
+    end = corners[face][:, [1, 2, 0]].reshape(-1)
+    n = int(corners.max()) + 1
+    nodes, node = np.unique(np.r_[edge_group * n + start, edge_group * n + end], return_inverse=True)
+    m = len(start)
+    node_start, node_end = node[:m], node[m:]
+    graph = coo_matrix((np.ones(m), (node_start, node_end)), shape=(len(nodes), len(nodes)))
+    _, region = connected_components(graph, directed=False)
+    edge_region = region[node_start]
+    face_region = edge_region[::3]
+    
+    # Only planes holding more than one region can have contacts
+    regions, first_edge = np.unique(edge_region, return_index=True)
+    regions_per_group = np.bincount(edge_group[first_edge], minlength=groups)
+    
+    # Outline: edges used once in their plane, in the winding of their face
+    keys = np.minimum(node_start, node_end) * len(nodes) + np.maximum(node_start, node_end)
+    _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    outline = np.flatnonzero((counts[inverse] == 1) & (regions_per_group[edge_group] > 1))
+    if len(outline) == 0:
+        return none
+    
+    seg_face, seg_group, seg_region = edge_face[outline], edge_group[outline], edge_region[outline]
+    seg_ends = np.column_stack((start[outline], end[outline]))
+    corner = outline % 3
+    flat_axis = np.argmax(flat[seg_face], axis=1)
+    keep_axes = np.array([[1, 2], [0, 2], [0, 1]])[flat_axis]
+    points = tri[seg_face]
+    p = np.take_along_axis(points[np.arange(len(outline)), corner], keep_axes, axis=1)
+    q = np.take_along_axis(points[np.arange(len(outline)), (corner + 1) % 3], keep_axes, axis=1)
+    extent = max(float(np.abs(tri).max()), 1.0)
+    eps = 1e-9 * extent
+    tol = eps * extent
+    
+    found = []
+    # Outline edges of one plane that touch without sharing an end
+    seg_lo = np.column_stack((np.minimum(p, q), seg_group))
+    seg_hi = np.column_stack((np.maximum(p, q), seg_group))
+    pairs = _grid_candidate_pairs(seg_lo, seg_hi, 8 * len(outline))
+    if len(pairs):
+        a, b = pairs[:, 0], pairs[:, 1]
+        shared = (seg_ends[a][:, :, None] == seg_ends[b][:, None, :]).any(axis=(1, 2))
+        same = (seg_group[a] == seg_group[b]) & ~shared
+        a, b = a[same], b[same]
+        touch = _segments_touch(p[a], q[a], p[b], q[b], np.full(len(a), eps))
+        found.append(np.column_stack((seg_face[a][touch], seg_face[b][touch])))
+    
+    # A region inside another: nonzero winding number of the other regions'
+    # outlines at one of its vertices
+    order = np.argsort(seg_group, kind="stable")
+    bounds = np.searchsorted(seg_group[order], np.arange(groups + 1))
+    _, first = np.unique(seg_region, return_index=True)
+    for i in first:
+        others = order[bounds[seg_group[i]]:bounds[seg_group[i] + 1]]
+        others = others[seg_region[others] != seg_region[i]]
+        if _winding(p[i], p[others], q[others]) == 0:
+            continue
+        # Report it against the face of the plane that contains the vertex
+        in_plane = face[(group == seg_group[i]) & (face_region != seg_region[i])]
+        inside = _point_in_triangles(p[i], tri[in_plane][:, :, keep_axes[i]], tol)
+        if inside.any():
+            found.append(np.array([[seg_face[i], in_plane[np.argmax(inside)]]]))
+    
+    return np.concatenate(found) if found else none
+
+
+def _winding(point, p, q):
+    """Winding number of the directed 2D edges p -> q around point"""
+    side = (q[:, 0] - p[:, 0]) * (point[1] - p[:, 1]) - (q[:, 1] - p[:, 1]) * (point[0] - p[:, 0])
+    up = (p[:, 1] <= point[1]) & (q[:, 1] > point[1]) & (side > 0)
+    down = (q[:, 1] <= point[1]) & (p[:, 1] > point[1]) & (side < 0)
+    return int(up.sum() - down.sum())
+
+
+def _grid_candidate_pairs(lo, hi, max_cells):
+    """Unique (i, j), i < j pairs of boxes that share at least one grid cell"""
+    # Cells are sized per axis: extrusion walls are thin in x/y but tall in z
+    origin = lo.min(axis=0)
+    total = np.maximum(hi.max(axis=0) - origin, 1e-9)
+    cell = np.maximum(np.percentile(hi - lo, 75, axis=0), total / 1024.0)
+    
+    # Grow the cells until the total number of box/cell entries is bounded
+    while True:
+        first = np.floor((lo - origin) / cell).astype(np.int64)
+        last = np.floor((hi - origin) / cell).astype(np.int64)
+        span = last - first + 1
+        per_box = span.prod(axis=1)
+        if per_box.sum() <= max_cells:
+            break
+        cell *= 2.0
+    
+    # Expand each box into the cells it covers
+    box = np.repeat(np.arange(len(lo)), per_box)
+    local = np.arange(per_box.sum()) - np.repeat(np.cumsum(per_box) - per_box, per_box)
+    sy = span[box, 1]
+    sz = span[box, 2]
+    cx = first[box, 0] + local // (sy * sz)
+    cy = first[box, 1] + (local // sz) % sy
+    cz = first[box, 2] + local % sz
+    
+    dims = last.max(axis=0) + 1
+    cell_id = (cx * dims[1] + cy) * dims[2] + cz
+    order = np.lexsort((box, cell_id))
+    cell_id = cell_id[order]
+    box = box[order]
+    
+    # Pair every entry with the entries after it in the same cell
+    n = len(box)
+    starts = np.flatnonzero(np.r_[True, cell_id[1:] != cell_id[:-1]])
+    sizes = np.diff(np.r_[starts, n])
+    group = np.repeat(np.arange(len(starts)), sizes)
+    count = sizes[group] - 1 - (np.arange(n) - starts[group])
+    if count.sum() == 0:
+        return np.zeros((0, 2), dtype=np.int64)
+    first = np.repeat(np.arange(n), count)
+    step = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+    pairs = np.column_stack((box[first], box[first + 1 + step]))
+    
+    pairs.sort(axis=1)
+    # Boxes sharing several cells appear more than once
+    n_boxes = len(lo)
+    keys = np.sort(pairs[:, 0] * n_boxes + pairs[:, 1])
+    keys = keys[np.r_[True, keys[1:] != keys[:-1]]]
+    return np.column_stack((keys // n_boxes, keys % n_boxes))
+
+
+def _triangles_touch(tri_a, tri_b, rtol=1e-9):
+    """
+    Moller's triangle-triangle test over (n, 3, 3) arrays, boundary included.
+    Each triangle must reach the other's plane; the segments where the two
+    cut the line common to both planes must then overlap. Coplanar pairs
+    are tested in 2D. Degenerate triangles never touch.
+    """
+    # Distance tolerance relative to the size of each pair
+    size = np.maximum(tri_a.max(axis=1), tri_b.max(axis=1)) - np.minimum(tri_a.min(axis=1), tri_b.min(axis=1))
+    eps = rtol * np.maximum(size.max(axis=1), 1e-12)
+    
+    n_a, ok_a = _unit(np.cross(tri_a[:, 1] - tri_a[:, 0], tri_a[:, 2] - tri_a[:, 0]))
+    n_b, ok_b = _unit(np.cross(tri_b[:, 1] - tri_b[:, 0], tri_b[:, 2] - tri_b[:, 0]))
+    
+    # Signed distances of each triangle's corners to the other's plane
+    dist_a = _snap(np.einsum("nij,nj->ni", tri_a - tri_b[:, :1], n_b), eps)
+    dist_b = _snap(np.einsum("nij,nj->ni", tri_b - tri_a[:, :1], n_a), eps)
+    reaches = ((dist_a.min(axis=1) <= 0) & (dist_a.max(axis=1) >= 0)
+               & (dist_b.min(axis=1) <= 0) & (dist_b.max(axis=1) >= 0))
+    hit = ok_a & ok_b & reaches
+    coplanar = hit & np.all(dist_a == 0, axis=1)
+    
+    crossing = hit & ~coplanar
+    if crossing.any():
+        direction, _ = _unit(np.cross(n_a[crossing], n_b[crossing]))
+        lo_a, hi_a = _plane_interval(tri_a[crossing], dist_a[crossing], direction)
+        lo_b, hi_b = _plane_interval(tri_b[crossing], dist_b[crossing], direction)
+        hit[crossing] = np.maximum(lo_a, lo_b) <= np.minimum(hi_a, hi_b) + eps[crossing]
+    if coplanar.any():
+        hit[coplanar] = _coplanar_overlap(tri_a[coplanar], tri_b[coplanar], n_b[coplanar],
+                                          eps[coplanar])
+    return hit
+
+
+def _unit(vectors):
+    length = np.sqrt(np.einsum("ij,ij->i", vectors, vectors))
+    ok = length > 1e-300
+    return vectors / np.where(ok, length, 1.0)[:, None], ok & (length > 0)
+
+
+def _snap(distances, eps):
+    return np.where(np.abs(distances) <= eps[:, None], 0.0, distances)
+
+
+def _plane_interval(tri, dist, direction):
+    """
+    Extent along direction of the part of each triangle that lies in the
+    other triangle's plane: its corners on the plane and the points where
+    its edges cross it.
+    """
+    proj = np.einsum("nij,nj->ni", tri, direction)
+    values = np.where(dist == 0, proj, np.nan)
+    crossings = []
+    for i, j in ((0, 1), (1, 2), (2, 0)):
+        di, dj = dist[:, i], dist[:, j]
+        cut = di * dj < 0
+        t = di / np.where(cut, di - dj, 1.0)
+        crossings.append(np.where(cut, proj[:, i] + (proj[:, j] - proj[:, i]) * t, np.nan))
+    values = np.column_stack([values] + crossings)
+    lo = np.min(np.where(np.isnan(values), np.inf, values), axis=1)
+    hi = np.max(np.where(np.isnan(values), -np.inf, values), axis=1)
+    return lo, hi
+
+
+def _orient(p, q, r, tol):
+    """Twice the signed area of (p, q, r) for (n, 2) arrays, zero within tol"""
+    value = (q[:, 0] - p[:, 0]) * (r[:, 1] - p[:, 1]) - (q[:, 1] - p[:, 1]) * (r[:, 0] - p[:, 0])
+    return np.where(np.abs(value) <= tol, 0.0, value)
+
+
+def _segments_touch(p, q, r, s, eps):
+    """2D segments p-q and r-s meet, ends included"""
+    tol = eps * eps / 1e-9
+    straddle = ((_orient(p, q, r, tol) * _orient(p, q, s, tol) <= 0)
+                & (_orient(r, s, p, tol) * _orient(r, s, q, tol) <= 0))
+    boxes = np.all((np.minimum(p, q) <= np.maximum(r, s) + eps[:, None])
+                   & (np.minimum(r, s) <= np.maximum(p, q) + eps[:, None]), axis=1)
+    return straddle & boxes
+
+
+def _point_in_triangles(points, tri, tol):
+    """Which 2D triangles (n, 3, 2) contain their point (one or n), boundary included"""
+    points = np.broadcast_to(points, (len(tri), 2))
+    o = np.column_stack([_orient(tri[:, i], tri[:, j], points, tol)
+                         for i, j in ((0, 1), (1, 2), (2, 0))])
+    return np.all(o >= 0, axis=1) | np.all(o <= 0, axis=1)
+
+
+def _coplanar_overlap(tri_a, tri_b, normal, eps):
+    """2D overlap of coplanar triangles, projected along the normal's largest axis"""
+    drop = np.argmax(np.abs(normal), axis=1)
+    axes = np.array([[1, 2], [0, 2], [0, 1]])[drop]
+    a = np.take_along_axis(tri_a, axes[:, None, :], axis=2)
+    b = np.take_along_axis(tri_b, axes[:, None, :], axis=2)
+    
+    hit = np.zeros(len(a), dtype=bool)
+    for i, j in ((0, 1), (1, 2), (2, 0)):
+        for k, l in ((0, 1), (1, 2), (2, 0)):
+            hit |= _segments_touch(a[:, i], a[:, j], b[:, k], b[:, l], eps)
+    # No edges meet: one triangle is inside the other or they are apart
+    tol = eps * eps / 1e-9
+    return hit | _point_in_triangles(a[:, 0], b, tol) | _point_in_triangles(b[:, 0], a, tol)
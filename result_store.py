@@ -0,0 +1,171 @@
+# result_store.py
+import os
+import shutil
+import tempfile
+import weakref
+import multiprocessing
+import multiprocessing.util
+import numpy as np
+from stage_cache import ENCODERS, DECODERS
+
+# Result fields kept in memory under each retention mode ("lods": the
+# meshes of the levels of detail; their info is always kept)
+RETENTION = {
+    "full": {"image", "processed", "contours", "refined_contours", "vector_curves", "mesh", "lods"},
+    "geometry": {"vector_curves", "mesh"},
+    "summary": set(),
+}
+
+# How each large field is written to disk (stage cache codecs where one fits)
+SPILL_KINDS = {
+    "image": "array",
+    "processed": "array",
+    "contours": "contours",
+    "refined_contours": "contours",
+    "vector_curves": "curves",
+    "mesh": "mesh",
+}
+
+
+def _encode(kind, value):
+    if kind == "array":
+        return {"array": np.asarray(value)}
+    if kind == "contours":
+        return ENCODERS["contours"]((list(value), []))
+    return ENCODERS[kind](value)
+
+
+def _decode(kind, arrays):
+    if kind == "array":
+        return arrays["array"]
+    if kind == "contours":
+        return DECODERS["contours"](arrays)[0]
+    return DECODERS[kind](arrays)
+
+
+def _remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class Spilled:
+    """
+    Placeholder for a result field stored as .npy files. The files are
+    deleted once the placeholder itself is garbage collected, so results
+    that are dropped (e.g. by batch workers after each job) don't leave
+    their spills behind.
+    """
+
+    def __init__(self, kind, paths):
+        self.kind = kind
+        self.paths = paths
+        weakref.finalize(self, _remove_files, list(paths.values()))
+
+    def load(self):
+        # Memory-mapped, so only the pages that are read come off disk
+        arrays = {name: np.load(path, mmap_mode="r") for name, path in self.paths.items()}
+        return _decode(self.kind, arrays)
+
+    def __repr__(self):
+        return f"Spilled({self.kind!r}, {sorted(self.paths)})"
+
+
+class LazyResult(dict):
+    """
+    process_image result whose spilled fields are loaded from disk when
+    they are read (result["image"], result.get("mesh"), ...). Loaded
+    values are not kept, so holding many results stays cheap.
+    """
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        return value.load() if isinstance(value, Spilled) else value
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def spilled_keys(self):
+        return [key for key, value in dict.items(self) if isinstance(value, Spilled)]
+
+
+class ResultStore:
+    """
+    Applies a retention mode to process_image results. Fields that are not
+    retained are written as .npy files under spill_dir (a temporary folder
+    removed with the store, or by close(), when none is given) and replaced
+    by placeholders.
+    """
+
+    def __init__(self, retention="full", spill_dir=None):
+        if retention not in RETENTION:
+            raise ValueError(f"Unknown retention mode: {retention}")
+        self.retention = retention
+        self.spill_dir = spill_dir
+        self._count = 0
+        self._cleanup = None
+
+    def __getstate__(self):
+        # Batch workers pick their own spill folder
+        state = self.__dict__.copy()
+        state["_cleanup"] = None
+        if self._cleanup is not None:
+            state["spill_dir"] = None
+        return state
+
+    def _root(self):
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix="jewelry_results_")
+            self._cleanup = weakref.finalize(self, shutil.rmtree, self.spill_dir, True)
+            if multiprocessing.parent_process() is not None:
+                # Pool workers leave through os._exit, which skips atexit (and
+                # so weakref.finalize); multiprocessing's own exit hook doesn't
+                multiprocessing.util.Finalize(self, self._cleanup, exitpriority=0)
+        os.makedirs(self.spill_dir, exist_ok=True)
+        return self.spill_dir
+
+    def close(self):
+        """Remove the temporary spill folder; spilled results can't be read after"""
+        if self._cleanup is not None:
+            self._cleanup()
+            self._cleanup = None
+            self.spill_dir = None
+
+    def spill(self, name, field, value):
+        kind = SPILL_KINDS[field]
+        paths = {}
+        for array_name, array in _encode(kind, value).items():
+            path = os.path.join(self._root(), f"{name}.{field}.{array_name}.npy")
+            np.save(path, array)
+            paths[array_name] = path
+        return Spilled(kind, paths)
+
+    def retain(self, result, name):
+        """Return the result with every field outside the retention mode spilled"""
+        if self.retention == "full":
+            return result
+        self._count += 1
+        # Workers forked from one store share its count (and maybe spill_dir)
+        prefix = f"{os.getpid()}_{self._count:06d}_{name}"
+        keep = RETENTION[self.retention]
+        lazy = LazyResult(result)
+        for field in SPILL_KINDS:
+            if field in lazy and field not in keep and dict.__getitem__(lazy, field) is not None:
+                dict.__setitem__(lazy, field, self.spill(prefix, field, dict.__getitem__(lazy, field)))
+        if "lods" not in keep and lazy.get("lods"):
+            lods = []
+            for i, lod in enumerate(lazy["lods"], 1):
+                lod = LazyResult(lod)
+                if lod.get("mesh") is not None:
+                    dict.__setitem__(lod, "mesh", self.spill(f"{prefix}_lod{i}", "mesh", lod["mesh"]))
+                lods.append(lod)
+            lazy["lods"] = lods
+        return lazy
@@ -3,14 +3,28 @@ from main import JewelryCADPipeline
 import os
 import glob
 
-def process_png_images():
+def thickness_for_file(png_file):
+    base_name = os.path.splitext(os.path.basename(png_file))[0]
+    
+    # Adjust thickness based on filename
+    if "ring" in base_name.lower():
+        return 2.0
+    elif "pendant" in base_name.lower():
+        return 1.5
+    elif "earring" in base_name.lower():
+        return 1.0
+    elif "bracelet" in base_name.lower():
+        return 3.0
+    return 2.0  # Default thickness
+
+def process_png_images(workers=None, incremental=False):
     pipeline = JewelryCADPipeline()
     
     # Create output directory
     os.makedirs("test_results", exist_ok=True)
     
     # Find all PNG files in test_images folder
-    png_files = glob.glob("test_images/*.png")
+    png_files = sorted(glob.glob("test_images/*.png"))
     
     if not png_files:
         print("No PNG files found in test_images/ folder!")
@@ -21,37 +35,36 @@ def process_png_images():
     for file in png_files:
         print(f"  - {file}")
     
-    # Process each PNG file
-    for png_file in png_files:
-        try:
-            # Get the base name without extension
-            base_name = os.path.splitext(os.path.basename(png_file))[0]
-            output_file = f"test_results/{base_name}.stl"
-            
-            print(f"\nProcessing {png_file}...")
-            
-            # Process with appropriate thickness based on jewelry type
-            thickness = 2.0  # Default thickness
-            
-            # Adjust thickness based on filename
-            if "ring" in base_name.lower():
-                thickness = 2.0
-            elif "pendant" in base_name.lower():
-                thickness = 1.5
-            elif "earring" in base_name.lower():
-                thickness = 1.0
-            elif "bracelet" in base_name.lower():
-                thickness = 3.0
-            
-            result = pipeline.process_image(png_file, output_file, thickness=thickness)
-            
-            print(f"✓ Completed: {output_file}")
-            print(f"  Validation: {'PASS' if result['validation']['is_valid'] else 'FAIL'}")
-            if result['validation']['issues']:
-                print(f"  Issues: {result['validation']['issues']}")
-                
-        except Exception as e:
-            print(f"✗ Error processing {png_file}: {str(e)}")
+    # Process with appropriate thickness based on jewelry type
+    thicknesses = [thickness_for_file(f) for f in png_files]
+    
+    if incremental:
+        # Only new or changed drawings; the rest are tracked in the manifest
+        from watch_folder import IncrementalProcessor
+        with IncrementalProcessor(pipeline, output_dir="test_results", workers=workers,
+                                  thickness=thickness_for_file) as processor:
+            results, skipped = processor.run_once(png_files)
+        print(f"{skipped} file(s) already up to date")
+        return
+    
+    # Process all PNG files on a worker pool; results come back in input order
+    results = pipeline.process_batch(
+        png_files,
+        output_dir="test_results",
+        thickness=thicknesses,
+        workers=workers,
+        manifest_path="test_results/manifest.json",
+    )
+    
+    for entry in results:
+        if entry["status"] == "ok":
+            print(f"✓ Completed: {entry['output']}")
+            print(f"  Validation: {'PASS' if entry['is_valid'] else 'FAIL'}")
+            if entry['issues']:
+                print(f"  Issues: {entry['issues']}")
+        else:
+            print(f"✗ Error processing {entry['input']}: {entry['error']}")
 
 if __name__ == "__main__":
-    process_png_images()
+    import sys
+    process_png_images(incremental="--incremental" in sys.argv)
@@ -0,0 +1,294 @@
+# stage_cache.py
+import os
+import io
+import json
+import hashlib
+import threading
+import numpy as np
+from curve_set import CurveSet
+
+
+class StageCache:
+    """
+    Content-addressed on-disk cache for pipeline stage outputs.
+
+    Keys are chained: each stage key hashes the previous stage key together
+    with the stage's own parameters, so changing a late-stage parameter only
+    invalidates the stages after it. Entries are stored as .npz files and the
+    least recently used ones are evicted once the cache exceeds max_bytes.
+
+    The cap is approximate when several processes share the folder: each
+    one re-reads the size on disk before evicting and after writing a tenth
+    of max_bytes itself, so the folder can overshoot by about that much per
+    process.
+    """
+
+    def __init__(self, cache_dir, max_bytes=2 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._total_bytes = sum(size for _, _, size in self._entries())
+        # Bytes written by this process since the folder was last measured
+        self._unmeasured = 0
+
+    def __getstate__(self):
+        # Locks can't be pickled; batch workers get their own
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def hash_bytes(data):
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def make_key(parent_key, stage, params=None):
+        payload = json.dumps([parent_key, stage, params or {}], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".npz")
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".npz"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path, stat.st_size))
+        return entries
+
+    def get(self, key, kind):
+        """Return the cached value for key, or None on a miss"""
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                value = DECODERS[kind]({name: data[name] for name in data.files})
+        except (OSError, KeyError, ValueError):
+            return None
+        try:
+            # Touch the entry so eviction sees it as recently used
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def put(self, key, kind, value):
+        arrays = ENCODERS[kind](value)
+        buffer = io.BytesIO()
+        np.savez(buffer, **arrays)
+        payload = buffer.getvalue()
+
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        # Atomic rename so concurrent batch workers never read partial files
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._total_bytes += len(payload)
+            self._unmeasured += len(payload)
+            if self._total_bytes > self.max_bytes or self._unmeasured >= self.max_bytes / 10:
+                self._evict()
+
+    def _evict(self):
+        # Other processes write here too, so go by the size on disk
+        entries = sorted(self._entries())
+        total = sum(size for _, _, size in entries)
+        self._unmeasured = 0
+        if total > self.max_bytes:
+            # Drop least recently used entries until we are back under 90% of the cap
+            target = self.max_bytes * 0.9
+            for _, path, size in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+        self._total_bytes = total
+
+    def clear(self):
+        for _, path, _ in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._total_bytes = 0
+
+
+def _pack_ragged(arrays, dtype, width):
+    """Concatenate a list of (n, width) arrays into one buffer plus offsets"""
+    offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+    if arrays:
+        offsets[1:] = np.cumsum([len(a) for a in arrays])
+        flat = np.concatenate([np.asarray(a, dtype=dtype).reshape(-1, width) for a in arrays])
+    else:
+        flat = np.zeros((0, width), dtype=dtype)
+    return flat, offsets
+
+
+def _unpack_ragged(flat, offsets):
+    return [flat[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+
+def _encode_mask(mask):
+    # Binary masks only hold 0/255, so bit-packing makes them 8x smaller
+    return {"bits": np.packbits(mask.ravel() > 0), "shape": np.array(mask.shape)}
+
+
+def _decode_mask(data):
+    shape = tuple(int(s) for s in data["shape"])
+    count = int(np.prod(shape))
+    bits = np.unpackbits(data["bits"], count=count)
+    return (bits.reshape(shape) * 255).astype(np.uint8)
+
+
+def _encode_binarized(value):
+    # The preprocess stage: the mask plus the binarization choice behind it
+    mask, choice = value
+    arrays = _encode_mask(mask)
+    arrays["choice"] = np.array(json.dumps(choice))
+    return arrays
+
+
+def _decode_binarized(data):
+    return _decode_mask(data), json.loads(str(data["choice"]))
+
+
+def _encode_contours(value):
+    contours, parents = value
+    flat, offsets = _pack_ragged([c.reshape(-1, 2) for c in contours], np.int32, 2)
+    return {"points": flat, "offsets": offsets, "parents": np.asarray(parents, dtype=np.int64)}
+
+
+def _decode_contours(data):
+    contours = [c.reshape(-1, 1, 2).copy() for c in _unpack_ragged(data["points"], data["offsets"])]
+    return contours, data["parents"].tolist()
+
+
+def _encode_curves(curves):
+    curves = CurveSet.from_curves(curves)
+    # A CurveSet is already flat, so its arrays are stored as they are
+    arrays = {
+        "points": curves.coords,
+        "offsets": curves.offsets,
+        "is_closed": curves.is_closed,
+        "contour_index": curves.contour_index,
+    }
+    if curves.has_parents:
+        arrays["parent_index"] = curves.parent_index
+    return arrays
+
+
+def _decode_curves(data):
+    return CurveSet(
+        data["points"],
+        data["offsets"],
+        data["is_closed"],
+        data["contour_index"],
+        data["parent_index"] if "parent_index" in data else None,
+    )
+
+
+def _encode_polygons(polygons):
+    import shapely
+    wkb = [shapely.to_wkb(p) for p in polygons]
+    offsets = np.zeros(len(wkb) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in wkb])
+    return {"wkb": np.frombuffer(b"".join(wkb), dtype=np.uint8), "offsets": offsets}
+
+
+def _decode_polygons(data):
+    import shapely
+    raw = data["wkb"].tobytes()
+    offsets = data["offsets"]
+    return [shapely.from_wkb(raw[offsets[i]:offsets[i + 1]]) for i in range(len(offsets) - 1)]
+
+
+def _encode_mesh(mesh):
+    if mesh is None:
+        return {"empty": np.array(True)}
+    return {
+        "empty": np.array(False),
+        "vertices": np.asarray(mesh.vertices, dtype=np.float64),
+        "faces": np.asarray(mesh.faces, dtype=np.int32),
+    }
+
+
+def _decode_mesh(data):
+    if bool(data["empty"]):
+        return None
+    import trimesh
+    return trimesh.Trimesh(
+        vertices=data["vertices"], faces=data["faces"].astype(np.int64), process=False
+    )
+
+
+def _encode_validation(value):
+    mesh, is_valid, issues = value
+    arrays = _encode_mesh(mesh)
+    arrays["report"] = np.array(json.dumps({"is_valid": is_valid, "issues": issues}))
+    return arrays
+
+
+def _decode_validation(data):
+    report = json.loads(str(data["report"]))
+    return _decode_mesh(data), report["is_valid"], report["issues"]
+
+
+def _encode_lods(lods):
+    vertices, vertex_offsets = _pack_ragged([mesh.vertices for mesh, _ in lods], np.float64, 3)
+    faces, face_offsets = _pack_ragged([mesh.faces for mesh, _ in lods], np.int32, 3)
+    return {
+        "vertices": vertices,
+        "vertex_offsets": vertex_offsets,
+        "faces": faces,
+        "face_offsets": face_offsets,
+        "info": np.array(json.dumps([info for _, info in lods])),
+    }
+
+
+def _decode_lods(data):
+    import trimesh
+    vertices = _unpack_ragged(data["vertices"], data["vertex_offsets"])
+    faces = _unpack_ragged(data["faces"], data["face_offsets"])
+    infos = json.loads(str(data["info"]))
+    return [
+        (trimesh.Trimesh(vertices=v, faces=f.astype(np.int64), process=False), info)
+        for v, f, info in zip(vertices, faces, infos)
+    ]
+
+
+ENCODERS = {
+    "mask": _encode_mask,
+    "binarized": _encode_binarized,
+    "contours": _encode_contours,
+    "curves": _encode_curves,
+    "polygons": _encode_polygons,
+    "mesh": _encode_mesh,
+    "validation": _encode_validation,
+    "lods": _encode_lods,
+}
+
+DECODERS = {
+    "mask": _decode_mask,
+    "binarized": _decode_binarized,
+    "contours": _decode_contours,
+    "curves": _decode_curves,
+    "polygons": _decode_polygons,
+    "mesh": _decode_mesh,
+    "validation": _decode_validation,
+    "lods": _decode_lods,
+}
@@ -0,0 +1,70 @@
+# stage_graph.py
+
+
+class StageGraph:
+    """
+    A small dependency graph of pipeline stages with dirty tracking.
+
+    Each stage declares the stages it reads from and the parameters it
+    depends on. Changing a parameter marks the stages that use it, and
+    everything downstream of them, as dirty; get() then recomputes only
+    the dirty stages on the way to the requested output.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.downstream = {}
+        self.params = {}
+        self.values = {}
+        self.dirty = set()
+        # How many times each stage actually ran
+        self.run_counts = {}
+
+    def add_stage(self, name, fn, inputs=(), params=()):
+        """
+        Register a stage computed as fn(*input_values, **param_values).
+        Inputs must already be registered, so the graph stays acyclic.
+        """
+        for dep in inputs:
+            if dep not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+            self.downstream[dep].append(name)
+        self.stages[name] = {"fn": fn, "inputs": tuple(inputs), "params": tuple(params)}
+        self.downstream[name] = []
+        self.run_counts[name] = 0
+        self.dirty.add(name)
+
+    def set_params(self, **params):
+        """Update parameters, dirtying only stages whose inputs actually changed"""
+        changed = {k for k, v in params.items() if k not in self.params or self.params[k] != v}
+        self.params.update(params)
+        for name, stage in self.stages.items():
+            if changed.intersection(stage["params"]):
+                self._mark_dirty(name)
+        return changed
+
+    def _mark_dirty(self, name):
+        stack = [name]
+        while stack:
+            current = stack.pop()
+            if current in self.dirty:
+                # A dirty stage's descendants are always dirty already
+                continue
+            self.dirty.add(current)
+            self.values.pop(current, None)
+            stack.extend(self.downstream[current])
+
+    def get(self, name):
+        """Return the value of a stage, recomputing dirty dependencies first"""
+        if name not in self.dirty and name in self.values:
+            return self.values[name]
+
+        stage = self.stages[name]
+        inputs = [self.get(dep) for dep in stage["inputs"]]
+        kwargs = {p: self.params[p] for p in stage["params"]}
+        value = stage["fn"](*inputs, **kwargs)
+
+        self.values[name] = value
+        self.dirty.discard(name)
+        self.run_counts[name] += 1
+        return value
@@ -0,0 +1,335 @@
+# streaming.py
+import os
+import time
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from batch_processor import _init_worker, _warm_worker
+from mesh_export import export_mesh
+from svg_import import load_svg_curves
+
+# End-of-stream marker passed down the stage queues
+_DONE = object()
+
+
+class Stage:
+    """
+    One step of a streaming pipeline: fn maps a job to a job. Thread stages
+    suit I/O and OpenCV calls that release the GIL; processes=True runs fn
+    (a picklable module-level function) on a pool of worker processes for
+    Python-heavy work. initializer(*initargs) runs in every worker process,
+    or once in this process before a thread stage starts.
+    """
+
+    def __init__(self, name, fn, workers=1, processes=False, initializer=None, initargs=()):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, int(workers))
+        self.processes = processes
+        self.initializer = initializer
+        self.initargs = initargs
+
+
+class _Item:
+    __slots__ = ("index", "value", "error", "timings", "start")
+
+    def __init__(self, index, value):
+        self.index = index
+        self.value = value
+        self.error = None
+        self.timings = {}
+        self.start = time.perf_counter()
+
+
+class StreamingExecutor:
+    """
+    Run jobs through a chain of stages connected by bounded queues, so
+    reading, decoding, compute and export of different jobs overlap. The
+    input may be an unbounded iterator: the bounded queues hold back the
+    reader when a later stage falls behind. run() yields
+    (index, job, error, timings) as jobs finish, in completion order; a job
+    that fails skips the remaining stages. timings has the busy time of
+    each stage and the total latency from the input queue to the end.
+    """
+
+    def __init__(self, stages, queue_size=4):
+        self.stages = list(stages)
+        self.queue_size = queue_size
+        self.stats = {}
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+
+    def _put(self, q, item):
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _feed(self, items, q):
+        stats = self.stats["input"]
+        try:
+            for index, value in enumerate(items):
+                start = time.perf_counter()
+                if not self._put(q, _Item(index, value)):
+                    return
+                stats["blocked"] += time.perf_counter() - start
+                stats["items"] += 1
+        finally:
+            self._put(q, _DONE)
+
+    def _work(self, stage, pool, q_in, q_out, state):
+        stats = self.stats[stage.name]
+        while True:
+            start = time.perf_counter()
+            item = self._get(q_in)
+            with state["lock"]:
+                stats["starved"] += time.perf_counter() - start
+            if item is _DONE:
+                # Let sibling workers see the marker; the last one forwards it
+                self._put(q_in, _DONE)
+                with state["lock"]:
+                    state["active"] -= 1
+                    last = state["active"] == 0
+                if last:
+                    self._put(q_out, _DONE)
+                return
+
+            if item.error is None:
+                start = time.perf_counter()
+                try:
+                    if pool is not None:
+                        item.value = pool.submit(stage.fn, item.value).result()
+                    else:
+                        item.value = stage.fn(item.value)
+                except Exception as e:
+                    item.error = f"{type(e).__name__}: {e}"
+                busy = time.perf_counter() - start
+                item.timings[stage.name] = busy
+                with state["lock"]:
+                    stats["busy"] += busy
+                    stats["items"] += 1
+
+            start = time.perf_counter()
+            if not self._put(q_out, item):
+                return
+            with state["lock"]:
+                stats["blocked"] += time.perf_counter() - start
+
+    def run(self, items):
+        self._stop.clear()
+        queues = [queue.Queue(self.queue_size) for _ in range(len(self.stages) + 1)]
+        self.stats = {"input": {"items": 0, "blocked": 0.0}}
+        pools, threads = [], []
+        start = time.perf_counter()
+        try:
+            for i, stage in enumerate(self.stages):
+                self.stats[stage.name] = {"workers": stage.workers, "items": 0, "busy": 0.0,
+                                          "starved": 0.0, "blocked": 0.0}
+                pool = None
+                if stage.processes:
+                    pool = ProcessPoolExecutor(max_workers=stage.workers,
+                                               initializer=stage.initializer,
+                                               initargs=stage.initargs)
+                    pools.append(pool)
+                    # Start the workers (imports, initializer) while the
+                    # first jobs are still being read and decoded
+                    for _ in range(stage.workers):
+                        pool.submit(_warm_worker)
+                elif stage.initializer is not None:
+                    stage.initializer(*stage.initargs)
+                state = {"lock": threading.Lock(), "active": stage.workers}
+                for _ in range(stage.workers):
+                    threads.append(threading.Thread(
+                        target=self._work, args=(stage, pool, queues[i], queues[i + 1], state),
+                        name=f"stream-{stage.name}", daemon=True))
+            for thread in threads:
+                thread.start()
+            # The feeder may be blocked reading its input (e.g. stdin), so it
+            # is never joined; it is a daemon and exits at its next item
+            threading.Thread(target=self._feed, args=(items, queues[0]),
+                             name="stream-input", daemon=True).start()
+
+            while True:
+                item = self._get(queues[-1])
+                if item is _DONE:
+                    break
+                item.timings["total"] = time.perf_counter() - item.start
+                yield item.index, item.value, item.error, item.timings
+        finally:
+            # Also reached when the consumer stops iterating early
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+            for pool in pools:
+                pool.shutdown(wait=True, cancel_futures=True)
+            self.elapsed = time.perf_counter() - start
+
+    def report(self):
+        """
+        Per-stage utilization: busy time over wall time times workers. The
+        stage closest to 1.0 is the bottleneck; "starved" is time spent
+        waiting for input and "blocked" time waiting for room downstream.
+        """
+        elapsed = max(self.elapsed, 1e-9)
+        report = {}
+        for stage in self.stages:
+            stats = self.stats.get(stage.name)
+            if stats is None:
+                continue
+            report[stage.name] = dict(
+                stats, utilization=stats["busy"] / (elapsed * stats["workers"]))
+        return report
+
+    def format_report(self):
+        report = self.report()
+        lines = [f"{'stage':<12}{'workers':>8}{'items':>7}{'busy s':>9}{'util':>7}{'starved s':>11}{'blocked s':>11}"]
+        for name, stats in report.items():
+            lines.append(f"{name:<12}{stats['workers']:>8}{stats['items']:>7}{stats['busy']:>9.2f}"
+                         f"{stats['utilization']:>7.0%}{stats['starved']:>11.2f}{stats['blocked']:>11.2f}")
+        if report:
+            bottleneck = max(report, key=lambda name: report[name]["utilization"])
+            lines.append(f"Bottleneck: {bottleneck} ({self.elapsed:.2f}s wall)")
+        return "\n".join(lines)
+
+
+# Process stages run in workers set up by batch_processor._init_worker
+def _geometry_job(job):
+    """Extrude, check walls and validate in one worker so the mesh is pickled once"""
+    import batch_processor
+    pipeline = batch_processor._worker_pipeline
+    polygons = pipeline.cad_generator.create_cad_geometry(job.pop("curves"))
+    mesh = pipeline.cad_generator.extrude_to_3d(polygons, thickness=job["thickness"])
+    walls = None
+    if pipeline.wall_analyzer is not None:
+        walls = pipeline.analyze_walls(polygons, job["thickness"],
+                                       job["image_path"].lower().endswith(".svg"))
+        walls.pop("heatmap")
+        job["walls"] = walls
+    job["mesh"], job["is_valid"], job["issues"] = pipeline.validate_and_fix(mesh)
+    if walls and walls["issues"]:
+        job["is_valid"] = False
+        job["issues"] = list(job["issues"]) + walls["issues"]
+    return job
+
+
+def pipeline_stages(pipeline, io_workers=2, cv_workers=None, geometry_workers=None, cv_threads=1):
+    """
+    The stages of JewelryCADPipeline.process_image as streaming stages:
+    read and decode (threads), preprocess and contours (threads; OpenCV
+    releases the GIL), geometry with extrusion, the wall-thickness check
+    and validation (one process pool, so each mesh crosses a process
+    boundary once), and export (threads). Jobs are dicts with image_path,
+    output_path and thickness. The stage cache, levels of detail and
+    diagnostics are not used in this mode. cv_threads sets OpenCV's own
+    thread count in the geometry workers only; the cv threads share this
+    process's OpenCV setting, which is left as the caller had it.
+    """
+    cpus = os.cpu_count() or 1
+    cv_workers = cv_workers or cpus
+    geometry_workers = geometry_workers or cpus
+    cp = pipeline.contour_processor
+
+    def read(job):
+        if "duplicate_of" in job:
+            raise ValueError(f"{job['duplicate_of']} is already written to {job['output_path']}")
+        with open(job["image_path"], "rb") as f:
+            job["data"] = f.read()
+        return job
+
+    def decode(job):
+        data = job.pop("data")
+        if job["image_path"].lower().endswith(".svg"):
+            job["curves"] = load_svg_curves(data, pipeline.svg_tolerance, pipeline.svg_scale)
+            return job
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"Could not load image from {job['image_path']}")
+        job["image"] = image
+        return job
+
+    def preprocess(job):
+        if "image" in job:
+            job["processed"], job["binarization"] = pipeline.preprocess(job.pop("image"))
+        return job
+
+    def contours(job):
+        if "processed" in job:
+            found, parents = cp.detect_contour_tree(job.pop("processed"))
+            if cp.fits_splines:
+                job["curves"] = cp.fit_curves(found, parents)
+            else:
+                job["curves"] = cp.vectorize_contours(*cp.refine_contour_tree(found, parents))
+        return job
+
+    def export(job):
+        export_mesh(job["mesh"], job["output_path"])
+        return job
+
+    return [
+        Stage("read", read, io_workers),
+        Stage("decode", decode, io_workers),
+        Stage("preprocess", preprocess, cv_workers),
+        Stage("contours", contours, cv_workers),
+        Stage("geometry", _geometry_job, geometry_workers, processes=True,
+              initializer=_init_worker, initargs=(pipeline, cv_threads)),
+        Stage("export", export, io_workers),
+    ]
+
+
+def stream_entries(pipeline, image_paths, output_dir="test_results", thickness=2.0,
+                   output_format=".stl", queue_size=4, executor=None, **stage_workers):
+    """
+    Convert an iterable of image paths (which may be unbounded, e.g. lines
+    from stdin) with a StreamingExecutor. Yields a manifest entry per file,
+    in the same format as BatchProcessor, as files finish. Paths arrive
+    one at a time, so outputs are named after the file alone; a file whose
+    output an earlier one already writes fails instead of overwriting it.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    executor = executor or StreamingExecutor(pipeline_stages(pipeline, **stage_workers), queue_size)
+
+    def jobs():
+        owners = {}
+        for path in image_paths:
+            name = os.path.splitext(os.path.basename(path))[0]
+            job = {"image_path": path, "output_path": os.path.join(output_dir, name + output_format),
+                   "thickness": float(thickness)}
+            owner = owners.setdefault(job["output_path"], path)
+            if owner != path:
+                job["duplicate_of"] = owner
+            yield job
+
+    for index, job, error, timings in executor.run(jobs()):
+        entry = {
+            "index": index,
+            "input": job["image_path"],
+            "output": job["output_path"],
+            "thickness": job["thickness"],
+            "status": "error" if error else "ok",
+            "is_valid": bool(job.get("is_valid", False)) and not error,
+            "issues": [] if error else list(job.get("issues", [])),
+            "error": error,
+            "timings": timings,
+        }
+        if job.get("walls") is not None and not error:
+            entry["min_wall_mm"] = job["walls"]["min_wall_found_mm"]
+            entry["thin_regions"] = job["walls"]["thin_regions"]
+            entry["walls_calibrated"] = job["walls"]["calibrated"]
+        if job.get("binarization"):
+            entry["binarization"] = job["binarization"]["strategy"]
+        yield entry
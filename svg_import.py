@@ -0,0 +1,392 @@
+# svg_import.py
+import re
+import math
+import xml.etree.ElementTree as ET
+import numpy as np
+from curve_set import CurveSet
+
+_COMMAND = re.compile(r"[\s,]*([MmZzLlHhVvCcSsQqTtAa])")
+_NUMBER = re.compile(r"[\s,]*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)")
+_FLAG = re.compile(r"[\s,]*([01])")
+_TRANSFORM = re.compile(r"(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)")
+
+# Number of arguments each path command takes per segment
+_ARGS = {"M": 2, "L": 2, "H": 1, "V": 1, "C": 6, "S": 4, "Q": 4, "T": 2, "A": 7, "Z": 0}
+
+# Containers whose children are never drawn directly
+_SKIPPED = {"defs", "clipPath", "mask", "marker", "pattern", "symbol", "metadata", "style"}
+
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _numbers(text):
+    return [float(m.group(1)) for m in _NUMBER.finditer(text or "")]
+
+
+def _length(value, default=0.0):
+    """Leading number of an attribute such as '12.5px' (units are ignored)"""
+    match = _NUMBER.match(value or "")
+    return float(match.group(1)) if match else default
+
+
+def parse_transform(text):
+    """3x3 affine matrix for an SVG transform attribute"""
+    matrix = np.eye(3)
+    for name, args in _TRANSFORM.findall(text or ""):
+        v = _numbers(args)
+        step = np.eye(3)
+        if name == "matrix" and len(v) == 6:
+            step[:2] = [[v[0], v[2], v[4]], [v[1], v[3], v[5]]]
+        elif name == "translate" and v:
+            step[:2, 2] = [v[0], v[1] if len(v) > 1 else 0.0]
+        elif name == "scale" and v:
+            step[0, 0], step[1, 1] = v[0], v[1] if len(v) > 1 else v[0]
+        elif name == "rotate" and v:
+            a = math.radians(v[0])
+            step[:2, :2] = [[math.cos(a), -math.sin(a)], [math.sin(a), math.cos(a)]]
+            if len(v) == 3:
+                centre = np.eye(3)
+                centre[:2, 2] = v[1:]
+                back = np.eye(3)
+                back[:2, 2] = [-v[1], -v[2]]
+                step = centre @ step @ back
+        elif name == "skewX" and v:
+            step[0, 1] = math.tan(math.radians(v[0]))
+        elif name == "skewY" and v:
+            step[1, 0] = math.tan(math.radians(v[0]))
+        matrix = matrix @ step
+    return matrix
+
+
+def _bezier(control, tolerance):
+    """
+    Flatten a quadratic or cubic Bezier (rows of control points) so no
+    chord is further than tolerance from the curve. The segment count
+    comes from the largest second difference of the control polygon
+    (Wang's formula). The start point is not included.
+    """
+    control = np.asarray(control, dtype=np.float64)
+    degree = len(control) - 1
+    second = np.max(np.hypot(*(control[2:] - 2 * control[1:-1] + control[:-2]).T))
+    count = max(1, int(math.ceil(math.sqrt(degree * (degree - 1) * second / (8.0 * tolerance)))))
+    t = np.linspace(0.0, 1.0, count + 1)[1:, None]
+    s = 1.0 - t
+    if degree == 2:
+        return s * s * control[0] + 2 * s * t * control[1] + t * t * control[2]
+    return (s ** 3 * control[0] + 3 * s * s * t * control[1]
+            + 3 * s * t * t * control[2] + t ** 3 * control[3])
+
+
+def _arc(start, rx, ry, rotation, large, sweep, end, tolerance):
+    """
+    Flatten an elliptical arc given in SVG endpoint form (converted to
+    centre form as in the SVG implementation notes). The start point is
+    not included.
+    """
+    x1, y1 = start
+    x2, y2 = end
+    rx, ry = abs(rx), abs(ry)
+    if rx == 0 or ry == 0 or (x1 == x2 and y1 == y2):
+        return np.array([end], dtype=np.float64)
+
+    phi = math.radians(rotation)
+    cos_phi, sin_phi = math.cos(phi), math.sin(phi)
+    dx, dy = (x1 - x2) / 2.0, (y1 - y2) / 2.0
+    xp = cos_phi * dx + sin_phi * dy
+    yp = -sin_phi * dx + cos_phi * dy
+
+    # Scale up radii that are too small to span the end points
+    scale = (xp / rx) ** 2 + (yp / ry) ** 2
+    if scale > 1:
+        rx, ry = rx * math.sqrt(scale), ry * math.sqrt(scale)
+
+    numerator = max(rx * rx * ry * ry - rx * rx * yp * yp - ry * ry * xp * xp, 0.0)
+    factor = math.sqrt(numerator / (rx * rx * yp * yp + ry * ry * xp * xp))
+    if large == sweep:
+        factor = -factor
+    cxp, cyp = factor * rx * yp / ry, -factor * ry * xp / rx
+    cx = cos_phi * cxp - sin_phi * cyp + (x1 + x2) / 2.0
+    cy = sin_phi * cxp + cos_phi * cyp + (y1 + y2) / 2.0
+
+    theta1 = math.atan2((yp - cyp) / ry, (xp - cxp) / rx)
+    theta2 = math.atan2((-yp - cyp) / ry, (-xp - cxp) / rx)
+    delta = theta2 - theta1
+    if sweep and delta < 0:
+        delta += 2 * math.pi
+    elif not sweep and delta > 0:
+        delta -= 2 * math.pi
+
+    # Largest angular step whose sagitta stays within tolerance
+    radius = max(rx, ry)
+    step = 2.0 * math.acos(max(-1.0, 1.0 - tolerance / radius)) if tolerance < radius else math.pi / 2
+    count = max(2, int(math.ceil(abs(delta) / max(step, 1e-9))))
+    angles = theta1 + delta * np.linspace(0.0, 1.0, count + 1)[1:]
+    ex, ey = rx * np.cos(angles), ry * np.sin(angles)
+    points = np.column_stack((cos_phi * ex - sin_phi * ey + cx, sin_phi * ex + cos_phi * ey + cy))
+    points[-1] = end
+    return points
+
+
+def parse_path(d, tolerance=0.1):
+    """
+    Flatten SVG path data into a list of (points, closed) subpaths.
+    Supports every command (absolute and relative), including smooth
+    curves and elliptical arcs.
+    """
+    subpaths = []
+    points = []
+    closed = False
+    current = np.zeros(2)
+    start = np.zeros(2)
+    last_control = None
+    last_command = ""
+    command = None
+    pos = 0
+    d = d or ""
+
+    def finish():
+        if len(points) > 1:
+            subpaths.append((np.vstack(points), closed))
+
+    while True:
+        match = _COMMAND.match(d, pos)
+        if match:
+            command = match.group(1)
+            pos = match.end()
+        elif command is None or not _NUMBER.match(d, pos):
+            break
+        elif command in "Mm":
+            # Extra coordinate pairs after a moveto are implicit linetos
+            command = "L" if command == "M" else "l"
+
+        upper = command.upper()
+        relative = command.islower()
+        if upper == "Z":
+            if points:
+                closed = True
+                finish()
+            points, closed = [], False
+            current = start.copy()
+            last_control, last_command = None, "Z"
+            command = None
+            continue
+
+        args = []
+        for i in range(_ARGS[upper]):
+            pattern = _FLAG if upper == "A" and i in (3, 4) else _NUMBER
+            arg = pattern.match(d, pos)
+            if not arg:
+                raise ValueError(f"Malformed SVG path data near: {d[pos:pos + 20]!r}")
+            args.append(float(arg.group(1)))
+            pos = arg.end()
+
+        origin = current if relative else np.zeros(2)
+        if upper != "M" and not points:
+            # Drawing straight after a closepath starts from the subpath start
+            points = [current.copy()]
+        if upper == "M":
+            finish()
+            current = origin + args
+            start = current.copy()
+            points, closed = [current.copy()], False
+            last_control = None
+        elif upper in "LHV":
+            if upper == "L":
+                target = origin + args
+            elif upper == "H":
+                target = np.array([args[0] + (current[0] if relative else 0.0), current[1]])
+            else:
+                target = np.array([current[0], args[0] + (current[1] if relative else 0.0)])
+            points.append(target)
+            current = target
+            last_control = None
+        elif upper in "CS":
+            if upper == "C":
+                c1 = origin + args[0:2]
+                c2, target = origin + args[2:4], origin + args[4:6]
+            else:
+                c1 = 2 * current - last_control if last_command in "CS" else current
+                c2, target = origin + args[0:2], origin + args[2:4]
+            points.extend(_bezier([current, c1, c2, target], tolerance))
+            current, last_control = target, c2
+        elif upper in "QT":
+            if upper == "Q":
+                c1, target = origin + args[0:2], origin + args[2:4]
+            else:
+                c1 = 2 * current - last_control if last_command in "QT" else current
+                target = origin + args[0:2]
+            points.extend(_bezier([current, c1, target], tolerance))
+            current, last_control = target, c1
+        elif upper == "A":
+            target = origin + args[5:7]
+            points.extend(_arc(current, args[0], args[1], args[2], args[3], args[4], target, tolerance))
+            current = target
+            last_control = None
+        last_command = upper
+
+    finish()
+    return subpaths
+
+
+def _ellipse_path(cx, cy, rx, ry):
+    return (f"M{cx - rx},{cy} A{rx},{ry} 0 1 0 {cx + rx},{cy} "
+            f"A{rx},{ry} 0 1 0 {cx - rx},{cy} Z")
+
+
+def _shape_path(element, tag):
+    """Path data equivalent to a basic shape element (None if not drawable)"""
+    get = element.get
+    if tag == "path":
+        return get("d")
+    if tag == "rect":
+        x, y = _length(get("x")), _length(get("y"))
+        w, h = _length(get("width")), _length(get("height"))
+        if w <= 0 or h <= 0:
+            return None
+        rx = _length(get("rx"), None) if get("rx") else None
+        ry = _length(get("ry"), None) if get("ry") else None
+        rx, ry = rx if rx is not None else (ry or 0.0), ry if ry is not None else (rx or 0.0)
+        rx, ry = min(rx, w / 2), min(ry, h / 2)
+        if rx <= 0 or ry <= 0:
+            return f"M{x},{y} H{x + w} V{y + h} H{x} Z"
+        return (f"M{x + rx},{y} H{x + w - rx} A{rx},{ry} 0 0 1 {x + w},{y + ry} "
+                f"V{y + h - ry} A{rx},{ry} 0 0 1 {x + w - rx},{y + h} "
+                f"H{x + rx} A{rx},{ry} 0 0 1 {x},{y + h - ry} "
+                f"V{y + ry} A{rx},{ry} 0 0 1 {x + rx},{y} Z")
+    if tag == "circle":
+        r = _length(get("r"))
+        return _ellipse_path(_length(get("cx")), _length(get("cy")), r, r) if r > 0 else None
+    if tag == "ellipse":
+        rx, ry = _length(get("rx")), _length(get("ry"))
+        return _ellipse_path(_length(get("cx")), _length(get("cy")), rx, ry) if rx > 0 and ry > 0 else None
+    if tag in ("polygon", "polyline"):
+        values = _numbers(get("points"))
+        if len(values) < 6:
+            return None
+        pairs = " ".join(f"{values[i]},{values[i + 1]}" for i in range(0, len(values) - 1, 2))
+        return f"M{pairs}" + (" Z" if tag == "polygon" else "")
+    return None
+
+
+def _hidden(element):
+    style = element.get("style", "")
+    return element.get("display") == "none" or "display:none" in style.replace(" ", "")
+
+
+def _collect(element, matrix, tolerance, rings):
+    tag = _local(element.tag)
+    if tag in _SKIPPED or _hidden(element):
+        return
+    if element.get("transform"):
+        matrix = matrix @ parse_transform(element.get("transform"))
+
+    d = _shape_path(element, tag)
+    if d:
+        # Flatten in local units so the tolerance holds after scaling
+        scale = float(np.linalg.svd(matrix[:2, :2], compute_uv=False)[0]) or 1.0
+        for points, _ in parse_path(d, tolerance / scale):
+            points = points @ matrix[:2, :2].T + matrix[:2, 2]
+            # Fills close every subpath, so a repeated end point is dropped
+            if len(points) > 1 and np.allclose(points[0], points[-1]):
+                points = points[:-1]
+            if len(points) >= 3:
+                rings.append(points)
+
+    for child in element:
+        _collect(child, matrix, tolerance, rings)
+
+
+def nest_rings(rings):
+    """
+    Parent of every ring: the smallest ring that contains it, or -1.
+    Candidate pairs come from one bulk STRtree query.
+    """
+    import shapely
+
+    n = len(rings)
+    parents = np.full(n, -1, dtype=np.int64)
+    if n < 2:
+        return parents
+    lengths = [len(r) for r in rings]
+    polygons = shapely.polygons(shapely.linearrings(
+        np.concatenate(rings), indices=np.repeat(np.arange(n), lengths)))
+    polygons = shapely.make_valid(polygons)
+    areas = shapely.area(polygons)
+
+    tree = shapely.STRtree(polygons)
+    child, parent = tree.query(polygons, predicate="within")
+    keep = (child != parent) & (areas[parent] > areas[child])
+    child, parent = child[keep], parent[keep]
+    if len(child) == 0:
+        return parents
+
+    # For every child, the containing ring with the smallest area
+    order = np.lexsort((areas[parent], child))
+    child, parent = child[order], parent[order]
+    first = np.ones(len(child), dtype=bool)
+    first[1:] = child[1:] != child[:-1]
+    parents[child[first]] = parent[first]
+    return parents
+
+
+def load_svg_curves(source, tolerance=0.1, scale=1.0):
+    """
+    Read an SVG file (path or bytes) straight into a CurveSet.
+
+    Paths and basic shapes are flattened to `tolerance` (in output units)
+    and every subpath becomes a closed curve, as it would be when filled.
+    Nesting is recovered by containment, so the CurveSet carries the same
+    parent links as a traced contour tree: odd-depth curves become holes
+    (even-odd fill). Coordinates are SVG user units times `scale`.
+    """
+    try:
+        if isinstance(source, (bytes, bytearray)):
+            root = ET.fromstring(source)
+        else:
+            root = ET.parse(source).getroot()
+    except ET.ParseError as e:
+        raise ValueError(f"Could not parse SVG: {e}")
+
+    rings = []
+    matrix = np.diag([scale, scale, 1.0])
+    _collect(root, matrix, tolerance, rings)
+    if not rings:
+        return CurveSet.empty()
+
+    parents = nest_rings(rings)
+    offsets = np.zeros(len(rings) + 1, dtype=np.int64)
+    np.cumsum([len(r) for r in rings], out=offsets[1:])
+    return CurveSet(np.concatenate(rings), offsets, np.ones(len(rings), dtype=bool),
+                    np.arange(len(rings)), parents)
+
+
+def rasterize_curves(curves, output_size=(1024, 1024), margin=0.05):
+    """
+    Render a CurveSet as a black-on-white drawing fitted into output_size,
+    filling by nesting depth (shells black, holes white).
+    """
+    import cv2
+
+    width, height = output_size
+    image = np.full((height, width, 3), 255, dtype=np.uint8)
+    if len(curves) == 0:
+        return image
+    low, high = curves.coords.min(axis=0), curves.coords.max(axis=0)
+    extent = np.maximum(high - low, 1e-12)
+    fit = min(width, height) * (1.0 - 2 * margin) / float(extent.max())
+    offset = (np.array([width, height]) - extent * fit) / 2.0
+    pixels = np.round((curves.coords - low) * fit + offset).astype(np.int32)
+    polygons = np.split(pixels, curves.offsets[1:-1])
+
+    depth = np.zeros(len(curves), dtype=np.int64)
+    if curves.has_parents:
+        ancestor = curves.parent_index.copy()
+        while np.any(ancestor >= 0):
+            depth += ancestor >= 0
+            ancestor = np.where(ancestor >= 0, curves.parent_index[np.maximum(ancestor, 0)], -1)
+    for level in np.unique(depth):
+        color = (0, 0, 0) if level % 2 == 0 else (255, 255, 255)
+        cv2.fillPoly(image, [polygons[i] for i in np.flatnonzero(depth == level)], color)
+    return image
@@ -35,23 +35,22 @@ def test_with_examples():
             "thickness": 2.0  # Default thickness
         })
     
-    for test_case in test_cases:
-        print(f"\nProcessing {test_case['name']}...")
-        
-        try:
-            result = pipeline.process_image(
-                test_case["image_path"],
-                f"test_results/{test_case['name']}.stl",
-                thickness=test_case["thickness"]
-            )
-            
+    # Run all test cases on a worker pool; results come back in input order
+    results = pipeline.process_batch(
+        [tc["image_path"] for tc in test_cases],
+        output_paths=[f"test_results/{tc['name']}.stl" for tc in test_cases],
+        thickness=[tc["thickness"] for tc in test_cases],
+        manifest_path="test_results/manifest.json",
+    )
+    
+    for test_case, entry in zip(test_cases, results):
+        if entry["status"] == "ok":
             print(f"✓ Completed {test_case['name']}")
-            print(f"  Validation: {'PASS' if result['validation']['is_valid'] else 'FAIL'}")
-            if result['validation']['issues']:
-                print(f"  Issues: {result['validation']['issues']}")
-            
-        except Exception as e:
-            print(f"✗ Error processing {test_case['name']}: {str(e)}")
+            print(f"  Validation: {'PASS' if entry['is_valid'] else 'FAIL'}")
+            if entry['issues']:
+                print(f"  Issues: {entry['issues']}")
+        else:
+            print(f"✗ Error processing {test_case['name']}: {entry['error']}")
 
 if __name__ == "__main__":
     test_with_examples()
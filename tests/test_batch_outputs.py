@@ -0,0 +1,95 @@
+# tests/test_batch_outputs.py
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from batch_processor import BatchProcessor, output_paths_for
+from main import JewelryCADPipeline
+from watch_folder import IncrementalProcessor
+
+
+def drawing(path, radius=50):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    image = np.full((200, 200, 3), 255, dtype=np.uint8)
+    cv2.circle(image, (100, 100), radius, (0, 0, 0), -1)
+    cv2.imwrite(str(path), image)
+    return str(path)
+
+
+def test_same_names_in_different_folders_keep_their_folders(tmp_path):
+    paths = [drawing(tmp_path / "in" / folder / "ring.png") for folder in ("a", "b")]
+    out = str(tmp_path / "out")
+    assert output_paths_for(paths, out) == [os.path.join(out, "a", "ring.stl"),
+                                            os.path.join(out, "b", "ring.stl")]
+    # One folder: just the file names, as before
+    assert output_paths_for(paths[:1], out, ".3mf") == [os.path.join(out, "ring.3mf")]
+
+    entries = JewelryCADPipeline(verbose=False).process_batch(paths, output_dir=out, workers=1)
+    assert [e["status"] for e in entries] == ["ok", "ok"]
+    assert all(os.path.exists(e["output"]) for e in entries)
+
+
+def test_diagnostics_and_traces_keep_their_folders(tmp_path):
+    paths = [drawing(tmp_path / "in" / folder / "ring.png") for folder in ("a", "b")]
+    diagnostics, traces = tmp_path / "diagnostics", tmp_path / "traces"
+    pipeline = JewelryCADPipeline(verbose=False, diagnostics_dir=str(diagnostics),
+                                  trace_dir=str(traces), min_wall_mm=0.1, pixel_size_mm=0.05)
+    entries = pipeline.process_batch(paths, output_dir=str(tmp_path / "out"), workers=1)
+    assert [e["status"] for e in entries] == ["ok", "ok"]
+    pipeline.wait_diagnostics()
+    for folder in ("a", "b"):
+        for path in (diagnostics / folder / "ring_steps.png", diagnostics / folder / "ring_walls.png",
+                     traces / folder / "ring.trace.json"):
+            assert path.exists(), path
+
+
+def test_inputs_writing_the_same_file_are_rejected(tmp_path):
+    paths = [drawing(tmp_path / "ring.png"), drawing(tmp_path / "ring.jpg")]
+    with pytest.raises(ValueError, match="would both be written"):
+        BatchProcessor(JewelryCADPipeline(verbose=False)).build_jobs(paths, str(tmp_path / "out"))
+    with pytest.raises(ValueError):
+        BatchProcessor(JewelryCADPipeline(verbose=False)).build_jobs(
+            paths, output_paths=[str(tmp_path / "x.stl")] * 2)
+
+
+def test_incremental_keeps_folders_and_skips_clashes(tmp_path):
+    drawing(tmp_path / "in" / "a" / "ring.png")
+    drawing(tmp_path / "in" / "b" / "ring.png", radius=40)
+    drawing(tmp_path / "in" / "b" / "ring.jpg", radius=30)
+    out = tmp_path / "out"
+    inputs = [str(tmp_path / "in" / "a"), str(tmp_path / "in" / "b")]
+    with IncrementalProcessor(JewelryCADPipeline(verbose=False), output_dir=str(out),
+                              workers=1, verbose=False) as processor:
+        entries, skipped = processor.run_once(inputs)
+    assert sorted(os.path.relpath(e["output"], out) for e in entries) == [
+        os.path.join("a", "ring.stl"), os.path.join("b", "ring.stl")]
+    # ring.jpg sorts first and owns b/ring.stl
+    assert any(e["input"].endswith(os.path.join("b", "ring.jpg")) for e in entries)
+    assert skipped == 0
+
+
+def test_stream_fails_duplicate_names(tmp_path):
+    paths = [drawing(tmp_path / folder / "ring.png") for folder in ("a", "b")]
+    entries = sorted(JewelryCADPipeline(verbose=False).process_stream(
+        paths, output_dir=str(tmp_path / "out"), cv_workers=1, geometry_workers=1),
+        key=lambda e: e["index"])
+    assert [e["status"] for e in entries] == ["ok", "error"]
+    assert "already written" in entries[1]["error"]
+
+
+def test_serial_runs_leave_opencv_threads_alone(tmp_path):
+    threads = cv2.getNumThreads()
+    paths = [drawing(tmp_path / "in" / "ring.png")]
+    try:
+        cv2.setNumThreads(3)
+        BatchProcessor(JewelryCADPipeline(verbose=False), workers=1, cv_threads=1).run(
+            paths, str(tmp_path / "out"))
+        assert cv2.getNumThreads() == 3
+        with IncrementalProcessor(JewelryCADPipeline(verbose=False), output_dir=str(tmp_path / "inc"),
+                                  workers=1, cv_threads=1, verbose=False) as p:
+            p.run_once(paths)
+        assert cv2.getNumThreads() == 3
+    finally:
+        cv2.setNumThreads(threads)
@@ -0,0 +1,57 @@
+# tests/test_binarization.py
+import cv2
+import numpy as np
+
+from binarization import otsu_threshold
+from main import JewelryCADPipeline
+
+
+def drawing(tmp_path, name="circle.png"):
+    image = np.full((200, 200, 3), 200, dtype=np.uint8)
+    cv2.circle(image, (100, 100), 50, (40, 40, 40), -1)
+    path = str(tmp_path / name)
+    cv2.imwrite(path, image)
+    return path
+
+
+def test_choice_survives_a_cache_hit(tmp_path):
+    path = drawing(tmp_path)
+
+    def run():
+        pipeline = JewelryCADPipeline(cache_dir=str(tmp_path / "cache"), verbose=False,
+                                      binarization="otsu")
+        result = pipeline.process_image(path, str(tmp_path / "circle.stl"))
+        record = next(s for s in result["trace"]["stages"] if s["stage"] == "preprocess")
+        return record["cached"], result["binarization"]
+
+    cached, first = run()
+    assert not cached and first["strategy"] == "otsu"
+    cached, second = run()
+    assert cached and second == first
+
+
+def test_choice_is_returned_not_stored():
+    pipeline = JewelryCADPipeline(verbose=False, binarization="auto")
+    image = np.full((120, 120, 3), 255, dtype=np.uint8)
+    cv2.rectangle(image, (30, 30), (90, 90), (0, 0, 0), -1)
+    mask, choice = pipeline.preprocess(image)
+    assert mask.shape == (120, 120) and choice["strategy"] in pipeline.binarizer.strategies
+    assert not hasattr(pipeline, "binarization_choice")
+    assert pipeline.preprocess_image(image).shape == (120, 120)
+
+
+def test_stream_entries_record_the_strategy(tmp_path):
+    paths = [drawing(tmp_path, f"circle{i}.png") for i in range(2)]
+    pipeline = JewelryCADPipeline(verbose=False, binarization="otsu")
+    entries = list(pipeline.process_stream(paths, output_dir=str(tmp_path / "out"),
+                                           cv_workers=2, geometry_workers=1))
+    assert [e["status"] for e in entries] == ["ok", "ok"]
+    assert all(e["binarization"] == "otsu" for e in entries)
+
+
+def test_otsu_threshold_matches_opencv():
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        gray = np.clip(rng.normal(rng.uniform(60, 200), rng.uniform(5, 60), (40, 50)), 0, 255).astype(np.uint8)
+        threshold, _ = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        assert otsu_threshold(np.bincount(gray.ravel(), minlength=256)) == threshold
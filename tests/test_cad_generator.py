@@ -0,0 +1,62 @@
+# tests/test_cad_generator.py
+import numpy as np
+import pytest
+from shapely.geometry import Point, box
+
+from cad_generator import CADGenerator
+from mesh_validator import MeshValidator
+
+
+def sheet(count=12):
+    """Earring-sheet layout: rings, plates with holes and solid discs"""
+    parts = []
+    for i in range(count):
+        x, y = 30 * (i % 4), 30 * (i // 4)
+        if i % 3 == 0:
+            parts.append(Point(x, y).buffer(10, 48).difference(Point(x, y).buffer(5, 48)))
+        elif i % 3 == 1:
+            parts.append(box(x - 8, y - 8, x + 8, y + 8).difference(Point(x, y).buffer(3, 24)))
+        else:
+            parts.append(Point(x, y).buffer(6 + i % 4, 32))
+    return parts
+
+
+@pytest.mark.parametrize("workers", [None, 4])
+def test_every_component_is_extruded(workers):
+    parts = sheet()
+    cad = CADGenerator(verbose=False, multi_component=True, triangulation_workers=workers)
+    mesh = cad.extrude_to_3d(parts, thickness=1.2)
+    assert mesh.is_watertight and mesh.is_winding_consistent
+    assert mesh.body_count == len(parts)
+    assert mesh.volume == pytest.approx(sum(p.area for p in parts) * 1.2, rel=1e-9)
+
+
+def test_threaded_triangulation_matches_serial():
+    parts = sheet()
+    serial = CADGenerator(verbose=False, multi_component=True).extrude_to_3d(parts)
+    threaded = CADGenerator(verbose=False, multi_component=True,
+                            triangulation_workers=4).extrude_to_3d(parts)
+    assert np.array_equal(serial.vertices, threaded.vertices)
+    assert np.array_equal(serial.faces, threaded.faces)
+
+
+def test_single_component_mode_keeps_the_largest():
+    parts = sheet()
+    mesh = CADGenerator(verbose=False).extrude_to_3d(parts, thickness=2.0)
+    largest = max(parts, key=lambda p: p.area)
+    assert mesh.is_watertight and mesh.body_count == 1
+    assert mesh.volume == pytest.approx(largest.area * 2.0, rel=1e-9)
+
+
+def test_meshes_pass_validation():
+    mesh = CADGenerator(verbose=False, multi_component=True).extrude_to_3d(sheet(), 1.0)
+    assert MeshValidator().validate_mesh(mesh) == (True, [])
+
+
+def test_quiet_generator_prints_nothing_on_fallback(capsys):
+    # Not a polygon: extrusion fails and falls back to a box
+    mesh = CADGenerator(verbose=False).create_simple_extrusion(object(), 1.0)
+    assert mesh.is_watertight
+    assert capsys.readouterr().out == ""
+    CADGenerator().create_simple_extrusion(object(), 1.0)
+    assert "Native extrusion failed" in capsys.readouterr().out
@@ -0,0 +1,142 @@
+# tests/test_contour_processor.py
+import cv2
+import numpy as np
+import pytest
+
+from cad_generator import CADGenerator
+from contour_processor import (PARALLEL_MIN_CONTOURS, ContourProcessor, contour_metrics, despeckle,
+                               keep_parity, remap_parents)
+from curve_set import CurveSet
+
+
+def sketch(seed=0, size=600):
+    """Black-on-white mask with nested shapes, paper specks and pinholes"""
+    rng = np.random.default_rng(seed)
+    mask = np.full((size, size), 255, dtype=np.uint8)
+    cv2.circle(mask, (300, 300), 220, 0, 30)
+    cv2.rectangle(mask, (200, 200), (400, 400), 0, -1)
+    cv2.circle(mask, (300, 300), 60, 255, -1)
+    cv2.circle(mask, (300, 300), 25, 0, -1)
+    for x, y in rng.integers(5, size - 5, (400, 2)):
+        r = int(rng.integers(0, 3))
+        cv2.circle(mask, (int(x), int(y)), r, int(255 - mask[y, x]), -1)
+    return mask
+
+
+def star(mask, center, inner, outer, spikes, color):
+    angles = np.linspace(0, 2 * np.pi, 2 * spikes, endpoint=False)
+    radii = np.tile([outer, inner], spikes)
+    points = np.stack([center[0] + radii * np.cos(angles), center[1] + radii * np.sin(angles)], axis=1)
+    cv2.fillPoly(mask, [np.round(points).astype(np.int32)], color)
+
+
+def nested(middle_dropped):
+    """
+    Solid disc, hole, island, hole. The middle level is a plain circle whose
+    perimeter falls under the length filter while the spiky level inside it
+    stays: a hole (depth 1) or an island (depth 2).
+    """
+    mask = np.zeros((400, 400), dtype=np.uint8)
+    cv2.circle(mask, (200, 200), 180, 255, -1)
+    if middle_dropped == "hole":
+        cv2.circle(mask, (200, 200), 60, 0, -1)
+        star(mask, (200, 200), 25, 55, 12, 255)
+    else:
+        cv2.circle(mask, (200, 200), 140, 0, -1)
+        cv2.circle(mask, (200, 200), 60, 255, -1)
+        star(mask, (200, 200), 25, 55, 12, 0)
+    return mask
+
+
+def tree(processor, mask):
+    contours, parents = processor.detect_contour_tree(mask)
+    return [c.tolist() for c in contours], list(parents)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_despeckling_leaves_contours_unchanged(seed):
+    mask = sketch(seed)
+    plain = ContourProcessor(min_contour_length=60, verbose=False)
+    despeckled = ContourProcessor(min_contour_length=60, despeckle_area=10, verbose=False)
+    assert len(plain.detect_contour_tree(mask)[0]) >= 4
+    assert tree(despeckled, mask) == tree(plain, mask)
+    # The specks really were erased before tracing
+    despeckled.detect_contour_tree(mask)
+    plain.detect_contour_tree(mask)
+    assert despeckled.stats["contours_found"] < plain.stats["contours_found"]
+
+
+def test_despeckle_keeps_pinholes_on_the_border():
+    mask = np.full((50, 50), 255, dtype=np.uint8)
+    mask[0:2, 10:12] = 0
+    mask[20:22, 20:22] = 0
+    cleaned = despeckle(mask, 10)
+    assert cleaned[0, 10] == 0 and cleaned[20, 20] == 255
+
+
+def test_contour_metrics_match_opencv():
+    contours, _ = cv2.findContours(sketch(3), cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+    metrics = contour_metrics(contours)
+    assert np.allclose(metrics["lengths"], [cv2.arcLength(c, True) for c in contours], rtol=1e-6)
+    assert np.array_equal(metrics["areas"], [cv2.contourArea(c) for c in contours])
+    assert np.array_equal(metrics["bboxes"], [cv2.boundingRect(c) for c in contours])
+
+
+def test_parallel_simplification_matches_serial():
+    mask = np.full((800, 800), 255, dtype=np.uint8)
+    for i in range(PARALLEL_MIN_CONTOURS + 100):
+        y, x = divmod(i, 25)
+        cv2.circle(mask, (16 + 32 * x, 16 + 32 * y), 6 + i % 7, 0, 2)
+    serial = ContourProcessor(min_contour_length=10, workers=1, verbose=False)
+    parallel = ContourProcessor(min_contour_length=10, workers=4, verbose=False)
+    contours, parents = serial.detect_contour_tree(mask)
+    assert len(contours) >= PARALLEL_MIN_CONTOURS
+    a, a_parents = serial.refine_contour_tree(contours, parents)
+    b, b_parents = parallel.refine_contour_tree(contours, parents)
+    assert [c.tolist() for c in a] == [c.tolist() for c in b] and a_parents == b_parents
+
+
+def test_remap_parents_skips_dropped_ancestors():
+    # 0 > 1 > 2 > 3, and 4 under 1
+    parents = [-1, 0, 1, 2, 1]
+    assert remap_parents(parents, [True, False, True, True, True]) == [-1, 0, 1, 0]
+    assert remap_parents(parents, [False, True, False, True, False]) == [-1, 0]
+    assert remap_parents([], []) == []
+
+
+def test_keep_parity_drops_levels_that_would_flip():
+    parents = [-1, 0, 1, 2, 1]
+    # Hole 1 dropped: islands 2 and 4 lie in solid and go; hole 3 is still a hole of 0
+    assert keep_parity(parents, [True, False, True, True, True]).tolist() == [
+        True, False, False, True, False]
+    # Island 2 dropped: hole 3 lies in a hole and goes
+    assert keep_parity(parents, [True, True, False, True, True]).tolist() == [
+        True, True, False, False, True]
+    assert keep_parity(parents, [True] * 5).all()
+
+
+@pytest.mark.parametrize("middle_dropped, area", [
+    # The filled-in hole leaves the whole disc solid
+    ("hole", np.pi * 180 ** 2),
+    # The dropped island leaves a plain ring
+    ("island", np.pi * (180 ** 2 - 140 ** 2)),
+])
+def test_filtered_middle_contour_keeps_shells_and_holes(middle_dropped, area):
+    processor = ContourProcessor(min_contour_length=450, verbose=False)
+    contours, parents = processor.detect_contour_tree(nested(middle_dropped))
+    assert len(contours) == (1 if middle_dropped == "hole" else 2)
+    polygons = CADGenerator(verbose=False, multi_component=True).create_cad_geometry(
+        CurveSet.from_contours(contours, parents))
+    assert len(polygons) == 1
+    assert polygons[0].area == pytest.approx(area, rel=0.03)
+
+
+def test_nested_shell_hole_island():
+    processor = ContourProcessor(min_contour_length=50, epsilon_factor=0.001, verbose=False)
+    contours, parents = processor.refine_contour_tree(*processor.detect_contour_tree(nested("hole")))
+    assert list(parents) == [-1, 0, 1]
+    polygons = CADGenerator(verbose=False, multi_component=True).create_cad_geometry(
+        CurveSet.from_contours(contours, parents))
+    ring, island = sorted(polygons, key=lambda p: -p.area)
+    assert len(ring.interiors) == 1 and len(island.interiors) == 0
+    assert ring.area == pytest.approx(np.pi * (180 ** 2 - 60 ** 2), rel=0.01)
@@ -0,0 +1,92 @@
+# tests/test_conversion_service.py
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import cv2
+import numpy as np
+import pytest
+
+import conversion_service
+from conversion_service import ConversionService
+from main import JewelryCADPipeline
+
+
+def drawing_bytes():
+    image = np.full((200, 200, 3), 255, dtype=np.uint8)
+    cv2.circle(image, (100, 100), 50, (0, 0, 0), -1)
+    return cv2.imencode(".png", image)[1].tobytes()
+
+
+def post(service, data, query="thickness=1.5", headers=None):
+    request = urllib.request.Request(f"{service.address}/convert?{query}", data=data,
+                                     headers=headers or {}, method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+
+def get_status(service):
+    with urllib.request.urlopen(f"{service.address}/status", timeout=10) as response:
+        return json.loads(response.read())
+
+
+@pytest.fixture
+def service(request):
+    options = dict(workers=1, queue_size=4)
+    options.update(getattr(request, "param", {}))
+    service = ConversionService(JewelryCADPipeline(verbose=False), port=0, **options).start()
+    yield service
+    service.shutdown()
+
+
+def test_convert_returns_stl_and_report(service):
+    code, headers, body = post(service, drawing_bytes())
+    assert code == 200
+    assert headers["Content-Type"] == "model/stl"
+    # Binary STL: 80-byte header, face count, 50 bytes per face
+    faces = int.from_bytes(body[80:84], "little")
+    assert faces > 0 and len(body) == 84 + 50 * faces
+    assert json.loads(headers["X-Validation-Report"])["is_valid"]
+    status = get_status(service)
+    assert status["completed"] == 1 and status["failed"] == 0
+    assert status["latency"]["max"] > 0
+
+
+@pytest.mark.parametrize("service", [{"use_processes": False, "max_body_bytes": 1000}],
+                         indirect=True)
+def test_bad_requests_are_rejected(service):
+    assert post(service, drawing_bytes(), "format=../../x")[0] == 400
+    assert post(service, b"x" * 2000)[0] == 413
+    assert post(service, b"")[0] == 400
+    assert get_status(service)["completed"] == 0
+
+
+@pytest.mark.parametrize("service", [{"use_processes": False, "queue_size": 1}], indirect=True)
+def test_full_queue_gets_503(service, monkeypatch):
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocked(data, suffix, thickness):
+        started.set()
+        release.wait(30)
+        return b"solid", {}
+
+    monkeypatch.setattr(conversion_service, "_convert_bytes", blocked)
+    # One job in flight on the only worker, one waiting in the queue
+    first = service.submit(b"png")
+    assert started.wait(10)
+    second = service.submit(b"png")
+    try:
+        code, headers, body = post(service, b"png")
+        assert code == 503
+        assert headers["Retry-After"] == "1"
+        status = json.loads(body)
+        assert status["in_flight"] == 1 and status["queue_depth"] == 1
+        assert get_status(service)["rejected"] == 1
+    finally:
+        release.set()
+    assert first.result(10)[0] == b"solid" and second.result(10)[0] == b"solid"
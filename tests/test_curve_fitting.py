@@ -0,0 +1,61 @@
+# tests/test_curve_fitting.py
+import cv2
+import numpy as np
+import pytest
+import shapely
+
+from curve_fitting import fit_contour
+
+
+def traced(mask):
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+    return max(contours, key=len).reshape(-1, 2).astype(np.float64)
+
+
+def notched_disc(kind, size):
+    mask = np.zeros((300, 300), dtype=np.uint8)
+    cv2.circle(mask, (150, 150), 100, 255, -1)
+    if kind == "bite":
+        cv2.circle(mask, (150, 50), size, 0, -1)
+    elif kind == "v":
+        cv2.fillPoly(mask, [np.array([[150 - size, 45], [150 + size, 45], [150, 45 + 4 * size]])], 0)
+    else:
+        cv2.rectangle(mask, (150 - size // 2, 40), (150 + size // 2, 90), 0, -1)
+    return traced(mask)
+
+
+def deviation(source, vertices):
+    return shapely.distance(shapely.points(source), shapely.LinearRing(vertices)).max()
+
+
+def test_square_keeps_its_corners():
+    mask = np.zeros((200, 200), dtype=np.uint8)
+    cv2.rectangle(mask, (40, 50), (160, 140), 255, -1)
+    vertices = fit_contour(traced(mask))
+    for corner in [(40, 50), (160, 50), (160, 140), (40, 140)]:
+        assert np.min(np.hypot(*(vertices - corner).T)) < 1e-6
+    assert deviation(traced(mask), vertices) <= 0.25
+
+
+@pytest.mark.parametrize("kind", ["bite", "v", "slot"])
+@pytest.mark.parametrize("size", [2, 3, 5, 8])
+def test_polygon_stays_within_the_bound_of_the_traced_contour(kind, size):
+    source = notched_disc(kind, size)
+    vertices = fit_contour(source, tolerance=0.25, max_deviation=1.0)
+    assert deviation(source, vertices) <= 0.25 + 1.0
+
+
+def test_plain_disc_needs_few_vertices():
+    mask = np.zeros((300, 300), dtype=np.uint8)
+    cv2.circle(mask, (150, 150), 100, 255, -1)
+    source = traced(mask)
+    vertices = fit_contour(source, tolerance=0.25)
+    assert len(vertices) < len(source) / 5
+    assert deviation(source, vertices) <= 1.25
+
+
+@pytest.mark.parametrize("max_vertices", [16, 40])
+def test_vertex_budget_is_kept(max_vertices):
+    for source in (notched_disc("v", 8), notched_disc("slot", 5)):
+        vertices = fit_contour(source, max_vertices=max_vertices)
+        assert 3 <= len(vertices) <= max_vertices
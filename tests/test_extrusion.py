@@ -0,0 +1,58 @@
+# tests/test_extrusion.py
+import numpy as np
+import pytest
+import trimesh
+from shapely.geometry import Point, Polygon, box
+
+from extrusion import DEGENERATE_AREA, extrude_polygon, polygon_rings, triangulate_rings
+
+STAR = Polygon([(np.cos(a) * r, np.sin(a) * r) for a, r in
+                zip(np.linspace(0, 2 * np.pi, 20, endpoint=False), [10, 4] * 10)])
+
+SHAPES = {
+    "square": box(0, 0, 5, 3),
+    "star": STAR,
+    "ring": Point(0, 0).buffer(10, 64).difference(Point(0, 0).buffer(6, 64)),
+    "plate_with_holes": box(0, 0, 40, 20).difference(Point(10, 10).buffer(4, 32))
+                                         .difference(box(25, 5, 35, 15)),
+    # Clockwise exterior with a repeated vertex
+    "clockwise": Polygon([(0, 0), (0, 4), (0, 4), (6, 4), (6, 0)]),
+}
+
+
+@pytest.mark.parametrize("name", sorted(SHAPES))
+def test_prism_is_watertight_and_keeps_volume(name):
+    polygon = SHAPES[name]
+    vertices, faces = extrude_polygon(polygon, 1.5)
+    mesh = trimesh.Trimesh(vertices, faces, process=False)
+    assert mesh.is_watertight and mesh.is_winding_consistent
+    # Positive volume: normals face outwards
+    assert mesh.volume == pytest.approx(polygon.area * 1.5, rel=1e-9)
+    assert np.allclose(mesh.bounds[:, :2], np.reshape(polygon.bounds, (2, 2)))
+    assert np.allclose(mesh.bounds[:, 2], [0, 1.5])
+
+
+def test_rings_drop_closing_and_repeated_points():
+    vertices, offsets = polygon_rings(SHAPES["clockwise"])
+    assert offsets.tolist() == [0, 4]
+    # Exterior counter-clockwise
+    x, y = vertices[:, 0], vertices[:, 1]
+    assert np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y) > 0
+
+
+def test_empty_polygon_gives_no_faces():
+    vertices, faces = extrude_polygon(Polygon(), 1.0)
+    assert len(vertices) == 0 and len(faces) == 0
+
+
+def test_degenerate_cap_triangles_are_flipped_away():
+    # Earcut bridges the hole of this ring with a zero-area triangle
+    ring = Point(0, 0).buffer(10, 48).difference(Point(0, 0).buffer(5, 48))
+    vertices, offsets = polygon_rings(ring)
+    triangles = triangulate_rings(vertices, offsets, ring)
+    a, b, c = (vertices[triangles[:, i]] for i in range(3))
+    cross = (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0])
+    assert np.all(cross > DEGENERATE_AREA)
+    assert cross.sum() / 2 == pytest.approx(ring.area, rel=1e-9)
+    mesh = trimesh.Trimesh(*extrude_polygon(ring, 1.0), process=False)
+    assert mesh.is_watertight and mesh.is_winding_consistent
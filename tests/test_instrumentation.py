@@ -0,0 +1,92 @@
+# tests/test_instrumentation.py
+import json
+
+import cv2
+import numpy as np
+import pytest
+
+from instrumentation import JsonTraceWriter, PipelineHook, PipelineTrace, point_stats
+from main import JewelryCADPipeline
+
+
+class Recorder(PipelineHook):
+    def __init__(self):
+        self.events = []
+
+    def on_stage_start(self, trace, stage):
+        self.events.append(("start", stage))
+
+    def on_stage_end(self, trace, record):
+        self.events.append(("end", record["stage"]))
+
+    def on_trace_complete(self, trace):
+        self.events.append(("complete", trace.total))
+
+
+def test_stages_are_timed_and_hooks_called():
+    hook = Recorder()
+    with PipelineTrace("a.png", [hook]) as trace:
+        with trace.stage("load", cached=False) as record:
+            record["extra"] = 1
+        trace.count("contours", 3)
+    record, = trace.stages
+    assert record["stage"] == "load" and record["cached"] is False and record["extra"] == 1
+    assert record["wall_time"] >= 0 and record["cpu_time"] >= 0
+    assert trace.counts == {"contours": 3}
+    assert [event[0] for event in hook.events] == ["start", "end", "complete"]
+    assert "error" not in trace.total and set(trace.timings()) == {"load", "total"}
+
+
+def test_peak_rss_growth_is_per_stage():
+    trace = PipelineTrace("a.png")
+    with trace.stage("small"):
+        pass
+    with trace.stage("large"):
+        block = np.ones(64 * 1024 ** 2, dtype=np.uint8)
+        del block
+    small, large = trace.stages
+    if small["process_peak_rss_mb"] is None:
+        pytest.skip("resource module not available")
+    # The process-wide peak never drops; the growth belongs to the stage that caused it
+    assert large["process_peak_rss_mb"] >= small["process_peak_rss_mb"]
+    assert 0 <= small["peak_rss_growth_mb"] <= large["process_peak_rss_mb"]
+    assert large["peak_rss_growth_mb"] == pytest.approx(
+        large["process_peak_rss_mb"] - small["process_peak_rss_mb"], abs=1.0)
+
+
+def test_tracemalloc_reports_stage_allocations():
+    trace = PipelineTrace("a.png", track_memory=True)
+    with trace.stage("alloc"):
+        block = np.ones(16 * 1024 ** 2, dtype=np.uint8)
+        del block
+    assert trace.stages[0]["peak_traced_mb"] >= 15
+
+
+def test_failed_stage_still_writes_the_trace(tmp_path):
+    path = tmp_path / "broken.png"
+    path.write_bytes(b"not an image")
+    pipeline = JewelryCADPipeline(verbose=False, trace_dir=str(tmp_path / "traces"))
+    with pytest.raises(ValueError):
+        pipeline.process_image(str(path), str(tmp_path / "broken.stl"))
+    written = json.loads((tmp_path / "traces" / "broken.trace.json").read_text())
+    assert written["stages"][-1]["stage"] == "load"
+    assert written["stages"][-1]["error"].startswith("ValueError")
+    assert written["total"]["error"].startswith("ValueError")
+
+
+def test_successful_run_writes_one_trace(tmp_path):
+    image = np.zeros((120, 120, 3), dtype=np.uint8)
+    cv2.circle(image, (60, 60), 40, (255, 255, 255), -1)
+    cv2.imwrite(str(tmp_path / "disc.png"), image)
+    writer = JsonTraceWriter(str(tmp_path / "traces"))
+    pipeline = JewelryCADPipeline(verbose=False, hooks=[writer])
+    result = pipeline.process_image(str(tmp_path / "disc.png"), str(tmp_path / "disc.stl"))
+    written = json.loads((tmp_path / "traces" / "disc.trace.json").read_text())
+    assert written == json.loads(json.dumps(result["trace"]))
+    assert "error" not in written["total"]
+
+
+def test_point_stats():
+    curves = [{"points": [0] * 4}, {"points": [0] * 8}]
+    assert point_stats(curves) == {"curves": 2, "total": 12, "min": 4, "max": 8, "mean": 6.0}
+    assert point_stats([])["curves"] == 0
@@ -0,0 +1,66 @@
+# tests/test_mesh_export.py
+import gzip
+import zipfile
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pytest
+import trimesh
+
+from mesh_export import STL_DTYPE, export_mesh, write_meshes
+
+NS = {"m": "http://schemas.microsoft.com/3dmanufacturing/core/2015/02"}
+
+
+def awkward_mesh():
+    # Coordinates with more digits than %.6g keeps, far from the origin
+    mesh = trimesh.creation.icosphere(subdivisions=2, radius=7.123456789)
+    mesh.apply_translation([1234.56789, -0.000123456, 98.7654321])
+    return mesh
+
+
+def read_stl(data):
+    count = int(np.frombuffer(data[80:84], dtype="<u4")[0])
+    assert len(data) == 84 + STL_DTYPE.itemsize * count
+    return np.frombuffer(data[84:], dtype=STL_DTYPE)
+
+
+def read_3mf(path):
+    with zipfile.ZipFile(path) as archive:
+        assert {"[Content_Types].xml", "_rels/.rels", "3D/3dmodel.model"} <= set(archive.namelist())
+        root = ET.fromstring(archive.read("3D/3dmodel.model"))
+    vertices = np.array([[float(v.get(axis)) for axis in "xyz"]
+                         for v in root.iterfind(".//m:vertex", NS)])
+    faces = np.array([[int(t.get(k)) for k in ("v1", "v2", "v3")]
+                      for t in root.iterfind(".//m:triangle", NS)])
+    return vertices, faces
+
+
+def test_stl_matches_the_mesh(tmp_path):
+    mesh = awkward_mesh()
+    records = read_stl(open(export_mesh(mesh, str(tmp_path / "m.stl")), "rb").read())
+    assert np.array_equal(records["vertices"], mesh.triangles.astype(np.float32))
+    assert np.allclose(records["normal"], mesh.face_normals, atol=1e-6)
+
+
+def test_gzip_holds_the_same_stl(tmp_path):
+    mesh = awkward_mesh()
+    stl = open(export_mesh(mesh, str(tmp_path / "m.stl")), "rb").read()
+    with gzip.open(export_mesh(mesh, str(tmp_path / "m.stl.gz")), "rb") as f:
+        assert f.read() == stl
+
+
+def test_3mf_round_trips_to_the_stl_vertices(tmp_path):
+    mesh = awkward_mesh()
+    records = read_stl(open(export_mesh(mesh, str(tmp_path / "m.stl")), "rb").read())
+    vertices, faces = read_3mf(export_mesh(mesh, str(tmp_path / "m.3mf")))
+    assert np.array_equal(faces, mesh.faces)
+    assert np.array_equal(vertices.astype(np.float32)[faces], records["vertices"])
+
+
+@pytest.mark.parametrize("suffix", [".stl", ".stl.gz", ".3mf"])
+def test_write_meshes_keeps_order_and_leaves_no_temp_files(tmp_path, suffix):
+    meshes = [trimesh.creation.box(extents=[i + 1, 1, 1]) for i in range(3)]
+    paths = [str(tmp_path / f"box{i}{suffix}") for i in range(3)]
+    assert write_meshes(zip(meshes, paths)) == paths
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(f"box{i}{suffix}" for i in range(3))
@@ -0,0 +1,61 @@
+# tests/test_mesh_lod.py
+import cv2
+import numpy as np
+import pytest
+import trimesh
+from shapely.geometry import Point
+
+from extrusion import extrude_polygon
+from main import JewelryCADPipeline
+from mesh_lod import LODGenerator, lod_path
+
+
+def ring_mesh():
+    ring = Point(0, 0).buffer(10, 64).difference(Point(0, 0).buffer(6, 64))
+    return trimesh.Trimesh(*extrude_polygon(ring, 2.0), process=False), ring.area * 2.0
+
+
+def test_levels_are_watertight_and_keep_volume():
+    mesh, volume = ring_mesh()
+    lods = LODGenerator([1000, 300, 100], [0.05], verbose=False).generate(mesh)
+    assert len(lods) == 4
+    counts = [info["face_count"] for _, info in lods]
+    assert counts == sorted(counts, reverse=True)
+    for lod, info in lods:
+        assert lod.is_watertight and lod.is_winding_consistent
+        assert lod.volume == pytest.approx(volume, rel=0.01)
+        if "faces" in info:
+            assert info["face_count"] <= info["faces"]
+        else:
+            assert info["error"] <= 0.05
+
+
+def test_budget_above_the_face_count_keeps_the_mesh():
+    mesh, volume = ring_mesh()
+    (lod, info), = LODGenerator([10 ** 6], verbose=False).generate(mesh)
+    assert info["face_count"] == len(mesh.faces) and info["error"] == 0
+    assert lod.volume == pytest.approx(volume, rel=1e-9)
+
+
+def test_lod_paths_keep_double_extensions():
+    assert lod_path("out/ring.stl", 1) == "out/ring_lod1.stl"
+    assert lod_path("out/ring.stl.gz", 2) == "out/ring_lod2.stl.gz"
+    assert lod_path("out/ring.3mf", 1) == "out/ring_lod1.3mf"
+
+
+def test_pipeline_writes_valid_levels(tmp_path):
+    image = np.full((300, 300, 3), 255, dtype=np.uint8)
+    cv2.circle(image, (150, 150), 110, (0, 0, 0), -1)
+    cv2.circle(image, (150, 150), 60, (255, 255, 255), -1)
+    path = str(tmp_path / "ring.png")
+    cv2.imwrite(path, image)
+    pipeline = JewelryCADPipeline(verbose=False, lod_face_budgets=[400, 120])
+    result = pipeline.process_image(path, str(tmp_path / "ring.stl"))
+    volume = result["mesh"].volume
+    assert [lod["path"] for lod in result["lods"]] == [
+        str(tmp_path / "ring_lod1.stl"), str(tmp_path / "ring_lod2.stl")]
+    for lod in result["lods"]:
+        assert lod["is_valid"] and lod["face_count"] <= lod["faces"]
+        written = trimesh.load(lod["path"])
+        assert written.is_watertight
+        assert written.volume == pytest.approx(volume, rel=0.02)
@@ -0,0 +1,64 @@
+# tests/test_mesh_validator.py
+import cv2
+import numpy as np
+import trimesh
+from shapely.geometry import Point, box
+
+from extrusion import extrude_polygons
+from main import JewelryCADPipeline
+from mesh_validator import MeshValidator, find_self_intersections
+
+
+def extruded(polygons, height=1.0):
+    vertices, faces = extrude_polygons(polygons, height)
+    return trimesh.Trimesh(vertices, faces, process=False)
+
+
+def test_single_extrusion_is_clean():
+    ring = Point(0, 0).buffer(10, 64).difference(Point(0, 0).buffer(6, 64))
+    mesh = extruded([ring, Point(0, 0).buffer(3, 32)])
+    assert MeshValidator().validate_mesh(mesh) == (True, [])
+
+
+def test_overlapping_extrusions_are_flagged():
+    # The walls cross exactly on triangle edges (integer coordinates)
+    mesh = extruded([box(0, 0, 2, 2), box(1, 1, 3, 3)])
+    is_valid, issues = MeshValidator().validate_mesh(mesh)
+    assert not is_valid
+    assert "Mesh has self-intersections" in issues
+
+
+def test_offset_boxes_are_flagged():
+    # Only coplanar faces and edge contacts, no proper crossing
+    mesh = trimesh.util.concatenate([trimesh.creation.box(),
+                                     trimesh.creation.box().apply_translation([0.7, 0, 0])])
+    assert len(find_self_intersections(mesh.vertices, mesh.faces)) > 0
+
+
+def test_nested_extrusion_is_flagged():
+    mesh = extruded([box(0, 0, 10, 10), box(2, 2, 4, 4)])
+    assert len(find_self_intersections(mesh.vertices, mesh.faces)) > 0
+
+
+def test_fast_profile_skips_self_intersections():
+    mesh = extruded([box(0, 0, 2, 2), box(1, 1, 3, 3)])
+    validator = MeshValidator(profile="fast")
+    assert validator.validate_mesh(mesh) == (True, [])
+    assert "self_intersecting_pairs" not in validator.last_report["stats"]
+
+
+def test_validation_cache_is_keyed_on_profile(tmp_path):
+    image = np.full((200, 200, 3), 255, dtype=np.uint8)
+    cv2.circle(image, (100, 100), 50, (0, 0, 0), -1)
+    path = str(tmp_path / "circle.png")
+    cv2.imwrite(path, image)
+
+    def validate_record(profile):
+        pipeline = JewelryCADPipeline(cache_dir=str(tmp_path / "cache"), verbose=False,
+                                      validation_profile=profile)
+        result = pipeline.process_image(path, str(tmp_path / f"{profile}.stl"))
+        return next(s for s in result["trace"]["stages"] if s["stage"] == "validate")
+
+    assert not validate_record("fast")["cached"]
+    assert not validate_record("full")["cached"]
+    assert validate_record("full")["cached"]
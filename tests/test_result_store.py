@@ -0,0 +1,85 @@
+# tests/test_result_store.py
+import gc
+import os
+import multiprocessing
+
+import cv2
+import numpy as np
+
+from main import JewelryCADPipeline
+from result_store import ResultStore
+
+
+def drawing(tmp_path, name):
+    image = np.full((200, 200, 3), 255, dtype=np.uint8)
+    cv2.circle(image, (100, 100), 50, (0, 0, 0), -1)
+    path = str(tmp_path / name)
+    cv2.imwrite(path, image)
+    return path
+
+
+def test_spills_are_removed_with_the_result(tmp_path):
+    spill_dir = tmp_path / "spill"
+    pipeline = JewelryCADPipeline(verbose=False, retention="summary", spill_dir=str(spill_dir))
+    result = pipeline.process_image(drawing(tmp_path, "a.png"), str(tmp_path / "a.stl"))
+    assert result["image"].shape == (200, 200, 3)
+    assert set(result.spilled_keys()) >= {"image", "processed", "mesh"}
+    assert os.listdir(spill_dir)
+    del result
+    gc.collect()
+    assert os.listdir(spill_dir) == []
+
+
+def test_batch_workers_leave_no_spills(tmp_path):
+    spill_dir = tmp_path / "spill"
+    paths = [drawing(tmp_path, f"{i}.png") for i in range(3)]
+    pipeline = JewelryCADPipeline(verbose=False, retention="summary", spill_dir=str(spill_dir))
+    entries = pipeline.process_batch(paths, output_dir=str(tmp_path / "out"), workers=2)
+    assert all(e["status"] == "ok" for e in entries)
+    assert os.listdir(spill_dir) == []
+
+
+_child_store = None
+
+
+def _spill_in_child(queue):
+    # Kept alive until the process exits, like a pool worker's pipeline
+    global _child_store
+    _child_store = ResultStore("summary")
+    _child_store.spill("x", "image", np.zeros((4, 4), dtype=np.uint8))
+    queue.put(_child_store.spill_dir)
+
+
+def test_worker_temp_folder_is_removed_on_exit():
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_spill_in_child, args=(queue,))
+    process.start()
+    spill_dir = queue.get(timeout=30)
+    process.join(30)
+    assert process.exitcode == 0
+    assert not os.path.exists(spill_dir)
+
+
+def test_close_removes_the_temp_folder():
+    store = ResultStore("summary")
+    spilled = store.spill("x", "image", np.zeros((4, 4), dtype=np.uint8))
+    spill_dir = store.spill_dir
+    assert os.path.isdir(spill_dir) and spilled.load().shape == (4, 4)
+    store.close()
+    assert not os.path.exists(spill_dir)
+
+
+def test_lod_meshes_are_spilled(tmp_path):
+    spill_dir = tmp_path / "spill"
+    pipeline = JewelryCADPipeline(verbose=False, retention="geometry", spill_dir=str(spill_dir),
+                                  lod_face_budgets=[200, 60])
+    result = pipeline.process_image(drawing(tmp_path, "a.png"), str(tmp_path / "a.stl"))
+    assert len(result["lods"]) == 2
+    for lod in result["lods"]:
+        assert lod.spilled_keys() == ["mesh"]
+        assert lod["mesh"].is_watertight and len(lod["mesh"].faces) == lod["face_count"]
+    # The main mesh stays in memory under geometry retention
+    assert "mesh" not in result.spilled_keys()
+    del result, lod
+    gc.collect()
+    assert os.listdir(spill_dir) == []
@@ -0,0 +1,71 @@
+# tests/test_stage_cache.py
+import os
+
+import numpy as np
+
+from stage_cache import StageCache
+
+
+def mask(seed, size=64):
+    # Random bits don't compress, so every entry has about the same size
+    rng = np.random.default_rng(seed)
+    return (rng.integers(0, 2, (size, size)) * 255).astype(np.uint8)
+
+
+def entry_size(tmp_path):
+    probe = StageCache(str(tmp_path / "probe"))
+    probe.put("x", "mask", mask(0))
+    return os.path.getsize(probe._path("x"))
+
+
+def age(cache, key, seconds):
+    os.utime(cache._path(key), (seconds, seconds))
+
+
+def test_keys_are_stable_and_chained():
+    key = StageCache.make_key("parent", "contours", {"b": 1, "a": 2.5})
+    assert key == StageCache.make_key("parent", "contours", {"a": 2.5, "b": 1})
+    # Keys name files on disk, so they must be the same in every run
+    assert key == "9860a800f562a575d5370933a822412300ed3733d4d6e81ac30f62ee19d71dd2"
+    assert key != StageCache.make_key("other", "contours", {"b": 1, "a": 2.5})
+    assert key != StageCache.make_key("parent", "contours", {"b": 1, "a": 2.0})
+    assert StageCache.make_key("parent", "fit") == StageCache.make_key("parent", "fit", {})
+    assert StageCache.hash_bytes(b"ring") == StageCache.hash_bytes(b"ring") != StageCache.hash_bytes(b"rings")
+
+
+def test_miss_then_hit(tmp_path):
+    cache = StageCache(str(tmp_path))
+    contours = [np.array([[[0, 0]], [[5, 0]], [[5, 5]]], dtype=np.int32)]
+    assert cache.get("k", "contours") is None
+    cache.put("k", "contours", (contours, [-1]))
+    cached, parents = cache.get("k", "contours")
+    assert np.array_equal(cached[0], contours[0]) and parents == [-1]
+    # A corrupt entry is a miss, not an error
+    with open(cache._path("bad"), "wb") as f:
+        f.write(b"not an npz")
+    assert cache.get("bad", "mask") is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    size = entry_size(tmp_path)
+    cache = StageCache(str(tmp_path / "cache"), max_bytes=int(size * 4.5))
+    for i in range(4):
+        cache.put(f"k{i}", "mask", mask(i))
+        age(cache, f"k{i}", 1000 + i)
+    # Reading k0 makes it the most recently used
+    assert cache.get("k0", "mask") is not None
+    cache.put("k4", "mask", mask(4))
+    assert [cache.get(f"k{i}", "mask") is None for i in range(5)] == [False, True, False, False, False]
+
+
+def test_eviction_counts_entries_written_by_other_processes(tmp_path):
+    size = entry_size(tmp_path)
+    folder = str(tmp_path / "cache")
+    # Two workers sharing a folder, each seeing only its own writes
+    a = StageCache(folder, max_bytes=size * 10)
+    b = StageCache(folder, max_bytes=size * 10)
+    for i in range(20):
+        (a if i % 2 else b).put(f"k{i}", "mask", mask(i))
+        age(a, f"k{i}", 1000 + i)
+    total = sum(os.path.getsize(os.path.join(folder, name)) for name in os.listdir(folder))
+    assert total <= size * 10
@@ -0,0 +1,84 @@
+# tests/test_stage_graph.py
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from main import JewelryCADPipeline
+from stage_graph import StageGraph
+
+
+def chain():
+    """a(x) -> b(y) -> c, plus d(x) beside them"""
+    graph = StageGraph()
+    graph.add_stage("a", lambda x: x + 1, params=["x"])
+    graph.add_stage("b", lambda a, y: a * y, inputs=["a"], params=["y"])
+    graph.add_stage("c", lambda b: -b, inputs=["b"])
+    graph.add_stage("d", lambda x: x * 10, params=["x"])
+    graph.set_params(x=1, y=2)
+    return graph
+
+
+def test_only_stages_downstream_of_a_change_rerun():
+    graph = chain()
+    assert graph.get("c") == -4
+    assert graph.set_params(y=3) == {"y"}
+    assert graph.get("c") == -6
+    assert graph.run_counts == {"a": 1, "b": 2, "c": 2, "d": 0}
+    # Unchanged values dirty nothing
+    assert graph.set_params(x=1, y=3) == set()
+    assert graph.get("c") == -6 and graph.run_counts["c"] == 2
+
+
+def test_parameter_change_dirties_every_reader():
+    graph = chain()
+    graph.get("c"), graph.get("d")
+    graph.set_params(x=2)
+    assert graph.dirty == {"a", "b", "c", "d"}
+    assert graph.get("c") == -6 and graph.get("d") == 20
+
+
+def test_unknown_input_is_rejected():
+    with pytest.raises(ValueError):
+        StageGraph().add_stage("b", lambda a: a, inputs=["a"])
+
+
+def drawing(tmp_path):
+    image = np.full((200, 200, 3), 255, dtype=np.uint8)
+    cv2.circle(image, (100, 100), 60, (0, 0, 0), -1)
+    cv2.circle(image, (100, 100), 25, (255, 255, 255), -1)
+    path = str(tmp_path / "ring.png")
+    cv2.imwrite(path, image)
+    return path
+
+
+def test_sweep_traces_once(tmp_path):
+    pipeline = JewelryCADPipeline(verbose=False)
+    sweep = pipeline.process_sweep(drawing(tmp_path), str(tmp_path / "out"),
+                                   thicknesses=[1.0, 2.0], epsilon_factors=[0.01, 0.002])
+    assert len(sweep["variants"]) == 4
+    assert all(os.path.exists(v["output"]) and v["is_valid"] for v in sweep["variants"])
+    runs = sweep["stage_runs"]
+    assert runs["preprocess"] == runs["contours"] == 1
+    assert runs["refine"] == 2 and runs["extrude"] == 4
+
+
+def test_spline_sweep_skips_epsilon_variants(tmp_path):
+    pipeline = JewelryCADPipeline(verbose=False, spline_tolerance=0.25)
+    sweep = pipeline.process_sweep(drawing(tmp_path), str(tmp_path / "out"),
+                                   thicknesses=[1.0, 2.0], epsilon_factors=[0.01, 0.002])
+    names = sorted(os.path.basename(v["output"]) for v in sweep["variants"])
+    assert names == ["ring_t1.stl", "ring_t2.stl"]
+    assert sweep["stage_runs"]["fit"] == 1
+
+
+def test_sweep_reads_svg(tmp_path):
+    path = tmp_path / "plate.svg"
+    path.write_text('<svg xmlns="http://www.w3.org/2000/svg">'
+                    '<path d="M0,0 H20 V10 H0 Z M5,3 h4 v4 h-4 z"/></svg>')
+    pipeline = JewelryCADPipeline(verbose=False)
+    sweep = pipeline.process_sweep(str(path), str(tmp_path / "out"), thicknesses=[1.0, 1.5])
+    assert [v["epsilon_factor"] for v in sweep["variants"]] == [None, None]
+    assert all(v["is_valid"] for v in sweep["variants"])
+    assert sweep["stage_runs"]["svg"] == 1 and "preprocess" not in sweep["stage_runs"]
@@ -0,0 +1,81 @@
+# tests/test_streaming.py
+import json
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+import trimesh
+
+from batch_processor import main
+from main import JewelryCADPipeline
+from streaming import Stage, StreamingExecutor, pipeline_stages
+
+
+def test_early_stop_does_not_wait_for_blocked_input():
+    release = threading.Event()
+
+    def paths():
+        yield 1
+        # Like stdin with no more lines yet
+        release.wait(30)
+        yield 2
+
+    executor = StreamingExecutor([Stage("double", lambda x: 2 * x)])
+    run = executor.run(paths())
+    try:
+        assert next(run)[1] == 2
+        start = time.perf_counter()
+        run.close()
+        assert time.perf_counter() - start < 5
+    finally:
+        release.set()
+
+
+def test_thread_stage_initializer_runs_once():
+    calls = []
+    stage = Stage("square", lambda x: x * x, workers=3,
+                  initializer=calls.append, initargs=("init",))
+    results = sorted(value for _, value, _, _ in StreamingExecutor([stage]).run(range(5)))
+    assert results == [0, 1, 4, 9, 16]
+    assert calls == ["init"]
+
+
+def test_cv_and_geometry_workers_are_separate():
+    stages = {s.name: s for s in pipeline_stages(JewelryCADPipeline(verbose=False),
+                                                 cv_workers=3, geometry_workers=2, cv_threads=2)}
+    assert stages["preprocess"].workers == stages["contours"].workers == 3
+    assert stages["geometry"].workers == 2 and stages["geometry"].processes
+    # OpenCV's thread count is only set in the worker processes
+    assert stages["geometry"].initargs[1] == 2
+    assert stages["preprocess"].initializer is None
+    assert "validate" not in stages
+
+
+def test_stream_cli_converts_files_end_to_end(tmp_path, capsys):
+    (tmp_path / "in").mkdir()
+    for name, radius in (("a", 60), ("b", 40)):
+        image = np.full((200, 200, 3), 255, dtype=np.uint8)
+        cv2.circle(image, (100, 100), radius, (0, 0, 0), -1)
+        cv2.imwrite(str(tmp_path / "in" / f"{name}.png"), image)
+    (tmp_path / "in" / "broken.png").write_bytes(b"not an image")
+    out = tmp_path / "out"
+    threads = cv2.getNumThreads()
+
+    code = main([str(tmp_path / "in"), "--stream", "-q", "-o", str(out), "-w", "2",
+                 "--cv-workers", "2", "--cv-threads", "1", "-t", "1.5"])
+    assert code == 2
+    assert cv2.getNumThreads() == threads
+    report = capsys.readouterr().out
+    assert "Bottleneck:" in report and "validate" not in report
+
+    with open(out / "manifest.json") as f:
+        entries = json.load(f)["files"]
+    assert [os.path.basename(e["input"]) for e in entries] == ["a.png", "b.png", "broken.png"]
+    assert [e["status"] for e in entries] == ["ok", "ok", "error"]
+    for entry in entries[:2]:
+        assert entry["is_valid"] and "geometry" in entry["timings"]
+        mesh = trimesh.load(entry["output"])
+        assert mesh.is_watertight
+        assert mesh.bounds[1][2] - mesh.bounds[0][2] == 1.5
@@ -0,0 +1,90 @@
+# tests/test_svg_import.py
+import math
+
+import numpy as np
+import pytest
+from shapely.geometry import Polygon
+
+from cad_generator import CADGenerator
+from main import JewelryCADPipeline
+from svg_import import load_svg_curves, parse_path, parse_transform
+
+
+def svg(body, attrs=""):
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" {attrs}>{body}</svg>').encode()
+
+
+def area(points):
+    return Polygon(points).area
+
+
+def test_straight_commands_absolute_and_relative():
+    (points, closed), = parse_path("M10,10 L20,10 V20 H10 Z")
+    assert closed and points[:4].tolist() == [[10, 10], [20, 10], [20, 20], [10, 20]]
+    (relative, _), = parse_path("m10 10 l10 0 v10 h-10 z")
+    assert np.array_equal(relative, points)
+
+
+def test_subpaths_are_split():
+    subpaths = parse_path("M0,0 H4 V4 H0 Z M1,1 h2 v2 h-2 z")
+    assert len(subpaths) == 2
+
+
+def test_curves_stay_within_tolerance():
+    # Two arcs make a circle of radius 10; flattened chords cut at most tolerance
+    tolerance = 0.05
+    (points, _), = parse_path("M-10,0 A10,10 0 1 0 10,0 A10,10 0 1 0 -10,0 Z", tolerance)
+    radii = np.linalg.norm(points, axis=1)
+    assert np.allclose(radii, 10, atol=1e-9)
+    assert math.pi * 100 - area(points) < tolerance * 2 * math.pi * 10
+    # A cubic ends exactly on its end point, smooth continuations included
+    (points, _), = parse_path("M0,0 C0,10 10,10 10,0 S20,-10 20,0", tolerance)
+    assert points[0].tolist() == [0, 0] and points[-1].tolist() == [20, 0]
+    assert points[:, 1].max() == pytest.approx(7.5, abs=tolerance)
+
+
+def test_holes_are_nested_and_become_interiors():
+    curves = load_svg_curves(svg('<rect x="0" y="0" width="40" height="20"/>'
+                                 '<circle cx="10" cy="10" r="5"/>'
+                                 '<rect x="25" y="5" width="10" height="10"/>'), tolerance=0.01)
+    assert len(curves) == 3
+    assert list(curves.parent_index) == [-1, 0, 0]
+    polygons = CADGenerator(verbose=False).create_cad_geometry(curves)
+    assert len(polygons) == 1 and len(polygons[0].interiors) == 2
+    assert polygons[0].area == pytest.approx(800 - 100 - 25 * math.pi, abs=0.5)
+
+
+def test_transforms_compose():
+    matrix = parse_transform("translate(10,5) rotate(90) scale(2)")
+    assert np.allclose(matrix @ [1, 0, 1], [10, 7, 1])
+    assert np.allclose(parse_transform("rotate(180, 5, 5)") @ [0, 0, 1], [10, 10, 1])
+    assert np.allclose(parse_transform("matrix(1,0,0,1,3,4)") @ [0, 0, 1], [3, 4, 1])
+
+    curves = load_svg_curves(svg(
+        '<g transform="translate(100,0)"><g transform="scale(2,3)">'
+        '<rect x="1" y="1" width="2" height="2"/></g></g>'), scale=0.5)
+    points = curves.points(0)
+    assert np.allclose(points.min(axis=0), [51, 1.5]) and np.allclose(points.max(axis=0), [53, 4.5])
+
+
+def test_hidden_and_definitions_are_skipped():
+    curves = load_svg_curves(svg('<defs><rect width="5" height="5"/></defs>'
+                                 '<rect width="5" height="5" style="display: none"/>'
+                                 '<polygon points="0,0 4,0 4,3"/>'))
+    assert len(curves) == 1 and area(curves.points(0)) == pytest.approx(6)
+
+
+def test_invalid_svg_raises_value_error():
+    with pytest.raises(ValueError):
+        load_svg_curves(b"<svg><rect")
+
+
+def test_pipeline_extrudes_svg_without_raster(tmp_path):
+    path = tmp_path / "plate.svg"
+    path.write_bytes(svg('<path d="M0,0 H30 V20 H0 Z M10,5 h10 v10 h-10 z"/>'))
+    result = JewelryCADPipeline(verbose=False).process_image(str(path), str(tmp_path / "plate.stl"),
+                                                             thickness=1.5)
+    assert result["processed"] is None and result["validation"]["is_valid"]
+    mesh = result["mesh"]
+    assert mesh.is_watertight
+    assert mesh.volume == pytest.approx((600 - 100) * 1.5, rel=1e-9)
@@ -0,0 +1,94 @@
+# tests/test_tiled_preprocessing.py
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from main import JewelryCADPipeline
+
+
+def scan(height=700, width=900, seed=0):
+    """Shapes crossing tile borders, on a noisy paper-like background"""
+    rng = np.random.default_rng(seed)
+    image = rng.normal(215, 20, (height, width)).clip(0, 255).astype(np.uint8)
+    cv2.circle(image, (260, 250), 170, 40, 12)
+    cv2.rectangle(image, (240, 230), (640, 520), 60, -1)
+    cv2.ellipse(image, (600, 400), (220, 90), 30, 0, 360, 30, 5)
+    for x, y in rng.integers(0, (width, height), (40, 2)):
+        cv2.circle(image, (int(x), int(y)), int(rng.integers(1, 6)), 50, -1)
+    return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+
+
+def page(size=6000, drawing=2000, seed=0):
+    """A mostly-paper page: a ring and a scalloped outline in one corner"""
+    rng = np.random.default_rng(seed)
+    image = (235 + rng.integers(-12, 12, (size, size), dtype=np.int16)).astype(np.uint8)
+    centre = (drawing // 2 + size // 8, drawing // 2 + size // 8)
+    stroke = max(6, drawing // 120)
+    cv2.circle(image, centre, int(drawing * 0.4), 40, stroke, cv2.LINE_AA)
+    cv2.circle(image, centre, int(drawing * 0.3), 40, stroke, cv2.LINE_AA)
+    t = np.linspace(0, 2 * np.pi, 3000, endpoint=False)
+    r = drawing * (0.18 + 0.02 * np.sin(48 * t))
+    outline = np.column_stack((centre[0] + r * np.cos(t), centre[1] + r * np.sin(t)))
+    cv2.polylines(image, [outline.astype(np.int32)], True, 40, stroke, cv2.LINE_AA)
+    return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+
+
+def fastest(fn, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+@pytest.mark.parametrize("binarization", ["fixed", "otsu"])
+def test_pyramid_matches_full_resolution(binarization):
+    image = page(3000, 1000)
+    full, _ = JewelryCADPipeline(verbose=False, binarization=binarization).preprocess(image)
+    pipeline = JewelryCADPipeline(verbose=False, binarization=binarization, pyramid_factor=4)
+    pyramid, _ = pipeline.preprocess(image)
+    assert 0 < np.count_nonzero(full == 0) < full.size
+    # Otsu's threshold comes from a reduced copy, so a few edge pixels may differ
+    assert np.count_nonzero(np.asarray(pyramid) != full) <= 1e-4 * full.size
+    assert pipeline.pyramid_stats["refined_fraction"] < 0.2
+
+
+def test_pyramid_is_faster_on_mostly_paper_pages():
+    image = page()
+    full_time, full = fastest(lambda: JewelryCADPipeline(verbose=False).preprocess_image(image))
+    pipeline = JewelryCADPipeline(verbose=False, pyramid_factor=4)
+    pyramid_time, pyramid = fastest(lambda: pipeline.preprocess_image_pyramid(image))
+    assert np.array_equal(np.asarray(pyramid), full)
+    assert pipeline.pyramid_stats["refined_fraction"] < 0.1
+    assert pyramid_time < full_time
+
+
+@pytest.mark.parametrize("choice", [None, {"strategy": "adaptive", "threshold": None}])
+@pytest.mark.parametrize("tile_size", [128, 300])
+def test_tiled_mask_is_bit_identical(tile_size, choice):
+    pipeline = JewelryCADPipeline(verbose=False, tile_size=tile_size, tile_workers=2)
+    image = scan()
+    full = pipeline.preprocess_image(image, choice=choice)
+    assert 0 < np.count_nonzero(full) < full.size
+    tiled = pipeline.preprocess_image_tiled(image, choice=choice)
+    assert tiled.dtype == full.dtype and tiled.shape == full.shape
+    assert np.array_equal(np.asarray(tiled), full)
+
+
+def test_memory_mapped_output_matches(tmp_path):
+    pipeline = JewelryCADPipeline(verbose=False, tile_size=200)
+    image = scan(seed=1)
+    out_path = str(tmp_path / "mask.dat")
+    tiled = pipeline.preprocess_image_tiled(image, out_path=out_path)
+    assert isinstance(tiled, np.memmap)
+    assert np.array_equal(np.asarray(tiled), pipeline.preprocess_image(image))
+
+
+def test_preprocess_switches_to_tiles_above_tile_size():
+    image = scan(seed=2)
+    full, _ = JewelryCADPipeline(verbose=False).preprocess(image)
+    tiled, _ = JewelryCADPipeline(verbose=False, tile_size=256).preprocess(image)
+    assert np.array_equal(np.asarray(tiled), full)
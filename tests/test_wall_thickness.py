@@ -0,0 +1,82 @@
+# tests/test_wall_thickness.py
+import os
+
+import cv2
+import numpy as np
+import pytest
+from shapely import affinity
+from shapely.geometry import Point, box
+
+from main import JewelryCADPipeline
+from wall_thickness import WallThicknessAnalyzer
+
+
+def ring(width, centre=(3.3, 2.7), radius=5.0):
+    return Point(*centre).buffer(radius, 256).difference(Point(*centre).buffer(radius - width, 256))
+
+
+def wheel(spoke_width, angle):
+    """A hub and a 2 mm rim joined by one spoke"""
+    hub = Point(0, 0).buffer(3, 64)
+    spoke = affinity.rotate(box(2.5, -spoke_width / 2, 8.5, spoke_width / 2), angle, origin=(0, 0))
+    rim = Point(0, 0).buffer(10, 128).difference(Point(0, 0).buffer(8, 128))
+    return hub.union(spoke).union(rim)
+
+
+@pytest.mark.parametrize("width", [0.3, 0.5, 0.78])
+def test_thin_ring_width(width):
+    report = WallThicknessAnalyzer(min_wall_mm=0.8).analyze([ring(width)])
+    assert len(report["thin_regions"]) == 1
+    assert report["thin_regions"][0]["width_mm"] == pytest.approx(width, abs=0.01)
+    assert report["min_wall_found_mm"] == pytest.approx(width, abs=0.01)
+
+
+def test_ring_above_minimum_is_not_flagged():
+    report = WallThicknessAnalyzer(min_wall_mm=0.8).analyze([ring(0.85)])
+    assert report["thin_regions"] == []
+    assert report["issues"] == []
+
+
+@pytest.mark.parametrize("angle", [0, 17, 45])
+@pytest.mark.parametrize("width", [0.42, 0.75])
+def test_thin_spoke_width(width, angle):
+    report = WallThicknessAnalyzer(min_wall_mm=0.8).analyze([wheel(width, angle)])
+    assert len(report["thin_regions"]) == 1
+    assert report["thin_regions"][0]["width_mm"] == pytest.approx(width, abs=0.01)
+
+
+@pytest.mark.parametrize("angle", [0, 45])
+def test_spoke_above_minimum_is_not_flagged(angle):
+    report = WallThicknessAnalyzer(min_wall_mm=0.8).analyze([wheel(0.85, angle)])
+    assert report["thin_regions"] == []
+
+
+def test_pixel_units_and_thickness_in_mm():
+    # A 0.5 mm ring traced at 0.03 mm per pixel, extruded 2 mm deep
+    pixels = ring(0.5 / 0.03, centre=(100, 100), radius=150)
+    report = WallThicknessAnalyzer(min_wall_mm=0.8).analyze([pixels], unit_scale=0.03, thickness=2.0)
+    assert report["thin_regions"][0]["width_mm"] == pytest.approx(0.5, abs=0.01)
+    assert not any("Extrusion thickness" in issue for issue in report["issues"])
+    report = WallThicknessAnalyzer(min_wall_mm=0.8).analyze([pixels], unit_scale=0.03, thickness=0.5)
+    assert any("Extrusion thickness" in issue for issue in report["issues"])
+
+
+def test_pipeline_labels_scale_and_drops_written_heatmap(tmp_path):
+    # A 10 px wide ring (the fixed threshold traces the bright parts)
+    image = np.zeros((300, 300, 3), dtype=np.uint8)
+    cv2.circle(image, (150, 150), 110, (255, 255, 255), -1)
+    cv2.circle(image, (150, 150), 100, (0, 0, 0), -1)
+    path = str(tmp_path / "ring.png")
+    cv2.imwrite(path, image)
+
+    walls = JewelryCADPipeline(verbose=False, min_wall_mm=0.8).process_image(
+        path, str(tmp_path / "a.stl"))["validation"]["wall_thickness"]
+    assert not walls["calibrated"] and walls["heatmap"] is not None
+
+    pipeline = JewelryCADPipeline(verbose=False, min_wall_mm=0.8, pixel_size_mm=0.05,
+                                  diagnostics_dir=str(tmp_path / "diag"))
+    walls = pipeline.process_image(path, str(tmp_path / "b.stl"))["validation"]["wall_thickness"]
+    pipeline.wait_diagnostics()
+    assert walls["calibrated"] and "heatmap" not in walls
+    assert os.path.exists(walls["heatmap_path"])
+    assert walls["min_wall_found_mm"] == pytest.approx(10 * 0.05, abs=0.06)
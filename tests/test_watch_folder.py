@@ -0,0 +1,82 @@
+# tests/test_watch_folder.py
+import json
+import os
+
+import cv2
+import numpy as np
+
+from main import JewelryCADPipeline
+from watch_folder import IncrementalProcessor, file_digest
+
+
+def drawing(path, radius=50):
+    image = np.full((200, 200, 3), 255, dtype=np.uint8)
+    cv2.circle(image, (100, 100), radius, (0, 0, 0), -1)
+    cv2.imwrite(str(path), image)
+    return str(path)
+
+
+def processor(tmp_path, **options):
+    return IncrementalProcessor(JewelryCADPipeline(verbose=False), output_dir=str(tmp_path / "out"),
+                                workers=1, verbose=False, **options)
+
+
+def run(tmp_path, **options):
+    with processor(tmp_path, **options) as p:
+        entries, skipped = p.run_once([str(tmp_path / "in")])
+    return sorted(os.path.basename(e["input"]) for e in entries), skipped
+
+
+def test_only_new_or_changed_files_are_converted(tmp_path):
+    (tmp_path / "in").mkdir()
+    a = drawing(tmp_path / "in" / "a.png")
+    drawing(tmp_path / "in" / "b.png", 40)
+    assert run(tmp_path) == (["a.png", "b.png"], 0)
+    assert run(tmp_path) == ([], 2)
+
+    # Touched but unchanged: re-hashed, not reconverted
+    os.utime(a, ns=(0, os.stat(a).st_mtime_ns + 10 ** 9))
+    assert run(tmp_path) == ([], 2)
+    # Edited, and a new file
+    drawing(a, 30)
+    drawing(tmp_path / "in" / "c.png", 20)
+    assert run(tmp_path) == (["a.png", "c.png"], 1)
+
+
+def test_settings_and_missing_outputs_trigger_reconversion(tmp_path):
+    (tmp_path / "in").mkdir()
+    drawing(tmp_path / "in" / "a.png")
+    drawing(tmp_path / "in" / "b.png", 40)
+    run(tmp_path)
+    assert run(tmp_path, thickness=3.0) == (["a.png", "b.png"], 0)
+    os.remove(tmp_path / "out" / "b.stl")
+    assert run(tmp_path, thickness=3.0) == (["b.png"], 1)
+    assert run(tmp_path, thickness=3.0, output_format=".3mf") == (["a.png", "b.png"], 0)
+
+
+def test_manifest_records_hashes_and_forgets_deleted_inputs(tmp_path):
+    (tmp_path / "in").mkdir()
+    a = drawing(tmp_path / "in" / "a.png")
+    b = drawing(tmp_path / "in" / "b.png", 40)
+    run(tmp_path)
+    with open(tmp_path / "out" / "incremental.json") as f:
+        manifest = json.load(f)
+    entry = manifest["files"][os.path.abspath(a)]
+    assert entry["hash"] == file_digest(a) and entry["status"] == "ok"
+    assert entry["output"] == str(tmp_path / "out" / "a.stl")
+
+    os.remove(b)
+    run(tmp_path)
+    with open(tmp_path / "out" / "incremental.json") as f:
+        assert list(json.load(f)["files"]) == [os.path.abspath(a)]
+
+
+def test_watch_picks_up_files_once_settled(tmp_path):
+    (tmp_path / "in").mkdir()
+    drawing(tmp_path / "in" / "a.png")
+    with processor(tmp_path) as p:
+        # Modified just now: held back by the debounce
+        p.watch([str(tmp_path / "in")], interval=0.05, debounce=60, max_polls=2)
+        assert not os.path.exists(tmp_path / "out" / "a.stl")
+        p.watch([str(tmp_path / "in")], interval=0.05, debounce=0, max_polls=2)
+    assert os.path.exists(tmp_path / "out" / "a.stl")
@@ -0,0 +1,160 @@
+# tiled_preprocessing.py
+import os
+import tempfile
+import cv2
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TiledPreprocessor:
+    """
+    Run a local preprocessing function over overlapping tiles.
+
+    Every tile is padded with a halo wide enough to cover the reach of the
+    blur and both morphology passes, so the tile centres come out exactly as
+    they would on the full frame. Results are written straight into a
+    memory-mapped mask, which keeps peak memory proportional to the tile size
+    rather than the scan size.
+    """
+
+    def __init__(self, preprocess_fn, halo, tile_size=1024, workers=None):
+        self.preprocess_fn = preprocess_fn
+        self.halo = halo
+        self.tile_size = tile_size
+        self.workers = workers or os.cpu_count() or 1
+
+    @staticmethod
+    def halo_for(blur_kernel, morph_kernel):
+        """
+        Pixels of context a tile needs: the blur radius plus the radius of
+        the dilate and erode inside both the close and the open.
+        """
+        return blur_kernel // 2 + 4 * (morph_kernel // 2)
+
+    def tiles(self, height, width):
+        for y in range(0, height, self.tile_size):
+            for x in range(0, width, self.tile_size):
+                yield y, x, min(y + self.tile_size, height), min(x + self.tile_size, width)
+
+    def process(self, image, out_path=None):
+        """Preprocess every tile into one mask"""
+        height, width = image.shape[:2]
+        mask = self._open_output((height, width), out_path)
+        self.refine(image, mask, [[tile] for tile in self.tiles(height, width)])
+        if isinstance(mask, np.memmap):
+            mask.flush()
+        return mask
+
+    def refine(self, image, mask, groups):
+        """
+        Recompute the (y0, x0, y1, x1) windows of mask from image, each with
+        its halo. Windows come in groups: a group is one thread-pool task,
+        so many small windows don't each pay for a task.
+        """
+        height, width = image.shape[:2]
+
+        def run_group(windows):
+            for y0, x0, y1, x1 in windows:
+                # Padded read window, clipped to the image so borders match the full frame
+                py0, px0 = max(y0 - self.halo, 0), max(x0 - self.halo, 0)
+                py1, px1 = min(y1 + self.halo, height), min(x1 + self.halo, width)
+                result = self.preprocess_fn(image[py0:py1, px0:px1])
+                mask[y0:y1, x0:x1] = result[y0 - py0:y1 - py0, x0 - px0:x1 - px0]
+
+        # Windows write disjoint regions, so they can run concurrently
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for _ in executor.map(run_group, groups):
+                pass
+
+    def _open_output(self, shape, out_path):
+        if out_path is not None:
+            return np.lib.format.open_memmap(out_path, mode="w+", dtype=np.uint8, shape=shape)
+        # Anonymous backing file: removed by the OS once the mapping is released
+        backing = tempfile.TemporaryFile()
+        return np.memmap(backing, dtype=np.uint8, mode="w+", shape=shape)
+
+
+class PyramidPreprocessor:
+    """
+    Coarse-to-fine preprocessing for large scans that are mostly paper.
+
+    The image is downsampled by `factor` and binarized with kernels scaled
+    to match. A band of `band` coarse pixels around every coarse boundary
+    marks where the drawing's edges can be. Only that band is preprocessed
+    at full resolution, on a grid of `cell` (rows, columns) pixel cells: each
+    run of band cells along a row of the grid is one window, padded with the
+    usual halo so it is exact. Everywhere else takes the upsampled coarse
+    mask, which is uniformly paper or uniformly material there. Features
+    smaller than about one coarse pixel can be missed. The refinement pays
+    off on pages that are mostly paper; a drawing that fills the frame puts
+    a third of it in the band and is no faster than full-frame.
+    """
+
+    def __init__(self, preprocess_fn, coarse_fn, halo, factor=4, band=2,
+                 cell=(128, 64), workers=None):
+        self.preprocess_fn = preprocess_fn
+        self.coarse_fn = coarse_fn
+        self.halo = halo
+        self.factor = factor
+        self.band = band
+        self.cell = cell
+        self.workers = workers
+        self.stats = {}
+
+    def process(self, image, out_path=None):
+        height, width = image.shape[:2]
+        small_height = max(1, -(-height // self.factor))
+        small_width = max(1, -(-width // self.factor))
+        small = self.downsample(image, small_width, small_height)
+        coarse = self.coarse_fn(small)
+
+        # Coarse boundary pixels, widened to the refinement band plus one
+        # pixel for coarse pixels that straddle two cells
+        edges = cv2.morphologyEx(coarse, cv2.MORPH_GRADIENT, np.ones((3, 3), np.uint8))
+        reach = 2 * self.band + 3
+        band = cv2.dilate(edges, np.ones((reach, reach), np.uint8))
+
+        # Cells of the full-size grid that the band touches
+        cell_height, cell_width = self.cell
+        ys = np.arange(0, height, cell_height)
+        xs = np.arange(0, width, cell_width)
+        cells = np.maximum.reduceat(band, ys * small_height // height, axis=0)
+        cells = np.maximum.reduceat(cells, xs * small_width // width, axis=1) > 0
+
+        # One window per run of band cells along a row, one task per row
+        groups = []
+        for row, y0 in zip(cells, ys):
+            change = np.flatnonzero(np.diff(np.concatenate(([0], row.view(np.int8), [0]))))
+            if len(change):
+                y1 = min(y0 + cell_height, height)
+                groups.append([(int(y0), int(xs[a]), int(y1), min(int(b) * cell_width, width))
+                               for a, b in zip(change[::2], change[1::2])])
+
+        base = cv2.resize(coarse, (width, height), interpolation=cv2.INTER_NEAREST)
+        if out_path is not None:
+            mask = np.lib.format.open_memmap(out_path, mode="w+", dtype=np.uint8, shape=base.shape)
+            mask[:] = base
+        else:
+            mask = base
+        tiler = TiledPreprocessor(self.preprocess_fn, self.halo, workers=self.workers)
+        tiler.refine(image, mask, groups)
+        if isinstance(mask, np.memmap):
+            mask.flush()
+
+        refined = sum((y1 - y0) * (x1 - x0) for group in groups for y0, x0, y1, x1 in group)
+        self.stats = {
+            "windows": sum(len(group) for group in groups),
+            "refined_fraction": refined / (height * width),
+        }
+        return mask
+
+    def downsample(self, image, width, height):
+        """
+        Shrink by `factor`. Large factors first pick every (factor / 2)-th
+        pixel and then area-average the last 2x, so only a fraction of the
+        scan is read while strokes wider than factor / 2 survive. Strokes
+        that thin are closed away by the morphology at full resolution anyway.
+        """
+        if self.factor >= 4:
+            image = cv2.resize(image, (2 * width, 2 * height), interpolation=cv2.INTER_NEAREST)
+        return cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
@@ -45,20 +45,14 @@ class ImageLoader:
     
     def load_svg_image(self, svg_path, output_size=(1024, 1024)):
         """
-        Convert SVG to PNG using Inkscape (if available) or fallback
+        Render an SVG's filled paths as a black-on-white drawing.
+        The pipeline itself reads SVG paths directly (svg_import.py);
+        this is for callers that need a raster preview.
         """
-        try:
-            # Create a simple SVG to raster conversion using PIL as fallback
-            # For now, we'll create a simple placeholder
-            # In production, you'd use proper SVG rendering
-            width, height = output_size
-            image = np.ones((height, width, 3), dtype=np.uint8) * 255  # White background
-            
-            # Draw a simple placeholder
-            cv2.putText(image, "SVG Placeholder", (width//4, height//2), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
-            
-            return image
-            
-        except Exception as e:
-            raise ValueError(f"Could not process SVG: {str(e)}")
+        from svg_import import load_svg_curves, rasterize_curves
+        curves = load_svg_curves(svg_path)
+        if len(curves):
+            # Re-flatten to a quarter of an output pixel
+            extent = float((curves.coords.max(axis=0) - curves.coords.min(axis=0)).max())
+            curves = load_svg_curves(svg_path, tolerance=max(extent, 1e-9) / max(output_size) / 4)
+        return rasterize_curves(curves, output_size)
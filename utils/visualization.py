@@ -1,136 +1,302 @@
 # utils/visualization.py
-import matplotlib.pyplot as plt
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import cv2
 import numpy as np
-import open3d as o3d
+from curve_set import CurveSet
+
+# Panel layout of the diagnostic images
+TITLE_HEIGHT = 28
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+CONTOUR_COLOR = (0, 200, 0)
+CURVE_COLOR = (0, 0, 255)
+POINT_COLOR = (200, 110, 30)
+TEXT_COLOR = (40, 40, 40)
+
+# Sub-pixel precision for cv2.polylines (coordinates in 1/16 px)
+SHIFT = 4
+
+
+def decimate(points, max_points):
+    """Evenly strided subset of at most max_points points, for display only"""
+    points = np.asarray(points)
+    if max_points and len(points) > max_points:
+        step = int(np.ceil(len(points) / max_points))
+        points = points[::step]
+    return points
+
+
+def new_canvas(rows, cols, panel_size):
+    """Preallocated white canvas for rows x cols titled panels"""
+    return np.full((rows * (TITLE_HEIGHT + panel_size), cols * panel_size, 3), 255, np.uint8)
+
+
+def panel_view(canvas, row, col, panel_size, title=None):
+    """Write a panel title and return a view of the panel's drawing area"""
+    top = row * (TITLE_HEIGHT + panel_size)
+    left = col * panel_size
+    if title:
+        cv2.putText(canvas, title, (left + 8, top + TITLE_HEIGHT - 9), FONT, 0.6,
+                    TEXT_COLOR, 1, cv2.LINE_AA)
+    top += TITLE_HEIGHT
+    return canvas[top:top + panel_size, left:left + panel_size]
+
+
+def draw_image(panel, image):
+    """
+    Shrink an image into a panel, keeping its aspect ratio. Returns the
+    scale and offset that map image pixels to panel pixels.
+    """
+    h, w = image.shape[:2]
+    size = panel.shape[0]
+    scale = min(size / w, size / h)
+    tw, th = max(1, int(round(w * scale))), max(1, int(round(h * scale)))
+    x0, y0 = (size - tw) // 2, (size - th) // 2
+    small = cv2.resize(image, (tw, th), interpolation=cv2.INTER_AREA)
+    if small.ndim == 2:
+        small = cv2.cvtColor(small, cv2.COLOR_GRAY2BGR)
+    panel[y0:y0 + th, x0:x0 + tw] = small
+    return scale, np.array([x0, y0], dtype=np.float64)
+
+
+def fixed_point(points, scale, offset):
+    """Map image coordinates to panel coordinates in cv2.polylines fixed point"""
+    return np.round((np.asarray(points, dtype=np.float64) * scale + offset) * (1 << SHIFT)).astype(np.int32)
+
+
+def draw_polylines(panel, polylines, closed, color, scale, offset, thickness=1):
+    """Draw a list of point arrays scaled into the panel in one polylines call"""
+    if not polylines:
+        return
+    lengths = [len(p) for p in polylines]
+    coords = fixed_point(np.concatenate([np.reshape(p, (-1, 2)) for p in polylines]), scale, offset)
+    cv2.polylines(panel, np.split(coords, np.cumsum(lengths)[:-1]), closed, color,
+                  thickness, cv2.LINE_AA, SHIFT)
+
+
+def draw_curves(panel, curves, color, scale, offset, thickness=1):
+    """Draw a CurveSet, transforming its flat coordinate buffer once"""
+    if len(curves) == 0:
+        return
+    coords = fixed_point(curves.coords, scale, offset)
+    polylines = np.split(coords, curves.offsets[1:-1])
+    for closed in (True, False):
+        group = [p for p, c in zip(polylines, curves.is_closed) if c == closed]
+        if group:
+            cv2.polylines(panel, group, closed, color, thickness, cv2.LINE_AA, SHIFT)
+
+
+def draw_points(panel, points, color=POINT_COLOR, flip_y=True, margin=12, radius=1):
+    """Plot 2D points into a panel with equal axes by writing pixels directly"""
+    points = np.asarray(points, dtype=np.float64)
+    if len(points) == 0:
+        return
+    size = panel.shape[0] - 2 * margin
+    low = points.min(axis=0)
+    extent = points.max(axis=0) - low
+    scale = size / max(float(extent.max()), 1e-12)
+    pixels = (points - low) * scale + (size - extent * scale) / 2 + margin
+    px = pixels[:, 0].astype(np.int64)
+    py = pixels[:, 1].astype(np.int64)
+    if flip_y:
+        py = panel.shape[0] - 1 - py
+    # Square dots of (2 * radius + 1) px, one fancy-indexed write per offset
+    for dy in range(-radius, radius + 1):
+        for dx in range(-radius, radius + 1):
+            panel[np.clip(py + dy, 0, panel.shape[0] - 1),
+                  np.clip(px + dx, 0, panel.shape[1] - 1)] = color
+
+
+def draw_text(panel, lines, scale=0.55):
+    for i, line in enumerate(lines):
+        cv2.putText(panel, line, (12, 28 + i * 26), FONT, scale, TEXT_COLOR, 1, cv2.LINE_AA)
+
+
+def render_processing_steps(results, panel_size=480, max_points=20000):
+    """
+    Composite the six diagnostic panels (input, mask, contours, refined
+    contours, vector curves, mesh outline) into one BGR canvas. Overlays are
+    drawn on the shrunk panels rather than on copies of the full image, and
+    the mesh outline plots at most max_points vertices.
+    """
+    canvas = new_canvas(2, 3, panel_size)
+    image = results["image"]
+    curves = CurveSet.from_curves(results["vector_curves"])
+
+    if image is not None:
+        draw_image(panel_view(canvas, 0, 0, panel_size, "Original Image"), image)
+        draw_image(panel_view(canvas, 0, 1, panel_size, "Processed Image"), results["processed"])
+
+        panel = panel_view(canvas, 0, 2, panel_size, "Detected Contours")
+        scale, offset = draw_image(panel, image)
+        draw_polylines(panel, list(results["contours"]), True, CONTOUR_COLOR, scale, offset)
+
+        panel = panel_view(canvas, 1, 0, panel_size, "Refined Contours")
+        scale, offset = draw_image(panel, image)
+        draw_polylines(panel, list(results["refined_contours"]), True, CONTOUR_COLOR, scale, offset)
+
+        # Vector curves on white, at the same scale as the image panels
+        h, w = image.shape[:2]
+        low = np.zeros(2)
+    else:
+        # Vector input skips the raster stages; fit the curves instead
+        draw_text(panel_view(canvas, 0, 0, panel_size, "Original Image"), ["Vector input"])
+        low = curves.coords.min(axis=0) if len(curves) else np.zeros(2)
+        w, h = np.maximum(curves.coords.max(axis=0) - low, 1e-12) if len(curves) else (1.0, 1.0)
+    panel = panel_view(canvas, 1, 1, panel_size, "Vector Curves")
+    scale = min(panel_size / w, panel_size / h)
+    offset = (panel_size - np.array([w, h]) * scale) // 2 - low * scale
+    draw_curves(panel, curves, CURVE_COLOR, scale, offset)
+
+    panel = panel_view(canvas, 1, 2, panel_size, "3D Mesh Outline")
+    mesh = results.get("mesh")
+    if mesh is not None and len(mesh.vertices):
+        draw_points(panel, decimate(mesh.vertices, max_points)[:, :2])
+    else:
+        draw_text(panel, ["3D Preview", "Not Available"])
+    return canvas
+
+
+def render_validation_report(mesh, panel_size=480, max_points=20000):
+    """Top, front and side projections of the mesh plus its statistics"""
+    canvas = new_canvas(2, 2, panel_size)
+    if mesh is None:
+        draw_text(panel_view(canvas, 0, 0, panel_size, "Mesh"), ["No mesh"])
+        return canvas
+
+    vertices = np.asarray(mesh.vertices)
+    shown = decimate(vertices, max_points)
+    for (row, col), title, axes in (((0, 0), "Top View (XY)", [0, 1]),
+                                    ((0, 1), "Front View (XZ)", [0, 2]),
+                                    ((1, 0), "Side View (YZ)", [1, 2])):
+        draw_points(panel_view(canvas, row, col, panel_size, title), shown[:, axes])
+
+    bounds = np.asarray(mesh.bounds)
+    draw_text(panel_view(canvas, 1, 1, panel_size, "Mesh Statistics"), [
+        f"Vertices: {len(vertices)}",
+        f"Faces: {len(mesh.faces)}",
+        f"Volume: {mesh.volume:.2f}",
+        "Bounds min: " + " ".join(f"{v:.2f}" for v in bounds[0]),
+        "Bounds max: " + " ".join(f"{v:.2f}" for v in bounds[1]),
+        f"Watertight: {mesh.is_watertight}",
+    ])
+    return canvas
+
+
+def _write_image(path, canvas):
+    out_dir = os.path.dirname(path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    if not cv2.imwrite(path, canvas):
+        raise ValueError(f"Could not write diagnostics image {path}")
+    return path
+
+
+class DiagnosticsRenderer:
+    """
+    Render diagnostic images on a background thread so they stay off the
+    conversion's critical path. OpenCV drawing and PNG encoding release the
+    GIL. wait() returns the written paths and re-raises the first error.
+    """
+
+    def __init__(self, workers=1, panel_size=480, max_points=20000):
+        self.workers = workers
+        self.panel_size = panel_size
+        self.max_points = max_points
+        self._executor = None
+        self.pending = []
+
+    def __getstate__(self):
+        # Thread pools can't be pickled; batch workers start their own
+        state = self.__dict__.copy()
+        state["_executor"] = None
+        state["pending"] = []
+        return state
+
+    def _render_steps(self, results, path):
+        return _write_image(path, render_processing_steps(results, self.panel_size, self.max_points))
+
+    def _render_report(self, mesh, path):
+        return _write_image(path, render_validation_report(mesh, self.panel_size, self.max_points))
+
+    def _submit(self, fn, *args):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        future = self._executor.submit(fn, *args)
+        self.pending.append(future)
+        return future
+
+    def submit(self, results, path):
+        """Queue the processing-steps image for a process_image result"""
+        keys = ("image", "processed", "contours", "refined_contours", "vector_curves", "mesh")
+        return self._submit(self._render_steps, {k: results.get(k) for k in keys}, path)
+
+    def submit_image(self, image, path):
+        """Queue an already rendered image (e.g. a wall-thickness heatmap)"""
+        return self._submit(_write_image, path, image)
+
+    def submit_report(self, mesh, path):
+        """Queue the validation report image for a mesh"""
+        return self._submit(self._render_report, mesh, path)
+
+    def wait(self):
+        pending, self.pending = self.pending, []
+        return [future.result() for future in pending]
+
+    def close(self):
+        try:
+            self.wait()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
 
 class Visualization:
-    def __init__(self):
-        pass
-    
+    def __init__(self, panel_size=480, max_points=20000):
+        self.panel_size = panel_size
+        self.max_points = max_points
+
     def draw_processing_steps(self, results, output_path):
         """
         Create a visualization of the processing pipeline steps
         """
-        plt.figure(figsize=(15, 10))
-        
-        # Original image
-        plt.subplot(2, 3, 1)
-        plt.imshow(cv2.cvtColor(results["image"], cv2.COLOR_BGR2RGB))
-        plt.title("Original Image")
-        plt.axis('off')
-        
-        # Processed image
-        plt.subplot(2, 3, 2)
-        plt.imshow(results["processed"], cmap='gray')
-        plt.title("Processed Image")
-        plt.axis('off')
-        
-        # Detected contours
-        plt.subplot(2, 3, 3)
-        contour_img = results["image"].copy()
-        cv2.drawContours(contour_img, results["contours"], -1, (0, 255, 0), 2)
-        plt.imshow(cv2.cvtColor(contour_img, cv2.COLOR_BGR2RGB))
-        plt.title("Detected Contours")
-        plt.axis('off')
-        
-        # Refined contours
-        plt.subplot(2, 3, 4)
-        refined_img = results["image"].copy()
-        for contour in results["refined_contours"]:
-            cv2.drawContours(refined_img, [contour], -1, (0, 255, 0), 2)
-        plt.imshow(cv2.cvtColor(refined_img, cv2.COLOR_BGR2RGB))
-        plt.title("Refined Contours")
-        plt.axis('off')
-        
-        # Vector curves (simplified visualization)
-        plt.subplot(2, 3, 5)
-        vector_img = np.ones_like(results["image"]) * 255
-        for curve in results["vector_curves"]:
-            points = np.array(curve["points"], dtype=np.int32)
-            cv2.polylines(vector_img, [points], curve["is_closed"], (0, 0, 255), 2)
-        plt.imshow(cv2.cvtColor(vector_img, cv2.COLOR_BGR2RGB))
-        plt.title("Vector Curves")
-        plt.axis('off')
-        
-        # 3D mesh preview
-        plt.subplot(2, 3, 6)
-        try:
-            # Create a simple 2D projection of the 3D mesh
-            mesh = results["mesh"]
-            if mesh is not None:
-                # Get the 2D outline of the mesh (top-down view)
-                vertices_2d = mesh.vertices[:, :2]  # Ignore Z coordinate
-                plt.scatter(vertices_2d[:, 0], vertices_2d[:, 1], s=1, alpha=0.5)
-                plt.title("3D Mesh Outline")
-        except:
-            plt.text(0.5, 0.5, "3D Preview\nNot Available", 
-                    ha='center', va='center', transform=plt.gca().transAxes)
-        plt.axis('off')
-        
-        plt.tight_layout()
-        plt.savefig(output_path, dpi=150, bbox_inches='tight')
-        plt.close()
-    
+        canvas = render_processing_steps(results, self.panel_size, self.max_points)
+        return _write_image(output_path, canvas)
+
     def visualize_3d_mesh(self, mesh):
         """
         Interactive 3D visualization using Open3D
         """
+        # Open3D is optional and heavy; only load it for interactive viewing
+        import open3d as o3d
         if mesh is None:
             print("No mesh to visualize")
             return
-        
+
         # Convert trimesh to open3d
         vertices = np.array(mesh.vertices)
         faces = np.array(mesh.faces)
-        
+
         o3d_mesh = o3d.geometry.TriangleMesh()
         o3d_mesh.vertices = o3d.utility.Vector3dVector(vertices)
         o3d_mesh.triangles = o3d.utility.Vector3iVector(faces)
         o3d_mesh.compute_vertex_normals()
-        
+
         # Create visualization
         o3d.visualization.draw_geometries([o3d_mesh])
-    
+
     def create_validation_report(self, mesh, output_path):
         """
         Create a visualization of mesh validation results
         """
-        fig, axes = plt.subplots(2, 2, figsize=(10, 10))
-        
-        # Mesh overview
-        if mesh is not None:
-            # Get the 2D projection from different angles
-            vertices = mesh.vertices
-            
-            # Top view (XY plane)
-            axes[0, 0].scatter(vertices[:, 0], vertices[:, 1], s=1, alpha=0.5)
-            axes[0, 0].set_title("Top View (XY)")
-            axes[0, 0].set_aspect('equal')
-            
-            # Front view (XZ plane)
-            axes[0, 1].scatter(vertices[:, 0], vertices[:, 2], s=1, alpha=0.5)
-            axes[0, 1].set_title("Front View (XZ)")
-            axes[0, 1].set_aspect('equal')
-            
-            # Side view (YZ plane)
-            axes[1, 0].scatter(vertices[:, 1], vertices[:, 2], s=1, alpha=0.5)
-            axes[1, 0].set_title("Side View (YZ)")
-            axes[1, 0].set_aspect('equal')
-            
-            # Statistics
-            stats_text = f"""
-            Mesh Statistics:
-            - Vertices: {len(vertices)}
-            - Faces: {len(mesh.faces)}
-            - Volume: {mesh.volume:.2f}
-            - Bounds: {mesh.bounds}
-            - Watertight: {mesh.is_watertight}
-            """
-            axes[1, 1].text(0.1, 0.9, stats_text, fontsize=10, va='top')
-            axes[1, 1].set_title("Mesh Statistics")
-            axes[1, 1].set_axis_off()
-        
-        plt.tight_layout()
-        plt.savefig(output_path, dpi=150, bbox_inches='tight')
-        plt.close()
+        canvas = render_validation_report(mesh, self.panel_size, self.max_points)
+        return _write_image(output_path, canvas)
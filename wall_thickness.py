@@ -0,0 +1,242 @@
+# wall_thickness.py
+import time
+import cv2
+import numpy as np
+
+# Fixed-point bits for cv2.fillPoly, so vertices keep sub-cell precision
+SHIFT = 4
+
+
+def rasterize_polygons(polygons, cell, unit_scale=1.0, margin=2):
+    """
+    Fill shapely polygons (holes cleared) on a grid of cell-sized pixels,
+    in mm (polygon coordinates times unit_scale). Returns the mask and the
+    grid origin in mm.
+    """
+    bounds = np.array([p.bounds for p in polygons], dtype=np.float64) * unit_scale
+    low = bounds[:, :2].min(axis=0) - margin * cell
+    high = bounds[:, 2:].max(axis=0) + margin * cell
+    width, height = np.ceil((high - low) / cell).astype(int) + 1
+    mask = np.zeros((height, width), dtype=np.uint8)
+
+    def fixed(ring):
+        coords = np.asarray(ring.coords, dtype=np.float64)[:, :2] * unit_scale
+        return np.round((coords - low) / cell * (1 << SHIFT)).astype(np.int32)
+
+    # Largest first, so islands inside another polygon's holes are drawn last
+    for polygon in sorted(polygons, key=lambda p: p.area, reverse=True):
+        cv2.fillPoly(mask, [fixed(polygon.exterior)], 255, cv2.LINE_8, SHIFT)
+        if polygon.interiors:
+            cv2.fillPoly(mask, [fixed(ring) for ring in polygon.interiors], 0, cv2.LINE_8, SHIFT)
+    return mask, low
+
+
+def wall_width(max_dist, cell):
+    """
+    Width of a wall whose distance transform peaks at max_dist cells. The
+    distances run between pixel centres, so a wall of n cells peaks at
+    (n + 1) / 2 when n is odd and n / 2 when it is even; 2 * max_dist - 0.5
+    is within half a cell of n either way.
+    """
+    return float(max(2 * max_dist - 0.5, 1) * cell)
+
+
+def opening(dist, radius):
+    """
+    Pixels covered by a disk of the given radius (in cells) that fits in
+    the shape, i.e. the morphological opening, from two distance transforms.
+    dist is the shape's distance transform.
+    """
+    centres = 2 * dist - 0.5 >= 2 * radius
+    if not centres.any():
+        return np.zeros(dist.shape, dtype=bool)
+    reach = cv2.distanceTransform(np.where(centres, 0, 255).astype(np.uint8),
+                                  cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
+    # Half a cell of slack absorbs the jaggies of digitized edges
+    return reach <= radius + 0.5
+
+
+class OutlineChords:
+    """
+    Exact wall widths from the polygon outlines (in mm). The width at a
+    point inside a wall is the chord through it along the normal of the
+    nearest edge: from that nearest boundary point across to where the
+    normal leaves the shape. For walls with parallel sides this is exact
+    wherever the point is, so it doesn't inherit the raster's quantization.
+    """
+
+    def __init__(self, polygons, unit_scale=1.0):
+        import shapely
+        rings = [ring for p in polygons for ring in [p.exterior] + list(p.interiors)]
+        segments = [np.stack([c[:-1], c[1:]], axis=1) for c in
+                    (np.asarray(ring.coords, dtype=np.float64)[:, :2] * unit_scale for ring in rings)]
+        self.segments = np.concatenate(segments)
+        self.tree = shapely.STRtree(shapely.linestrings(self.segments))
+        self._shapely = shapely
+
+    def widths(self, points, max_width):
+        """Chord widths at (n, 2) points in mm; inf where wider than max_width"""
+        shapely = self._shapely
+        widths = np.full(len(points), np.inf)
+        if len(points) == 0:
+            return widths
+        index, nearest = self.tree.query_nearest(shapely.points(points))
+        first = np.r_[True, index[1:] != index[:-1]]
+        index, nearest = index[first], nearest[first]
+        start, edge = self.segments[nearest, 0], self.segments[nearest, 1] - self.segments[nearest, 0]
+        t = np.einsum("ij,ij->i", points[index] - start, edge) / np.maximum(
+            np.einsum("ij,ij->i", edge, edge), 1e-300)
+        foot = start + np.clip(t, 0.0, 1.0)[:, None] * edge
+        normal = points[index] - foot
+        length = np.linalg.norm(normal, axis=1)
+        ok = length > 0
+        index, foot, normal = index[ok], foot[ok], normal[ok] / length[ok, None]
+        
+        # First crossing of each ray foot + s * normal with another edge
+        ray, hit = self.tree.query(shapely.linestrings(
+            np.stack([foot, foot + normal * max_width], axis=1)), predicate="intersects")
+        offset = self.segments[hit, 0] - foot[ray]
+        edge = self.segments[hit, 1] - self.segments[hit, 0]
+        direction = normal[ray]
+        det = direction[:, 0] * edge[:, 1] - direction[:, 1] * edge[:, 0]
+        s = (offset[:, 0] * edge[:, 1] - offset[:, 1] * edge[:, 0]) / np.where(det == 0, 1.0, det)
+        # The edges through the foot itself cross at s = 0
+        s = np.where((det != 0) & (s > 1e-9 * max_width), s, np.inf)
+        chord = np.full(len(foot), np.inf)
+        np.minimum.at(chord, ray, s)
+        widths[index] = np.where(chord <= max_width, chord, np.inf)
+        return widths
+
+
+class WallThicknessAnalyzer:
+    """
+    Minimum wall width of an extruded design from its 2D polygons, which is
+    what the wall thickness of a prism comes down to. The polygons are
+    rasterized at a fraction of the minimum wall, and OpenCV distance
+    transforms give the thin regions (those an opening with a disk of the
+    minimum wall diameter removes) and a banded local-thickness heatmap.
+    The widths of thin regions, and so the narrowest wall, are measured on
+    the polygon outlines (OutlineChords).
+    """
+
+    # Heatmap bands as multiples of the minimum wall
+    LEVELS = (0.5, 1.0, 1.5, 2.0, 3.0, 4.0)
+
+    def __init__(self, min_wall_mm=0.8, cells_per_wall=10, max_cells=2048, heatmap_size=1024):
+        self.min_wall_mm = min_wall_mm
+        self.cells_per_wall = cells_per_wall
+        self.max_cells = max_cells
+        self.heatmap_size = heatmap_size
+
+    def thin_regions(self, mask, dist, diameter, cell, origin, unit_scale, chords):
+        """
+        Connected parts thinner than diameter (mm), bigger than a corner
+        sliver, largest first. Candidates are what an opening with a disk a
+        cell wider removes, so no thin wall is missed to the raster's
+        quantization; their medial ridge (local maxima of the distance
+        transform) is then measured exactly, and only the parts around
+        ridge points narrower than diameter are kept. A region's width is
+        the median over its ridge, so the thicker ends where it joins the
+        rest of the design don't count.
+        """
+        radius = diameter / 2 / cell
+        candidates = (mask > 0) & ~opening(dist, radius + 1)
+        ridge = candidates & (dist >= cv2.dilate(dist, np.ones((3, 3), np.uint8)))
+        ys, xs = np.nonzero(ridge)
+        widths = chords.widths(origin + np.column_stack((xs, ys)) * cell, 2 * diameter)
+        narrow = widths < diameter
+        if not narrow.any():
+            return []
+        
+        # The thin parts: candidate pixels within reach of a narrow ridge point
+        seeds = np.full(mask.shape, 255, dtype=np.uint8)
+        seeds[ys[narrow], xs[narrow]] = 0
+        reach = cv2.distanceTransform(seeds, cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
+        thin = candidates & (reach <= radius + 1)
+        count, labels, stats, centroids = cv2.connectedComponentsWithStats(
+            thin.astype(np.uint8), connectivity=8)
+        # A 60 degree corner leaves about 0.7 r^2 outside the opening,
+        # more once its edges are digitized at an angle
+        keep = np.flatnonzero(stats[1:, cv2.CC_STAT_AREA] >= 2 * radius ** 2) + 1
+        ridge_labels = labels[ys[narrow], xs[narrow]]
+        ridge_widths = widths[narrow]
+        regions = []
+        for label in keep:
+            x, y, w, h, area = stats[label]
+            # Locations in drawing coordinates (image pixels for scans), sizes in mm
+            x0, y0 = (origin + np.array([x, y]) * cell) / unit_scale
+            x1, y1 = (origin + np.array([x + w, y + h]) * cell) / unit_scale
+            regions.append({
+                "width_mm": float(np.median(ridge_widths[ridge_labels == label])),
+                "area_mm2": float(area * cell ** 2),
+                "bbox": [float(x0), float(y0), float(x1), float(y1)],
+                "centroid": ((origin + centroids[label] * cell) / unit_scale).tolist(),
+            })
+        regions.sort(key=lambda r: r["area_mm2"], reverse=True)
+        return regions
+    
+    def analyze(self, polygons, unit_scale=1.0, thickness=None):
+        """
+        Analyze polygons whose coordinates times unit_scale are mm. thickness
+        (the extrusion depth, in mm) is checked against the minimum wall
+        too. Returns a report with the thin regions, the narrowest wall,
+        issues and a BGR heatmap (thin red, thick blue).
+        """
+        start = time.perf_counter()
+        polygons = [p for p in polygons if not p.is_empty]
+        min_wall = self.min_wall_mm
+        report = {"min_wall_mm": min_wall, "thin_regions": [], "issues": [], "heatmap": None}
+        if thickness is not None and thickness < min_wall:
+            report["issues"].append(
+                f"Extrusion thickness {thickness:.3f} mm is below the "
+                f"minimum wall of {min_wall:.3f} mm")
+        if not polygons:
+            report["min_wall_found_mm"] = None
+            report["time"] = time.perf_counter() - start
+            return report
+        
+        bounds = np.array([p.bounds for p in polygons]) * unit_scale
+        extent = float(max(bounds[:, 2].max() - bounds[:, 0].min(), bounds[:, 3].max() - bounds[:, 1].min()))
+        cell = max(min_wall / self.cells_per_wall, extent / self.max_cells)
+        mask, origin = rasterize_polygons(polygons, cell, unit_scale)
+        dist = cv2.distanceTransform(mask, cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
+        chords = OutlineChords(polygons, unit_scale)
+        
+        # Local thickness in bands: a pixel gets the widest disk that covers it
+        bands = np.zeros(mask.shape, dtype=np.float32)
+        narrowest = None
+        for level in self.LEVELS:
+            diameter = level * min_wall
+            bands[opening(dist, diameter / 2 / cell)] = diameter
+            # The narrowest wall comes from the first band, from the minimum
+            # wall up, that has thin regions
+            if level >= 1.0 and narrowest is None:
+                regions = self.thin_regions(mask, dist, diameter, cell, origin, unit_scale, chords)
+                if level == 1.0:
+                    report["thin_regions"] = regions
+                if regions:
+                    narrowest = min(r["width_mm"] for r in regions)
+        
+        report["min_wall_found_mm"] = narrowest if narrowest is not None else wall_width(dist.max(), cell)
+        report["cell_mm"] = cell
+        report["resolution_limited"] = cell > min_wall / 4
+        report["thin_area_mm2"] = float(sum(r["area_mm2"] for r in report["thin_regions"]))
+        if report["thin_regions"]:
+            report["issues"].append(
+                f"{len(report['thin_regions'])} region(s) thinner than {min_wall:.3f} mm "
+                f"(narrowest {report['min_wall_found_mm']:.3f} mm)")
+        report["heatmap"] = self.heatmap(mask, bands)
+        report["time"] = time.perf_counter() - start
+        return report
+
+    def heatmap(self, mask, bands):
+        """Colour the local thickness bands, thin red to thick blue, on white"""
+        top = self.LEVELS[-1] * self.min_wall_mm
+        values = np.round(255 * bands / top).astype(np.uint8)
+        image = cv2.applyColorMap(255 - values, cv2.COLORMAP_JET)
+        image[mask == 0] = 255
+        scale = self.heatmap_size / max(mask.shape)
+        if scale < 1:
+            size = (max(1, int(mask.shape[1] * scale)), max(1, int(mask.shape[0] * scale)))
+            image = cv2.resize(image, size, interpolation=cv2.INTER_NEAREST)
+        return image
@@ -0,0 +1,291 @@
+# watch_folder.py
+import os
+import json
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from batch_processor import (_init_worker, _run_job, collect_images, input_root, output_names_for,
+                             output_paths_for)
+from stage_cache import StageCache
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 of a file's contents, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class IncrementalManifest:
+    """
+    JSON record of every converted input: its content hash, size and mtime,
+    the key of the settings it was converted with, and the output and result.
+    """
+    VERSION = 1
+
+    def __init__(self, path):
+        self.path = path
+        self.files = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            if data.get("version") == self.VERSION:
+                self.files = data.get("files", {})
+
+    def save(self):
+        out_dir = os.path.dirname(self.path)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        # Write and rename so an interrupted save never leaves half a manifest
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": self.VERSION, "files": self.files}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def prune(self):
+        """Forget inputs that no longer exist (their outputs are left alone)"""
+        missing = [path for path in self.files if not os.path.exists(path)]
+        for path in missing:
+            del self.files[path]
+        return missing
+
+
+class IncrementalProcessor:
+    """
+    Convert only new or changed drawings. An input is current when its
+    manifest entry has the same settings key and output path, its output
+    exists, and its size and mtime match (or, if those changed, its content
+    hash does). Everything else is dispatched to a pool of worker processes,
+    each with one long-lived pipeline as in BatchProcessor.
+    """
+
+    def __init__(self, pipeline, output_dir="test_results", manifest_path=None, workers=None,
+                 cv_threads=1, thickness=2.0, output_format=".stl", verbose=True):
+        self.pipeline = pipeline
+        self.output_dir = output_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.cv_threads = cv_threads
+        # A number, or a callable mapping an input path to its thickness
+        self.thickness = thickness
+        self.output_format = output_format
+        self.verbose = verbose
+        self.manifest = IncrementalManifest(
+            manifest_path or os.path.join(output_dir, "incremental.json"))
+        self.pipeline_params = pipeline.output_params()
+        self._executor = None
+        self._index = 0
+        # Outputs are laid out below the folder holding every input
+        self.output_root = None
+        self._conflicts = set()
+
+    def log(self, message):
+        if self.verbose:
+            print(message)
+
+    def thickness_for(self, path):
+        return float(self.thickness(path) if callable(self.thickness) else self.thickness)
+
+    def output_root_for(self, path):
+        return self.output_root or os.path.dirname(os.path.abspath(path))
+
+    def output_path(self, path):
+        return output_paths_for([path], self.output_dir, self.output_format, self.output_root_for(path))[0]
+
+    def scan(self, inputs):
+        """
+        Input paths, minus those whose output another input (the first in
+        sorted order, e.g. ring.jpg before ring.png) already writes
+        """
+        self.output_root = input_root(inputs)
+        owners = {}
+        paths = []
+        for path in collect_images(inputs):
+            path = os.path.abspath(path)
+            owner = owners.setdefault(self.output_path(path), path)
+            if owner == path:
+                paths.append(path)
+            elif path not in self._conflicts:
+                self._conflicts.add(path)
+                self.log(f"✗ {path}: skipped, {owner} is written to the same output")
+        return paths
+
+    def params_key(self, thickness):
+        return StageCache.make_key(None, "output", {
+            "pipeline": self.pipeline_params,
+            "thickness": thickness,
+            "format": self.output_format,
+        })
+
+    def job_for(self, path):
+        """Return a job for the input, or None if its output is current"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        thickness = self.thickness_for(path)
+        params = self.params_key(thickness)
+        output_path = self.output_path(path)
+        entry = self.manifest.files.get(path)
+
+        digest = None
+        if (entry is not None and entry["params"] == params and entry["output"] == output_path
+                and (entry["status"] != "ok" or os.path.exists(output_path))):
+            if (entry["size"], entry["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+                return None
+            # Touched but maybe not edited: only the hash decides
+            digest = file_digest(path)
+            if digest == entry["hash"]:
+                entry["size"], entry["mtime_ns"] = stat.st_size, stat.st_mtime_ns
+                return None
+
+        self._index += 1
+        return {
+            "index": self._index,
+            "image_path": path,
+            "output_path": output_path,
+            "thickness": thickness,
+            "name": output_names_for([path], self.output_root_for(path))[0],
+            "hash": digest or file_digest(path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "params": params,
+        }
+
+    def _submit(self, job):
+        """Start a job on the pool; returns a future-like object"""
+        if self.workers <= 1:
+            if self._executor is None:
+                _init_worker(self.pipeline)
+                self._executor = "inline"
+            return _Done(_run_job(job))
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.pipeline, self.cv_threads),
+            )
+        return self._executor.submit(_run_job, job)
+
+    def _record(self, job, entry):
+        # The hash is the one taken before dispatch, so an edit made while
+        # the job ran is picked up on the next scan
+        self.manifest.files[job["image_path"]] = {
+            "hash": job["hash"],
+            "size": job["size"],
+            "mtime_ns": job["mtime_ns"],
+            "params": job["params"],
+            "thickness": job["thickness"],
+            "output": job["output_path"],
+            "status": entry["status"],
+            "is_valid": entry["is_valid"],
+            "issues": entry["issues"],
+            "error": entry["error"],
+            "total_time": entry["timings"].get("total"),
+            "processed_at": time.time(),
+        }
+        if entry["status"] == "ok":
+            self.log(f"✓ {entry['input']} -> {entry['output']} ({entry['timings']['total']:.2f}s)")
+        else:
+            self.log(f"✗ {entry['input']}: {entry['error']}")
+
+    def run_once(self, inputs):
+        """
+        Convert the stale inputs among files and folders in inputs and save
+        the manifest. Returns (entries for the converted files, number of
+        files skipped as current).
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.manifest.prune()
+        paths = self.scan(inputs)
+        jobs = [job for job in (self.job_for(path) for path in paths) if job is not None]
+        futures = [(job, self._submit(job)) for job in jobs]
+        entries = []
+        for job, future in futures:
+            entry = future.result()
+            self._record(job, entry)
+            entries.append(entry)
+        self.manifest.save()
+        return entries, len(paths) - len(jobs)
+
+    def watch(self, inputs, interval=2.0, debounce=1.0, max_polls=None):
+        """
+        Poll inputs every interval seconds and convert new or changed files.
+        A file is only picked up once its mtime is debounce seconds old, so
+        drawings still being copied in are not read half-written. Runs until
+        interrupted (or for max_polls polls).
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        running = {}
+        polls = 0
+        try:
+            while max_polls is None or polls < max_polls:
+                polls += 1
+                changed = bool(self.manifest.prune())
+                in_flight = {job["image_path"] for job in running.values()}
+                now = time.time()
+                for path in self.scan(inputs):
+                    if path in in_flight:
+                        continue
+                    try:
+                        if now - os.stat(path).st_mtime < debounce:
+                            continue
+                        job = self.job_for(path)
+                    except FileNotFoundError:
+                        continue
+                    if job is not None:
+                        running[self._submit(job)] = job
+
+                # Sleep until the next poll, recording jobs as they finish
+                deadline = time.monotonic() + interval
+                while True:
+                    done = [future for future in running if future.done()]
+                    for future in done:
+                        self._record(running.pop(future), future.result())
+                    changed = changed or bool(done)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    if running:
+                        wait(list(running), timeout=remaining, return_when=FIRST_COMPLETED)
+                    else:
+                        time.sleep(remaining)
+                if changed:
+                    self.manifest.save()
+        except KeyboardInterrupt:
+            self.log("Stopping watch")
+        finally:
+            for future, job in running.items():
+                if not future.cancel():
+                    self._record(job, future.result())
+            self.manifest.save()
+            self.close()
+
+    def close(self):
+        if isinstance(self._executor, ProcessPoolExecutor):
+            self._executor.shutdown(wait=True)
+        self._executor = None
+        self.pipeline.wait_diagnostics()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class _Done:
+    """Result of a job run inline, with the Future methods watch() uses"""
+
+    def __init__(self, result):
+        self._result = result
+
+    def done(self):
+        return True
+
+    def cancel(self):
+        return False
+
+    def result(self):
+        return self._result